@@ -0,0 +1,238 @@
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import services_cache
+from app.models.Schedule import Schedule, ScheduleServices
+from app.models.Services import Services
+
+# Horário de funcionamento e granularidade dos horários oferecidos
+SCHEDULE_OPENS_AT = time.fromisoformat(os.getenv("SCHEDULE_OPENS_AT", "08:00"))
+SCHEDULE_CLOSES_AT = time.fromisoformat(os.getenv("SCHEDULE_CLOSES_AT", "18:00"))
+SCHEDULE_SLOT_MINUTES = int(os.getenv("SCHEDULE_SLOT_MINUTES", "30"))
+# Quantos atendimentos podem acontecer ao mesmo tempo na loja (ex.: número de
+# tosadores); 0 desativa o limite e só os horários de um mesmo cliente são conferidos
+SCHEDULE_CAPACITY = int(os.getenv("SCHEDULE_CAPACITY", "0"))
+
+
+def naive(moment: datetime) -> datetime:
+    """O SQLite grava o horário sem fuso, então as comparações também são feitas sem ele"""
+    return moment.replace(tzinfo=None)
+
+
+def appointment_end(start: datetime, duration_in_minutes: int) -> datetime:
+    """Fim de um atendimento; agendamentos sem serviço ocupam um horário mínimo"""
+    return start + timedelta(minutes=duration_in_minutes or SCHEDULE_SLOT_MINUTES)
+
+
+def conflict_detail(start: datetime, end: datetime) -> str:
+    return f"O horário de {start:%d/%m/%Y %H:%M} às {end:%H:%M} conflita com outro agendamento"
+
+
+class IntervalIndex:
+    """Intervalos ocupados de um período, mantidos em duas listas ordenadas (inícios e fins).
+
+    Um intervalo existente cruza `[start, end)` quando começa antes de `end` e termina
+    depois de `start`; como todo intervalo que termina até `start` também começa antes
+    de `end`, a quantidade de sobreposições sai de duas buscas binárias, em O(log n)."""
+
+    def __init__(self, intervals: list[tuple[datetime, datetime]] = ()):
+        self.starts = sorted(start for start, _ in intervals)
+        self.ends = sorted(end for _, end in intervals)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: datetime, end: datetime) -> None:
+        insort(self.starts, start)
+        insort(self.ends, end)
+
+    def overlapping(self, start: datetime, end: datetime) -> int:
+        return bisect_left(self.starts, end) - bisect_right(self.ends, start)
+
+
+class Agenda:
+    """Intervalos ocupados de um período: um `IntervalIndex` por cliente e um da loja
+    inteira.
+
+    Um cliente não pode ter dois atendimentos que se sobrepõem; clientes diferentes
+    podem agendar no mesmo horário, até o limite de `SCHEDULE_CAPACITY` (quando ligado)."""
+
+    def __init__(self, rows: list[tuple[int, datetime, datetime]] = ()):
+        self.shop = IntervalIndex()
+        self.clients: dict[int, IntervalIndex] = defaultdict(IntervalIndex)
+        for client_id, start, end in rows:
+            self.add(client_id, start, end)
+
+    def add(self, client_id: int, start: datetime, end: datetime) -> None:
+        self.clients[client_id].add(start, end)
+        self.shop.add(start, end)
+
+    def is_free(self, client_id: int | None, start: datetime, end: datetime) -> bool:
+        """Se o intervalo cabe na agenda do cliente e na capacidade da loja.
+
+        Sem `client_id`, vale a ocupação da loja: o horário está livre enquanto houver
+        menos atendimentos que `SCHEDULE_CAPACITY` (sem limite, nenhum atendimento)"""
+        if client_id is None:
+            return self.shop.overlapping(start, end) < max(SCHEDULE_CAPACITY, 1)
+        if client_id in self.clients and self.clients[client_id].overlapping(
+            start, end
+        ):
+            return False
+        return (
+            SCHEDULE_CAPACITY <= 0
+            or self.shop.overlapping(start, end) < SCHEDULE_CAPACITY
+        )
+
+    def free_slots(
+        self, day: date, duration_in_minutes: int, client_id: int | None = None
+    ) -> list[tuple[datetime, datetime]]:
+        """Horários livres do dia, dentro do horário de funcionamento, para um atendimento
+        com a duração informada"""
+        step = timedelta(minutes=SCHEDULE_SLOT_MINUTES)
+        closes = datetime.combine(day, SCHEDULE_CLOSES_AT)
+        start = datetime.combine(day, SCHEDULE_OPENS_AT)
+
+        slots = []
+        while (end := appointment_end(start, duration_in_minutes)) <= closes:
+            if self.is_free(client_id, start, end):
+                slots.append((start, end))
+            start += step
+        return slots
+
+
+async def service_durations(
+    session: AsyncSession, service_ids: set[int] | list[int], fresh: bool = False
+) -> dict[int, int]:
+    """Duração (minutos) de cada serviço encontrado, lida do cache do catálogo
+    (os ids ausentes do cache são buscados em uma única consulta). Com `fresh`, lida
+    direto do banco, como nas escritas que vinculam os serviços ao agendamento"""
+    if not service_ids:
+        return {}
+    services = await services_cache.get_many(session, service_ids, fresh=fresh)
+    return {
+        service_id: service.duration_in_minutes
+        for service_id, service in services.items()
+    }
+
+
+async def schedule_duration(session: AsyncSession, schedule_id: int) -> int:
+    """Soma da duração (minutos) dos serviços de um agendamento"""
+    statement = (
+        select(func.coalesce(func.sum(Services.duration_in_minutes), 0))
+        .join(ScheduleServices, ScheduleServices.services_id == Services.id)
+        .where(ScheduleServices.schedule_id == schedule_id)
+    )
+    return (await session.exec(statement)).one()
+
+
+async def load_agenda(
+    session: AsyncSession,
+    first_day: date,
+    last_day: date,
+    client_ids: Iterable[int] | None = None,
+    exclude_id: int | None = None,
+) -> Agenda:
+    """Monta a agenda dos agendamentos entre `first_day` e `last_day`.
+
+    A busca começa um dia antes para incluir atendimentos que atravessam a meia-noite,
+    e a duração de cada agendamento é a soma dos seus serviços. Sem `SCHEDULE_CAPACITY`
+    e com `client_ids`, só os agendamentos desses clientes são lidos (pelo índice de
+    `client_id` e `date_schedule`); sem `client_ids`, a agenda tem a ocupação da loja.
+
+    A agenda é montada a cada chamada com uma consulta por intervalo de datas, e não
+    mantida em memória por dia: com vários workers gravando no mesmo banco, um índice
+    por processo ficaria desatualizado sem uma invalidação entre eles."""
+    window_start = datetime.combine(first_day - timedelta(days=1), time.min)
+    window_end = datetime.combine(last_day + timedelta(days=1), time.min)
+
+    statement = (
+        select(
+            Schedule.client_id,
+            Schedule.date_schedule,
+            func.coalesce(func.sum(Services.duration_in_minutes), 0),
+        )
+        .outerjoin(ScheduleServices, ScheduleServices.schedule_id == Schedule.id)
+        .outerjoin(Services, Services.id == ScheduleServices.services_id)
+        .where(
+            Schedule.date_schedule >= window_start,
+            Schedule.date_schedule < window_end,
+        )
+        .group_by(Schedule.id)
+    )
+    if exclude_id is not None:
+        statement = statement.where(Schedule.id != exclude_id)
+    if SCHEDULE_CAPACITY <= 0 and client_ids is not None:
+        statement = statement.where(Schedule.client_id.in_(set(client_ids)))
+
+    rows = (await session.exec(statement)).all()
+    return Agenda(
+        [
+            (client_id, start, appointment_end(start, duration))
+            for client_id, start, duration in rows
+        ]
+    )
+
+
+async def extended_schedules(
+    session: AsyncSession, service_id: int, duration_in_minutes: int
+) -> list[tuple[datetime, datetime, datetime | None]]:
+    """Início e fim de cada agendamento com o serviço, se ele durasse
+    `duration_in_minutes`, e o início do agendamento seguinte do mesmo cliente"""
+    following = aliased(Schedule)
+    next_start = (
+        select(func.min(following.date_schedule))
+        .where(
+            following.client_id == Schedule.client_id,
+            following.date_schedule > Schedule.date_schedule,
+        )
+        .scalar_subquery()
+    )
+    affected = (
+        select(ScheduleServices.schedule_id)
+        .where(ScheduleServices.services_id == service_id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Schedule.date_schedule,
+            func.sum(
+                case(
+                    (Services.id == service_id, duration_in_minutes),
+                    else_=Services.duration_in_minutes,
+                )
+            ),
+            next_start,
+        )
+        .join(ScheduleServices, ScheduleServices.schedule_id == Schedule.id)
+        .join(Services, Services.id == ScheduleServices.services_id)
+        .where(Schedule.id.in_(affected))
+        .group_by(Schedule.id)
+    )
+    return [
+        (
+            naive(start),
+            appointment_end(naive(start), duration),
+            None if following_start is None else naive(following_start),
+        )
+        for start, duration, following_start in (await session.exec(statement)).all()
+    ]
+
+
+def first_overlap(
+    schedules: list[tuple[datetime, datetime, datetime | None]],
+) -> tuple[datetime, datetime] | None:
+    """Primeiro agendamento de `extended_schedules` que invade o seguinte do cliente.
+
+    Os inícios não mudam e, antes da alteração, os atendimentos de um cliente não se
+    sobrepõem; por isso basta comparar o novo fim com o início do agendamento seguinte.
+    A capacidade da loja não é conferida"""
+    for start, end, following_start in schedules:
+        if following_start is not None and following_start < end:
+            return start, end
+    return None
@@ -0,0 +1,202 @@
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+from sqlalchemy import insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.CacheVersion import CacheVersion
+from app.models.Services import Services
+
+# Tempo de vida (segundos) de cada entrada do catálogo de serviços; 0 desativa o cache
+SERVICES_CACHE_TTL = float(os.getenv("SERVICES_CACHE_TTL", "60"))
+# Quantidade máxima de entradas; as menos usadas recentemente são descartadas primeiro
+SERVICES_CACHE_MAXSIZE = int(os.getenv("SERVICES_CACHE_MAXSIZE", "1024"))
+# Intervalo (segundos) entre as consultas à versão do catálogo gravada no banco, usada
+# para invalidar o cache de todos os workers; 0 desativa (um único worker)
+SERVICES_CACHE_VERSION_INTERVAL = float(
+    os.getenv("SERVICES_CACHE_VERSION_INTERVAL", "0")
+)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU com tempo de vida por entrada e contadores de acerto.
+
+    Não usa travas: todas as leituras e escritas acontecem no event loop, inclusive
+    no `DATABASE_MODE=sync`, em que apenas as operações de banco vão para o threadpool."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Muda a cada `clear()`; cargas iniciadas antes de uma invalidação não são gravadas
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        if not self.enabled:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class ServicesCache(TTLCache):
+    """Cache do catálogo de serviços, invalidado pelas escritas em `/services`.
+
+    Cada escrita incrementa a versão `services` na tabela `cacheversion` dentro da
+    própria transação; com `SERVICES_CACHE_VERSION_INTERVAL` ligado, os workers
+    comparam essa versão com a local e descartam o cache quando ela mudou."""
+
+    name = "services"
+
+    def __init__(self, maxsize: int, ttl: float, version_interval: float):
+        super().__init__(maxsize, ttl)
+        self.version_interval = version_interval
+        self.version: int | None = None
+        self._version_checked_at = 0.0
+
+    async def _current_version(self, session: AsyncSession) -> int:
+        version = (
+            await session.exec(
+                select(CacheVersion.version).where(CacheVersion.name == self.name)
+            )
+        ).first()
+        return version or 0
+
+    async def sync_version(self, session: AsyncSession) -> None:
+        """Descarta o cache local se outro worker alterou o catálogo"""
+        if not self.enabled or self.version_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_interval:
+            return
+        self._version_checked_at = now
+
+        version = await self._current_version(session)
+        if self.version is not None and version != self.version:
+            self.clear()
+        self.version = version
+
+    async def get_or_load(
+        self,
+        session: AsyncSession,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Leitura com preenchimento: devolve a entrada em cache ou executa `loader`"""
+        await self.sync_version(session)
+        value = self.get(key)
+        if value is _MISSING:
+            generation = self.generation
+            value = await loader()
+            self.set(key, value, generation)
+        return value
+
+    async def get_many(
+        self,
+        session: AsyncSession,
+        service_ids: list[int] | set[int],
+        fresh: bool = False,
+    ) -> dict[int, Services]:
+        """Serviços pelo id; os que não estão em cache são lidos em uma única consulta.
+        Ids inexistentes não aparecem no resultado e não ficam em cache, para que um
+        serviço criado por outro worker seja encontrado na próxima leitura.
+
+        Com `fresh`, todos os ids são lidos do banco (e atualizados no cache): usado
+        pelas escritas que gravam as chaves estrangeiras dos serviços, que não podem
+        aceitar um serviço já excluído por outro worker"""
+        await self.sync_version(session)
+        found: dict[int, Services] = {}
+        missing = []
+        for service_id in dict.fromkeys(service_ids):
+            value = _MISSING if fresh else self.get(("id", service_id))
+            if value is _MISSING:
+                missing.append(service_id)
+            else:
+                found[service_id] = value
+
+        if missing:
+            generation = self.generation
+            rows = (
+                await session.exec(select(Services).where(Services.id.in_(missing)))
+            ).all()
+            for service in rows:
+                found[service.id] = snapshot(service)
+                self.set(("id", service.id), found[service.id], generation)
+
+        return found
+
+    async def mark_changed(self, session: AsyncSession) -> None:
+        """Incrementa a versão do catálogo na transação da escrita.
+        Depois do commit, chame `clear()` para descartar o cache deste worker"""
+        result = await session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == self.name)
+            .values(version=CacheVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await session.execute(
+                insert(CacheVersion).values(name=self.name, version=1)
+            )
+
+    def stats(self) -> dict:
+        return {**super().stats(), "version": self.version}
+
+
+def snapshot(service: Services) -> Services:
+    """Cópia desvinculada da sessão, segura para ser compartilhada entre requisições"""
+    return Services(**service.model_dump())
+
+
+services_cache = ServicesCache(
+    SERVICES_CACHE_MAXSIZE, SERVICES_CACHE_TTL, SERVICES_CACHE_VERSION_INTERVAL
+)
@@ -0,0 +1,81 @@
+from sqlalchemy import delete, exists, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.counters import adjust_counter
+from app.database import engine
+from app.models.Schedule import Schedule, ScheduleServices
+from app.rollups import refresh_days, schedule_day
+
+# As chaves estrangeiras são declaradas com ON DELETE CASCADE, mas bancos SQLite criados
+# antes disso só a recebem com `python -m app.migrations rebuild-tables` (o SQLite não
+# altera restrições de tabelas existentes). Por isso as exclusões abaixo removem os dependentes explicitamente,
+# filhos primeiro, com um DELETE por tabela em vez de uma instrução por linha.
+
+
+def bulk_delete(model, *criteria):
+    """`DELETE ... WHERE` em uma única instrução, sem sincronizar os objetos da sessão"""
+    return delete(model).where(*criteria).execution_options(synchronize_session=False)
+
+
+async def delete_schedules(session: AsyncSession, *criteria) -> int:
+    """Exclui os agendamentos que atendem aos critérios e seus vínculos com serviços,
+    atualizando o resumo diário e o contador. Retorna quantos agendamentos foram excluídos"""
+    days = {
+        schedule_day(moment)
+        for moment in (
+            await session.exec(select(Schedule.date_schedule).where(*criteria))
+        ).all()
+    }
+    if not days:
+        return 0
+
+    await session.execute(
+        bulk_delete(
+            ScheduleServices,
+            ScheduleServices.schedule_id.in_(select(Schedule.id).where(*criteria)),
+        )
+    )
+    deleted = (await session.execute(bulk_delete(Schedule, *criteria))).rowcount
+
+    await refresh_days(session, days)
+    await adjust_counter(session, Schedule, -deleted)
+    return deleted
+
+
+async def delete_service_links(session: AsyncSession, service_id: int) -> int:
+    """Remove os vínculos de um serviço e exclui, com um único anti-join, os
+    agendamentos afetados que ficaram sem nenhum serviço. Retorna quantos
+    agendamentos foram excluídos"""
+    linked = exists().where(
+        ScheduleServices.schedule_id == Schedule.id,
+        ScheduleServices.services_id == service_id,
+    )
+    days = {
+        schedule_day(moment)
+        for moment in (
+            await session.exec(select(Schedule.date_schedule).where(linked))
+        ).all()
+    }
+    if not days:
+        return 0
+
+    # Os agendamentos que só têm este serviço saem antes dos vínculos, que identificam
+    # quais foram afetados (os que já não tinham serviço ficam). Nos bancos SQLite sem
+    # ON DELETE CASCADE (ainda não migrados), a checagem das chaves estrangeiras fica
+    # para o commit, quando os vínculos também já foram removidos
+    if engine.dialect.name == "sqlite":
+        await session.execute(text("PRAGMA defer_foreign_keys = ON"))
+    other_services = exists().where(
+        ScheduleServices.schedule_id == Schedule.id,
+        ScheduleServices.services_id != service_id,
+    )
+    deleted = (
+        await session.execute(bulk_delete(Schedule, linked, ~other_services))
+    ).rowcount
+    await session.execute(
+        bulk_delete(ScheduleServices, ScheduleServices.services_id == service_id)
+    )
+
+    await refresh_days(session, days)
+    await adjust_counter(session, Schedule, -deleted)
+    return deleted
@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import logging
+import os
+from sqlalchemy import Engine, func, insert, update
+from sqlmodel import Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.models.Client import Client
+from app.models.EntityCounter import EntityCounter
+from app.models.Pet import Pet
+from app.models.Schedule import Schedule
+from app.models.Services import Services
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (segundos) entre as reconciliações dos contadores com as tabelas; 0 desativa
+COUNTERS_RECONCILE_INTERVAL = float(os.getenv("COUNTERS_RECONCILE_INTERVAL", "300"))
+
+# Tabelas com contador, pelo nome da tabela
+COUNTED_MODELS: dict[str, type[SQLModel]] = {
+    model.__tablename__: model for model in (Client, Pet, Schedule, Services)
+}
+
+
+def _count(model: type[SQLModel]):
+    return select(func.count()).select_from(model).scalar_subquery()
+
+
+async def adjust_counter(
+    session: AsyncSession, model: type[SQLModel], delta: int
+) -> None:
+    """Soma `delta` ao contador da tabela, na transação da escrita.
+    Se o contador ainda não existe, ele é criado com a contagem atual da tabela"""
+    if not delta:
+        return
+    result = await session.execute(
+        update(EntityCounter)
+        .where(EntityCounter.name == model.__tablename__)
+        .values(total=EntityCounter.total + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await session.flush()
+        await session.execute(
+            insert(EntityCounter).values(name=model.__tablename__, total=_count(model))
+        )
+
+
+async def read_counter(session: AsyncSession, model: type[SQLModel]) -> int:
+    """Total de registros da tabela, lido do contador (com contagem como alternativa)"""
+    total = (
+        await session.exec(
+            select(EntityCounter.total).where(EntityCounter.name == model.__tablename__)
+        )
+    ).first()
+    if total is None:
+        total = (await session.exec(select(func.count()).select_from(model))).one()
+    return total
+
+
+def reconcile_counters(engine: Engine) -> dict[str, int]:
+    """Recalcula todos os contadores a partir das tabelas, em uma única transação.
+    Retorna a diferença encontrada em cada contador que estava errado"""
+    with Session(engine) as session:
+        before = dict(
+            session.exec(select(EntityCounter.name, EntityCounter.total)).all()
+        )
+        for name, model in COUNTED_MODELS.items():
+            # Cada contador é corrigido com um único UPDATE ... SET total = (SELECT count(*)),
+            # sem janela entre a contagem e a gravação
+            if name in before:
+                session.execute(
+                    update(EntityCounter)
+                    .where(EntityCounter.name == name)
+                    .values(total=_count(model))
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                session.execute(
+                    insert(EntityCounter).values(name=name, total=_count(model))
+                )
+        after = dict(
+            session.exec(select(EntityCounter.name, EntityCounter.total)).all()
+        )
+        session.commit()
+
+    drift = {
+        name: after[name] - before[name]
+        for name in COUNTED_MODELS
+        if name in before and after[name] != before[name]
+    }
+    if drift:
+        logger.warning("Contadores corrigidos na reconciliação: %s", drift)
+    return drift
+
+
+async def reconcile_periodically(engine: Engine, interval: float) -> None:
+    """Tarefa de fundo que reconcilia os contadores a cada `interval` segundos"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(reconcile_counters, engine)
+        except Exception:
+            logger.exception("Falha ao reconciliar os contadores")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Manutenção dos contadores de registros"
+    )
+    parser.add_argument("command", choices=["reconcile"])
+    parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    drift = reconcile_counters(engine)
+    print(f"Contadores reconciliados; diferenças corrigidas: {drift or 'nenhuma'}")
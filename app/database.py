@@ -1,6 +1,17 @@
-import sqlite3
 from sqlmodel import create_engine, Session, SQLModel
-from sqlalchemy import event, Engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, inspect, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+import anyio
+from app.instrumentation import instrument_engine
+from app.migrations import pending_rebuilds
+from app.pool import MAX_OVERFLOW, POOL_SIZE, pool_options, pool_status
+from app.models.Schedule import ScheduleDailySummary
+from app.query_plans import capture_query_plans, log_query_plan_report
+from app.rollups import rebuild_daily_summary
+from app.search import create_full_text_indexes
+from app.sqlite_profile import apply_sqlite_pragmas, sqlite_pragmas
 from dotenv import load_dotenv
 import logging
 import os
@@ -10,25 +21,350 @@ load_dotenv()
 
 # Configurar o logger
 logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+logging.getLogger("app").setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
+
+# O log de todas as instruções SQL fica restrito à depuração local (DATABASE_ECHO=1);
+# em produção apenas as consultas lentas são registradas (app/instrumentation.py)
+if os.getenv("DATABASE_ECHO", "").lower() in ("1", "true", "yes"):
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 
 # Configuração do banco de dados
-engine = create_engine(os.getenv("DATABASE_URL"))
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# "async" usa a AsyncSession (aiosqlite no SQLite local);
+# "sync" mantém a Session síncrona, executada no threadpool
+DATABASE_MODE = os.getenv("DATABASE_MODE", "async").lower()
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+
+
+def _async_database_url(url: str):
+    """Deriva a URL assíncrona a partir da `DATABASE_URL` (sqlite -> sqlite+aiosqlite)"""
+    url = make_url(url)
+    if url.drivername == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+if DATABASE_MODE == "async":
+    DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL") or _async_database_url(
+        DATABASE_URL
+    )
+    async_engine = create_async_engine(
+        DATABASE_ASYNC_URL, **pool_options(DATABASE_ASYNC_URL, asynchronous=True)
+    )
+    async_session_maker = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+else:
+    async_engine = None
+    async_session_maker = None
+
+
+def _read_only_url(url: str) -> str | None:
+    """URL de uma conexão somente leitura no mesmo arquivo SQLite (`mode=ro`)"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    database = url.database
+    if not database.startswith("file:"):
+        database = f"file:{os.path.abspath(database)}"
+    return url.set(
+        database=database, query={**url.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
+
+# Engine das rotas de leitura: `DATABASE_READ_URL` (ex.: uma réplica) ou, no SQLite,
+# uma conexão somente leitura no mesmo arquivo. Igual à `DATABASE_URL` (ou em outros
+# bancos, sem `DATABASE_READ_URL`), as leituras usam a própria `engine`
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or _read_only_url(DATABASE_URL)
+
+if DATABASE_READ_URL and DATABASE_READ_URL != DATABASE_URL:
+    read_engine = create_engine(DATABASE_READ_URL, **pool_options(DATABASE_READ_URL))
+    if DATABASE_MODE == "async":
+        DATABASE_READ_ASYNC_URL = _async_database_url(DATABASE_READ_URL)
+        async_read_engine = create_async_engine(
+            DATABASE_READ_ASYNC_URL,
+            **pool_options(DATABASE_READ_ASYNC_URL, asynchronous=True),
+        )
+        async_read_session_maker = async_sessionmaker(
+            async_read_engine, class_=AsyncSession, expire_on_commit=False
+        )
+    else:
+        async_read_engine = None
+        async_read_session_maker = None
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+    async_read_session_maker = async_session_maker
+
+# Leituras em uma réplica de `DATABASE_READ_URL`, que pode estar atrasada em relação à
+# engine principal (a conexão `mode=ro` no mesmo arquivo do SQLite nunca está)
+READ_REPLICA = bool(os.getenv("DATABASE_READ_URL")) and read_engine is not engine
 
 
 # Criar a(s) tabela(s) no banco de dados
 # Inicializa o banco de dados
 def create_db_and_tables() -> None:
+    existing_tables = set(inspect(engine).get_table_names())
     SQLModel.metadata.create_all(engine)
+    # A subida não altera tabelas existentes; as criadas antes do schema atual são
+    # recriadas pelo comando `python -m app.migrations rebuild-tables`
+    pending = pending_rebuilds(engine)
+    if pending:
+        logger.warning(
+            "Tabelas com schema antigo (sem AUTOINCREMENT ou ON DELETE CASCADE): %s; "
+            "execute `python -m app.migrations rebuild-tables`",
+            ", ".join(table.name for table in pending),
+        )
+    create_missing_indexes()
+    create_full_text_indexes(engine)
+
+    # Um banco que já tinha agendamentos ganha o resumo diário preenchido na primeira subida
+    if ScheduleDailySummary.__tablename__ not in existing_tables:
+        rebuild_daily_summary(engine)
+
+
+def create_missing_indexes() -> list[str]:
+    """Cria os índices declarados nos modelos que ainda não existem em um banco já criado,
+    registrando no log quais planos de consulta passaram a usar os novos índices"""
+    inspector = inspect(engine)
+    missing = [
+        index
+        for table in SQLModel.metadata.sorted_tables
+        for index in table.indexes
+        if index.name
+        not in {existing["name"] for existing in inspector.get_indexes(table.name)}
+    ]
+
+    if not missing:
+        return []
+
+    plans_before = capture_query_plans(engine)
+    for index in missing:
+        index.create(engine, checkfirst=True)
+    log_query_plan_report(plans_before, capture_query_plans(engine))
+
+    return [index.name for index in missing]
+
+
+class ThreadedStreamResult:
+    """Resultado em streaming de uma `ThreadedSession`, com a mesma interface usada da
+    `AsyncResult`: cada lote de linhas é buscado do cursor no threadpool"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size: int | None = None):
+        iterator = self.result.partitions(size)
+        while (partition := await run_in_threadpool(next, iterator, None)) is not None:
+            yield partition
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.result.close)
+
+
+class ThreadedTransaction:
+    """Transação (ou SAVEPOINT) de uma `ThreadedSession`, encerrada no threadpool"""
+
+    def __init__(self, transaction):
+        self.transaction = transaction
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.transaction.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.transaction.rollback)
+
+
+class ThreadedSession:
+    """Expõe uma `Session` síncrona com a mesma interface assíncrona da `AsyncSession`,
+    executando cada operação de banco no threadpool (modo `DATABASE_MODE=sync`).
+
+    Cada sessão aberta com `async with` ocupa uma vaga do limitador, dimensionado
+    pela capacidade do pool: assim as requisições excedentes esperam no event loop,
+    e não em threads bloqueadas no checkout do pool, o que esgotaria o threadpool
+    enquanto as sessões que já têm conexão aguardam uma thread para continuar."""
+
+    _limiter: anyio.CapacityLimiter | None = None
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @classmethod
+    def limiter(cls) -> anyio.CapacityLimiter:
+        if cls._limiter is None:
+            cls._limiter = anyio.CapacityLimiter(POOL_SIZE + max(MAX_OVERFLOW, 0))
+        return cls._limiter
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def exec(self, statement, **kwargs):
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, statement, *args, **kwargs
+        )
 
+    async def stream(self, statement, *args, **kwargs) -> ThreadedStreamResult:
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement.execution_options(stream_results=True),
+            *args,
+            **kwargs,
+        )
+        return ThreadedStreamResult(result)
 
-def get_session() -> Session:
-    return Session(engine)
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, statement, *args, **kwargs
+        )
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, **kwargs) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, **kwargs)
+
+    async def begin_nested(self) -> ThreadedTransaction:
+        return ThreadedTransaction(
+            await run_in_threadpool(self.sync_session.begin_nested)
+        )
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def __aenter__(self) -> "ThreadedSession":
+        await self.limiter().acquire_on_behalf_of(self)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        try:
+            await self.close()
+        finally:
+            self.limiter().release_on_behalf_of(self)
+
+
+def open_session(read: bool = False) -> AsyncSession | ThreadedSession:
+    """Abre uma sessão de acordo com o `DATABASE_MODE` configurado; com `read`, na
+    engine de leitura"""
+    if DATABASE_MODE == "sync":
+        return ThreadedSession(
+            Session(read_engine if read else engine, expire_on_commit=False)
+        )
+    return async_read_session_maker() if read else async_session_maker()
+
+
+async def get_session():
+    """Dependência que abre uma sessão por requisição, desfaz a transação em caso de erro
+    e sempre fecha a sessão, devolvendo a conexão ao pool"""
+    async with open_session() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def dispose_engines() -> None:
+    """Fecha as conexões mantidas pelos pools (encerramento do app), incluindo a da
+    fila de escritas, depois de gravar as escritas pendentes"""
+    from app.write_queue import write_queue
+
+    await write_queue.stop()
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
+    engine.dispose()
+
+
+# Engines criadas fora deste módulo (ex.: a da fila de escritas), pelo nome
+_registered_engines: dict = {}
+
+
+def register_engine(name: str, sync_engine) -> None:
+    """Inclui a engine no estado dos pools e nas métricas, enquanto estiver em uso"""
+    _registered_engines[name] = sync_engine
+
+
+def unregister_engine(name: str) -> None:
+    _registered_engines.pop(name, None)
+
+
+def named_engines() -> dict:
+    """Engines síncronas em uso, pelo nome usado no estado dos pools e nas métricas
+    (a `AsyncEngine` expõe a sua em `sync_engine`)"""
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    if read_engine is not engine:
+        engines["read"] = read_engine
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        engines["async_read"] = async_read_engine.sync_engine
+    engines.update(_registered_engines)
+    return engines
+
+
+def database_pool_status() -> dict:
+    """Estado dos pools de conexão das engines em uso"""
+    return {name: pool_status(_engine) for name, _engine in named_engines().items()}
+
+
+# Perfil de desempenho do SQLite (SQLITE_PROFILE e SQLITE_<PRAGMA>)
+SQLITE_PRAGMAS = sqlite_pragmas()
+
+
+# O journal_mode fica gravado no arquivo e só pode ser trocado pela conexão de escrita;
+# `query_only` garante que a engine de leitura não grava, mesmo em uma réplica
+SQLITE_READ_PRAGMAS = {
+    **{name: value for name, value in SQLITE_PRAGMAS.items() if name != "journal_mode"},
+    "query_only": "ON",
+}
 
 
-@event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
-    if type(dbapi_connection) is sqlite3.Connection:  # somente para o SQLite
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+    apply_sqlite_pragmas(dbapi_connection, SQLITE_PRAGMAS)
+
+
+def set_sqlite_read_pragma(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection, SQLITE_READ_PRAGMAS)
+
+
+def sync_engines() -> list:
+    """Retorna as engines síncronas em uso, incluindo as de leitura"""
+    return list(named_engines().values())
+
+
+for _name, _engine in named_engines().items():
+    instrument_engine(_engine)
+    if _engine.dialect.name == "sqlite":  # somente para o SQLite
+        read_only = _name in ("read", "async_read")
+        event.listen(
+            _engine,
+            "connect",
+            set_sqlite_read_pragma if read_only else set_sqlite_pragma,
+        )
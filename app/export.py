@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+import os
+import zlib
+from collections.abc import AsyncIterator
+from datetime import datetime
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.Client import Client
+from app.models.Pet import Pet
+from app.models.Schedule import Schedule, ScheduleServices
+from app.models.Services import Services
+
+# Linhas lidas do cursor do banco por lote; a memória usada pela exportação não passa disso
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+CSV_COLUMNS = [
+    "schedule_id",
+    "date_schedule",
+    "client_id",
+    "client_name",
+    "client_cpf",
+    "pet_id",
+    "pet_name",
+    "pet_breed",
+    "service_ids",
+    "service_types",
+    "total_minutes",
+    "total_price",
+]
+
+
+def export_statement(start: datetime | None, end: datetime | None):
+    """Uma linha por serviço de cada agendamento (ou uma linha, se não houver serviço),
+    em ordem de data e id, para que os serviços de um agendamento venham em sequência"""
+    statement = (
+        select(
+            Schedule.id,
+            Schedule.date_schedule,
+            Client.id,
+            Client.name,
+            Client.cpf,
+            Pet.id,
+            Pet.name,
+            Pet.breed,
+            Services.id,
+            Services.type_service,
+            Services.duration_in_minutes,
+            Services.price,
+        )
+        .join(Client, Client.id == Schedule.client_id)
+        .join(Pet, Pet.id == Schedule.pet_id)
+        .outerjoin(ScheduleServices, ScheduleServices.schedule_id == Schedule.id)
+        .outerjoin(Services, Services.id == ScheduleServices.services_id)
+        .order_by(Schedule.date_schedule, Schedule.id, Services.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    if start is not None:
+        statement = statement.where(Schedule.date_schedule >= start)
+    if end is not None:
+        statement = statement.where(Schedule.date_schedule < end)
+    return statement
+
+
+def _new_record(row) -> dict:
+    schedule_id, date_schedule, client_id, client_name, cpf, pet_id, pet_name, breed = (
+        row[:8]
+    )
+    return {
+        "id": schedule_id,
+        "date_schedule": date_schedule.isoformat(),
+        "client": {"id": client_id, "name": client_name, "cpf": cpf},
+        "pet": {"id": pet_id, "name": pet_name, "breed": breed},
+        "services": [],
+        "total_minutes": 0,
+        "total_price": 0.0,
+    }
+
+
+def _add_service(record: dict, row) -> None:
+    service_id, type_service, duration, price = row[8:]
+    if service_id is None:
+        return
+    record["services"].append(
+        {
+            "id": service_id,
+            "type_service": type_service,
+            "duration_in_minutes": duration,
+            "price": price,
+        }
+    )
+    record["total_minutes"] += duration
+    # Arredondado a centavos a cada soma, com o mesmo valor no NDJSON e no CSV
+    record["total_price"] = round(record["total_price"] + price, 2)
+
+
+async def iter_schedule_records(
+    session: AsyncSession, start: datetime | None, end: datetime | None
+) -> AsyncIterator[list[dict]]:
+    """Lê os agendamentos do período por um cursor do banco, em lotes de
+    `EXPORT_CHUNK_SIZE` linhas, e devolve os agendamentos completos de cada lote.
+
+    A `session` é aberta e fechada aqui, durante o envio da resposta: a sessão de uma
+    dependência (`get_read_session`) é fechada antes de o corpo em streaming ser enviado."""
+    async with session:
+        result = await session.stream(export_statement(start, end))
+        try:
+            pending = None
+            async for partition in result.partitions():
+                records = []
+                for row in partition:
+                    if pending is None or pending["id"] != row[0]:
+                        if pending is not None:
+                            records.append(pending)
+                        pending = _new_record(row)
+                    _add_service(pending, row)
+                # O último agendamento do lote pode continuar no próximo
+                if records:
+                    yield records
+            if pending is not None:
+                yield [pending]
+        finally:
+            await result.close()
+
+
+def _ndjson(records: list[dict]) -> str:
+    return "".join(
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for record in records
+    )
+
+
+def _csv(records: list[dict], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for record in records:
+        services = record["services"]
+        writer.writerow(
+            [
+                record["id"],
+                record["date_schedule"],
+                record["client"]["id"],
+                record["client"]["name"],
+                record["client"]["cpf"],
+                record["pet"]["id"],
+                record["pet"]["name"],
+                record["pet"]["breed"],
+                ";".join(str(service["id"]) for service in services),
+                ";".join(service["type_service"] for service in services),
+                record["total_minutes"],
+                record["total_price"],
+            ]
+        )
+    return buffer.getvalue()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Se o `Accept-Encoding` aceita gzip: `gzip` (ou `*`, quando gzip não é citado)
+    com peso `q` maior que zero; sem `q`, o peso é 1"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+async def export_schedules(
+    session: AsyncSession,
+    start: datetime | None,
+    end: datetime | None,
+    output_format: str,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Corpo da exportação em NDJSON ou CSV, opcionalmente comprimido com gzip
+    à medida que os lotes são gerados"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if output_format == "csv":
+        yield encode(_csv([], header=True))
+
+    async for records in iter_schedule_records(session, start, end):
+        chunk = encode(_csv(records) if output_format == "csv" else _ndjson(records))
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,214 @@
+from copy import copy
+from functools import lru_cache
+from typing import get_args, get_origin
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only
+from app.serialization import validated_response
+
+# Campos escolhidos de uma relação: `None` são todos os campos do modelo aninhado
+_Selection = tuple[str, ...] | None
+
+# Modelos parciais mantidos em memória; as combinações de campos vêm da query string,
+# então o cache é limitado (as menos usadas saem primeiro)
+PARTIAL_MODEL_CACHE_SIZE = 256
+
+
+def _nested_model(annotation) -> tuple[type[BaseModel] | None, bool]:
+    """Modelo aninhado de um campo (`ClientBase`, `list[PetBase]`) e se é uma lista"""
+    many = get_origin(annotation) is list
+    if many:
+        annotation = get_args(annotation)[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+
+@lru_cache(maxsize=PARTIAL_MODEL_CACHE_SIZE)
+def partial_model(model: type[BaseModel], fields: tuple[tuple[str, _Selection], ...]):
+    """Modelo com apenas os `fields` escolhidos de `model`, com as mesmas anotações e
+    validações. As relações escolhidas viram modelos parciais do modelo aninhado.
+
+    Os `fields` chegam já validados e na ordem dos campos do modelo (`Fieldset.response`),
+    então a mesma escolha, em qualquer ordem ou com repetições, usa a mesma entrada"""
+    definitions = {}
+    for name, selection in fields:
+        info = model.model_fields[name]
+        annotation = info.annotation
+        nested, many = _nested_model(annotation)
+        if nested is not None and selection is not None:
+            annotation = partial_model(
+                nested, tuple((field, None) for field in selection)
+            )
+            if many:
+                annotation = list[annotation]
+        # O `create_model` altera o `FieldInfo` recebido; o do modelo original fica intacto
+        definitions[name] = (annotation, copy(info))
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+
+class Fieldset:
+    """Campos escolhidos pelo cliente com `fields=` e `include=` em uma rota de leitura.
+
+    Define as colunas carregadas do banco (`load_only`), as relações carregadas (as não
+    pedidas nem entram na consulta) e o modelo parcial que valida e serializa a
+    resposta, derivado do `response_model` da rota"""
+
+    def __init__(
+        self,
+        response_type,
+        columns: tuple[str, ...],
+        relations: dict[str, _Selection],
+    ):
+        self.many = get_origin(response_type) is list
+        self.model = get_args(response_type)[0] if self.many else response_type
+        self.columns = columns
+        self.relations = relations
+
+    def includes(self, relation: str) -> bool:
+        return relation in self.relations
+
+    def load_only(self, entity, *required):
+        """`load_only` das colunas escolhidas de `entity`, mais as `required` (ex.: as
+        da ordenação usadas no cursor). A chave primária é sempre carregada"""
+        mapper = inspect(entity)
+        attributes = [
+            getattr(entity, name)
+            for name in self.columns
+            if name in mapper.column_attrs
+        ]
+        return load_only(
+            *attributes,
+            *required,
+            *(getattr(entity, column.key) for column in mapper.primary_key),
+        )
+
+    def joinedloads(self, entity, *relations: str) -> list:
+        """`joinedload` das `relations` de `entity` que foram pedidas, carregando só os
+        campos escolhidos de cada uma"""
+        options = []
+        for name in relations:
+            if name not in self.relations:
+                continue
+            attribute = getattr(entity, name)
+            option = joinedload(attribute)
+            selection = self.relations[name]
+            if selection is not None:
+                target = attribute.property.mapper.class_
+                option = option.load_only(
+                    *(getattr(target, field) for field in selection)
+                )
+            options.append(option)
+        return options
+
+    def response(self, content, response: Response | None = None) -> Response:
+        """Resposta JSON do conteúdo validado no modelo parcial"""
+        fields = tuple(
+            (name, self.relations.get(name))
+            for name in self.model.model_fields
+            if name in self.columns or name in self.relations
+        )
+        model = partial_model(self.model, fields)
+        return validated_response(
+            list[model] if self.many else model, content, response
+        )
+
+
+def _split(value: str | None) -> list[str]:
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def _unknown(parameter: str, name: str, model) -> HTTPException:
+    available = ", ".join(model.model_fields)
+    return HTTPException(
+        status_code=400,
+        detail=f"Campo '{name}' inválido em `{parameter}`. Campos disponíveis: {available}",
+    )
+
+
+def parse_fieldset(
+    response_type, fields: str | None, include: str | None
+) -> Fieldset | None:
+    """Interpreta `fields` (campos e `relação.campo`, separados por vírgula) e `include`
+    (relações) para o `response_model` da rota. Sem nenhum dos dois, devolve `None` e a
+    rota responde com o modelo completo.
+
+    Sem `fields`, todos os campos simples são devolvidos; sem `include`, apenas as
+    relações citadas em `fields`. Uma relação citada sem campos (`client` ou em
+    `include`) vem com todos os campos do modelo aninhado"""
+    if fields is None and include is None:
+        return None
+
+    model = (
+        get_args(response_type)[0]
+        if get_origin(response_type) is list
+        else response_type
+    )
+    nested = {
+        name: _nested_model(info.annotation)[0]
+        for name, info in model.model_fields.items()
+    }
+    relations: dict[str, set[str] | None] = {}
+
+    for name in _split(include):
+        if nested.get(name) is None:
+            raise _unknown("include", name, model)
+        relations[name] = None
+
+    if fields is None:
+        columns = tuple(name for name, target in nested.items() if target is None)
+    else:
+        columns = []
+        for name in _split(fields):
+            relation, _, field = name.partition(".")
+            target = nested.get(relation, False)
+            if target is False or (field and target is None):
+                raise _unknown("fields", name, model)
+            if target is None:
+                columns.append(relation)
+            elif not field:
+                relations[relation] = None
+            elif field not in target.model_fields:
+                raise _unknown("fields", name, target)
+            elif relations.get(relation, ()) is not None:
+                relations.setdefault(relation, set()).add(field)
+        if not columns and not relations:
+            raise HTTPException(
+                status_code=400, detail="Nenhum campo escolhido em `fields`"
+            )
+        columns = tuple(columns)
+
+    return Fieldset(
+        response_type,
+        columns,
+        {
+            name: None
+            if selection is None
+            else tuple(
+                field for field in nested[name].model_fields if field in selection
+            )
+            for name, selection in relations.items()
+        },
+    )
+
+
+def sparse_fields(response_type):
+    """Dependência que lê `fields` e `include` da query string e devolve o `Fieldset`
+    da rota (ou `None`, para a resposta completa)"""
+
+    def dependency(
+        fields: str | None = Query(
+            default=None,
+            description="Campos devolvidos, separados por vírgula; use `relação.campo` "
+            "para os campos de uma relação (ex.: `id,date_schedule,client.name`)",
+        ),
+        include: str | None = Query(
+            default=None,
+            description="Relações devolvidas com todos os campos, separadas por "
+            "vírgula; as não citadas aqui nem em `fields` não são carregadas",
+        ),
+    ) -> Fieldset | None:
+        return parse_fieldset(response_type, fields, include)
+
+    return dependency
@@ -0,0 +1,142 @@
+import os
+import threading
+from sqlalchemy import Engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.models.Client import Client
+from app.models.Pet import Pet
+from app.models.Schedule import Schedule
+
+# Ids reservados por vez em cada processo para as cargas em massa (`IdAllocator`)
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "1000"))
+
+
+def accept_legacy_id(instance: SQLModel) -> None:
+    """Clientes antigos da API enviam `"id": 0` para pedir um registro novo: o id
+    passa a ser gerado pelo banco (AUTOINCREMENT), sem consulta extra e sem corrida
+    entre workers que leram o mesmo `max(id)`"""
+    if instance.id == 0:
+        instance.id = None
+
+
+# A sequência só vale para as tabelas com AUTOINCREMENT: nas demais, os inserts sem id
+# usam max(rowid) + 1 e tomariam os ids reservados
+_AUTOINCREMENT = (
+    "EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? "
+    "AND upper(sql) LIKE '%AUTOINCREMENT%')"
+)
+
+
+def reserve_ids(engine: Engine, table: str, count: int) -> range | None:
+    """Reserva `count` ids consecutivos de `table` avançando a sequência do
+    AUTOINCREMENT (`sqlite_sequence`) em uma transação própria e já confirmada.
+    Retorna `None` se a tabela não tem AUTOINCREMENT (banco ainda não migrado).
+
+    O UPDATE é atômico, então processos diferentes nunca recebem o mesmo bloco, e os
+    inserts sem id (AUTOINCREMENT) continuam depois do maior id reservado. Deve ser
+    chamada antes de a sessão que vai usar os ids gravar algo, pois a reserva
+    espera pela trava de escrita do SQLite."""
+    if engine.dialect.name != "sqlite":
+        raise ValueError("A reserva de ids usa a sequência do SQLite (sqlite_sequence)")
+
+    # O maior id da tabela cobre linhas gravadas antes de a sequência existir
+    current = f"(SELECT coalesce(max(id), 0) FROM {table})"
+    try:
+        with engine.begin() as connection:
+            last = connection.exec_driver_sql(
+                f"UPDATE sqlite_sequence SET seq = max(seq, {current}) + ? "
+                f"WHERE name = ? AND {_AUTOINCREMENT} RETURNING seq",
+                (count, table, table),
+            ).scalar()
+            if last is None:
+                last = connection.exec_driver_sql(
+                    "INSERT INTO sqlite_sequence (name, seq) "
+                    f"SELECT ?, {current} + ? WHERE {_AUTOINCREMENT} RETURNING seq",
+                    (table, count, table),
+                ).scalar()
+    except OperationalError as error:
+        # Sem nenhuma tabela com AUTOINCREMENT, o SQLite nem cria a `sqlite_sequence`
+        if "sqlite_sequence" not in str(error.orig):
+            raise
+        return None
+    if last is None:
+        return None
+    return range(last - count + 1, last + 1)
+
+
+class IdAllocator:
+    """Alocador hi/lo de ids para os caminhos em massa (importação, agendamentos em lote).
+
+    Cada processo reserva blocos de `block_size` ids com `reserve_ids` (uma transação
+    curta por bloco) e distribui os ids do bloco sem consultar o banco. Ids de um bloco
+    não usados até o fim do processo, ou de uma transação desfeita, viram lacunas na
+    sequência: os ids são únicos, não contínuos.
+
+    Sem a sequência do SQLite (outros bancos, ou tabelas ainda sem AUTOINCREMENT), não
+    há reserva: `allocate` devolve `None` e `insert_rows` grava com os ids gerados pelo
+    próprio banco."""
+
+    def __init__(self, model: type[SQLModel], block_size: int = ID_BLOCK_SIZE):
+        self.table = model.__tablename__
+        self.block_size = block_size
+        self._block = range(0)
+        self._lock = threading.Lock()
+        self._reserves: bool | None = None
+
+    def _allocate(self, engine: Engine, count: int) -> list[int] | None:
+        with self._lock:
+            if self._reserves is None and engine.dialect.name != "sqlite":
+                self._reserves = False
+            if self._reserves is False:
+                return None
+            ids = list(self._block[:count])
+            self._block = self._block[count:]
+            missing = count - len(ids)
+            if missing:
+                # Pedidos maiores que o bloco reservam de uma vez o que falta
+                block = reserve_ids(engine, self.table, max(missing, self.block_size))
+                if block is None:
+                    self._reserves = False
+                    return None
+                self._reserves = True
+                ids.extend(block[:missing])
+                self._block = block[missing:]
+            return ids
+
+    async def allocate(self, count: int) -> list[int] | None:
+        """Retorna `count` ids novos e exclusivos deste processo, ou `None` quando os ids
+        são gerados pelo banco no insert"""
+        from app.database import engine
+
+        if count <= 0:
+            return []
+        return await run_in_threadpool(self._allocate, engine, count)
+
+
+async def insert_rows(
+    session: AsyncSession,
+    model: type[SQLModel],
+    rows: list[dict],
+    ids: list[int] | None,
+) -> list[int]:
+    """Grava `rows` de `model` e devolve os ids na ordem das linhas: os `ids` reservados
+    por `IdAllocator.allocate` vão em um `executemany`, sem ler nada de volta; sem
+    reserva (`None`), um `INSERT ... RETURNING` devolve os ids gerados pelo banco"""
+    if not rows:
+        return []
+    if ids is None:
+        result = await session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        )
+        return list(result.scalars())
+    await session.execute(
+        insert(model), [{**row, "id": id_} for row, id_ in zip(rows, ids)]
+    )
+    return ids
+
+
+client_id_allocator = IdAllocator(Client)
+pet_id_allocator = IdAllocator(Pet)
+schedule_id_allocator = IdAllocator(Schedule)
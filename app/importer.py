@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import csv
+import os
+import sys
+from collections.abc import Callable, Iterator
+from itertools import islice
+from typing import TextIO
+from pydantic import ValidationError
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.counters import adjust_counter
+from app.ids import client_id_allocator, insert_rows, pet_id_allocator
+from app.loaders import IN_BATCH_SIZE
+from app.models.Client import (
+    Client,
+    ClientBase,
+    ClientImportReject,
+    ClientImportReport,
+)
+from app.models.Pet import Pet, PetBase
+
+# Linhas do CSV gravadas por transação; cada lote é confirmado com um commit próprio
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Rejeições detalhadas na resposta de `POST /clients/import` (as demais só são contadas)
+IMPORT_MAX_REJECTS = int(os.getenv("IMPORT_MAX_REJECTS", "100"))
+
+# Uma linha por pet, com os dados do cliente repetidos; sem `pet_name`, a linha cadastra
+# apenas o cliente
+CLIENT_COLUMNS = {
+    "client_name": "name",
+    "client_cpf": "cpf",
+    "client_age": "age",
+    "client_is_admin": "is_admin",
+}
+PET_COLUMNS = {
+    "pet_name": "name",
+    "pet_breed": "breed",
+    "pet_age": "age",
+    "pet_size_in_centimeters": "size_in_centimeters",
+}
+CSV_COLUMNS = [*CLIENT_COLUMNS, *PET_COLUMNS]
+
+
+class ImportRow:
+    __slots__ = ("line", "client", "pet")
+
+    def __init__(self, line: int, client: ClientBase, pet: PetBase | None):
+        self.line = line
+        self.client = client
+        self.pet = pet
+
+
+def _validate(model, columns: dict[str, str], values: dict[str, str]):
+    try:
+        return model.model_validate(
+            {field: values[column] for column, field in columns.items()}
+        )
+    except ValidationError as error:
+        detail = error.errors()[0]
+        # O motivo cita a coluna do CSV, e não o campo do modelo
+        column = next(
+            (column for column, field in columns.items() if field == detail["loc"][0]),
+            detail["loc"][0],
+        )
+        raise ValueError(f"{column}: {detail['msg']}") from None
+
+
+def parse_row(line: int, row: dict[str, str]) -> ImportRow:
+    """Valida uma linha do CSV com os modelos da API. Levanta `ValueError` com o motivo"""
+    values = {key: (value or "").strip() for key, value in row.items() if key}
+    if not values.get("client_cpf"):
+        raise ValueError("client_cpf: campo obrigatório")
+    client = _validate(ClientBase, CLIENT_COLUMNS, values)
+    pet = None
+    if values.get("pet_name"):
+        pet = _validate(PetBase, PET_COLUMNS, values)
+    return ImportRow(line, client, pet)
+
+
+def open_reader(file: TextIO, delimiter: str = ",") -> csv.DictReader:
+    """Leitor do CSV; levanta `ValueError` se faltar alguma coluna no cabeçalho"""
+    reader = csv.DictReader(file, delimiter=delimiter)
+    missing = [
+        column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])
+    ]
+    if missing:
+        raise ValueError(f"Colunas ausentes no CSV: {', '.join(missing)}")
+    return reader
+
+
+def _read_chunk(reader: csv.DictReader, size: int) -> list[tuple[int, dict]]:
+    # `line_num` é a linha física do arquivo em que o registro termina
+    return [(reader.line_num, row) for row in islice(reader, size)]
+
+
+def _batches(values: list, size: int = IN_BATCH_SIZE) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class ClientImporter:
+    """Importa clientes e pets de um CSV, em lotes gravados com `executemany`.
+
+    Por lote, os CPFs são procurados no banco com uma consulta `IN` (clientes já
+    cadastrados recebem os novos pets em vez de gerar um duplicado) e os nomes de
+    pet com uma consulta pelo índice (client_id, name), aplicando a mesma regra de
+    `create_pet_for_client`. Linhas inválidas são rejeitadas sem interromper a carga."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        max_rejects: int | None = IMPORT_MAX_REJECTS,
+        on_progress: Callable[[ClientImportReport], None] | None = None,
+    ):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.max_rejects = max_rejects
+        self.on_progress = on_progress
+        self.report = ClientImportReport()
+
+    def reject(self, line: int, reason: str) -> None:
+        self.report.rejected += 1
+        if self.max_rejects is None or len(self.report.rejects) < self.max_rejects:
+            self.report.rejects.append(ClientImportReject(line=line, reason=reason))
+
+    async def run(self, reader: csv.DictReader) -> ClientImportReport:
+        while chunk := await run_in_threadpool(_read_chunk, reader, self.chunk_size):
+            self.report.rows += len(chunk)
+            rows = []
+            for line, row in chunk:
+                try:
+                    rows.append(parse_row(line, row))
+                except ValueError as error:
+                    self.reject(line, str(error))
+
+            try:
+                rejects = await self.import_rows(rows)
+            except IntegrityError:
+                # Outro processo gravou o mesmo CPF entre a consulta e o insert:
+                # o lote é desfeito e refeito, agora enxergando o registro concorrente
+                await self.session.rollback()
+                try:
+                    rejects = await self.import_rows(rows)
+                except IntegrityError as error:
+                    await self.session.rollback()
+                    rejects = [
+                        (row.line, f"Erro de integridade: {error.orig}") for row in rows
+                    ]
+            for line, reason in rejects:
+                self.reject(line, reason)
+
+            if self.on_progress is not None:
+                self.on_progress(self.report)
+        return self.report
+
+    async def _existing_clients(self, cpfs: list[str]) -> dict[str, int]:
+        found = {}
+        for batch in _batches(cpfs):
+            found.update(
+                (
+                    await self.session.exec(
+                        select(Client.cpf, Client.id).where(Client.cpf.in_(batch))
+                    )
+                ).all()
+            )
+        return found
+
+    async def _existing_pet_names(
+        self, pairs: list[tuple[int, str]]
+    ) -> set[tuple[int, str]]:
+        found = set()
+        for batch in _batches(pairs):
+            found.update(
+                (
+                    await self.session.exec(
+                        select(Pet.client_id, Pet.name).where(
+                            tuple_(Pet.client_id, Pet.name).in_(batch)
+                        )
+                    )
+                ).all()
+            )
+        return found
+
+    async def import_rows(self, rows: list[ImportRow]) -> list[tuple[int, str]]:
+        """Grava um lote em uma transação: clientes novos, depois os pets válidos.
+        Retorna as linhas recusadas pela regra de nome de pet, com o motivo"""
+        if not rows:
+            return []
+        client_ids = await self._existing_clients(
+            list({row.client.cpf for row in rows})
+        )
+        existing_cpfs = set(client_ids)
+
+        # O primeiro registro de cada CPF novo define os dados do cliente
+        new_clients: dict[str, ClientBase] = {}
+        for row in rows:
+            if row.client.cpf not in existing_cpfs:
+                new_clients.setdefault(row.client.cpf, row.client)
+        client_rows = [
+            client.model_dump(exclude={"id"}) for client in new_clients.values()
+        ]
+        # Ids reservados em bloco (hi/lo), para gravar com `executemany` sem ler de volta
+        # os ids gerados. As reservas vêm antes das escritas do lote, pois esperam
+        # pela trava de escrita do SQLite
+        reserved_ids = await client_id_allocator.allocate(len(new_clients))
+        if reserved_ids is None:
+            # Sem reserva, os ids dos clientes novos só existem depois do insert
+            new_ids = await insert_rows(self.session, Client, client_rows, None)
+        else:
+            new_ids = reserved_ids
+        client_ids.update(zip(new_clients, new_ids))
+
+        taken = await self._existing_pet_names(
+            list(
+                {
+                    (client_ids[row.client.cpf], row.pet.name)
+                    for row in rows
+                    if row.pet is not None and row.client.cpf in existing_cpfs
+                }
+            )
+        )
+        pets = []
+        rejects = []
+        for row in rows:
+            if row.pet is None:
+                continue
+            client_id = client_ids[row.client.cpf]
+            if (client_id, row.pet.name) in taken:
+                rejects.append(
+                    (
+                        row.line,
+                        f"O cliente {client_id} já apresenta um Pet com o nome {row.pet.name} cadastrado",
+                    )
+                )
+                continue
+            # Pets repetidos dentro do próprio arquivo também são recusados
+            taken.add((client_id, row.pet.name))
+            pets.append({**row.pet.model_dump(exclude={"id"}), "client_id": client_id})
+
+        pet_ids = await pet_id_allocator.allocate(len(pets))
+        if reserved_ids is not None:
+            await insert_rows(self.session, Client, client_rows, reserved_ids)
+        await insert_rows(self.session, Pet, pets, pet_ids)
+        await adjust_counter(self.session, Client, len(new_clients))
+        await adjust_counter(self.session, Pet, len(pets))
+        await self.session.commit()
+
+        self.report.clients_created += len(new_clients)
+        self.report.pets_created += len(pets)
+        return rejects
+
+
+async def import_clients_csv(
+    session: AsyncSession, file: TextIO, delimiter: str = ",", **options
+) -> ClientImportReport:
+    """Importa clientes e pets do CSV aberto em `file`"""
+    reader = open_reader(file, delimiter)
+    return await ClientImporter(session, **options).run(reader)
+
+
+def _print_progress(report: ClientImportReport) -> None:
+    print(
+        f"{report.rows} linhas lidas | {report.clients_created} clientes e "
+        f"{report.pets_created} pets criados | {report.rejected} rejeitadas",
+        file=sys.stderr,
+    )
+
+
+async def _main(args: argparse.Namespace) -> ClientImportReport:
+    from app.database import dispose_engines, open_session
+
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as file:
+            async with open_session() as session:
+                return await import_clients_csv(
+                    session,
+                    file,
+                    delimiter=args.delimiter,
+                    chunk_size=args.chunk_size,
+                    max_rejects=None,
+                    on_progress=_print_progress,
+                )
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Importa clientes e pets de um arquivo CSV"
+    )
+    parser.add_argument("file", help=f"CSV com as colunas {', '.join(CSV_COLUMNS)}")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument(
+        "--rejects", help="Grava as linhas rejeitadas (linha, motivo) neste CSV"
+    )
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables
+
+    create_db_and_tables()
+    try:
+        report = asyncio.run(_main(args))
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.rejects:
+        with open(args.rejects, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["line", "reason"])
+            writer.writerows((reject.line, reject.reason) for reject in report.rejects)
+    print(
+        f"Importação concluída: {report.clients_created} clientes criados, "
+        f"{report.pets_created} pets criados, "
+        f"{report.rejected} linhas rejeitadas"
+    )
@@ -0,0 +1,115 @@
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from sqlalchemy import Engine, event
+from sqlalchemy.engine.interfaces import CacheStats
+
+logger = logging.getLogger(__name__)
+
+# Consultas acima deste tempo (ms) são registradas no log, com a rota que as executou
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Fração (0 a 1) das consultas lentas que realmente vão para o log
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1"))
+# Anexa `X-DB-Query-Count`, `X-DB-Time-Ms` e `X-DB-Cache-Hits` às respostas
+DB_DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "").lower() in ("1", "true", "yes")
+
+
+class QueryStats:
+    """Consultas executadas durante uma requisição, o tempo total gasto no banco e
+    quantas delas reaproveitaram o SQL do cache de compilação do SQLAlchemy"""
+
+    __slots__ = ("scope", "count", "total_time", "cache_hits", "cache_misses")
+
+    def __init__(self, scope: dict | None = None):
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def route(self) -> str:
+        if self.scope is None:
+            return "-"
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path", "-")
+        return f"{self.scope.get('method', '')} {path}".strip()
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def current_query_stats() -> QueryStats | None:
+    """Estatísticas de consultas da requisição em andamento, se houver"""
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_time += elapsed
+        # SQL textual e DDL não passam pelo cache e não entram na contagem
+        if context.cache_hit is CacheStats.CACHE_HIT:
+            stats.cache_hits += 1
+        elif context.cache_hit is CacheStats.CACHE_MISS:
+            stats.cache_misses += 1
+
+    if elapsed * 1000 >= SLOW_QUERY_MS and random.random() < SLOW_QUERY_SAMPLE_RATE:
+        logger.warning(
+            "Consulta lenta (%.1f ms) em %s: %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split()),
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra os eventos de medição de tempo das consultas em uma engine síncrona"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryTimingMiddleware:
+    """Middleware ASGI que abre um `QueryStats` por requisição e, com `DB_DEBUG_HEADERS`
+    ligado, devolve a quantidade de consultas, o tempo no banco e os acertos do cache de
+    compilação nos headers da resposta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append(
+                    (b"x-db-time-ms", f"{stats.total_time * 1000:.3f}".encode())
+                )
+                headers.append((b"x-db-cache-hits", str(stats.cache_hits).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(
+                scope, receive, send_with_headers if DB_DEBUG_HEADERS else send
+            )
+        finally:
+            _current_stats.reset(token)
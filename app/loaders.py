@@ -0,0 +1,67 @@
+from collections import defaultdict
+from typing import Sequence
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.fieldsets import Fieldset
+from app.models.Schedule import Schedule, ScheduleServices
+from app.models.Services import Services
+
+# Quantidade máxima de ids enviados em cada `IN (...)` do carregamento em lote
+IN_BATCH_SIZE = 500
+
+
+def select_schedules(fieldset: Fieldset | None = None):
+    """Retorna o `select` base de agendamentos com cliente e pet carregados por JOIN.
+
+    Cliente e pet são relações muitos-para-um, então o JOIN não multiplica as linhas
+    e o LIMIT continua contando agendamentos. Os serviços são carregados à parte
+    por `load_schedule_services`. Com um `fieldset`, carrega só as colunas escolhidas
+    (mais `date_schedule`, da ordenação) e só as relações pedidas."""
+    if fieldset is not None:
+        return select(Schedule).options(
+            fieldset.load_only(Schedule, Schedule.date_schedule),
+            *fieldset.joinedloads(Schedule, "client", "pet"),
+        )
+    return select(Schedule).options(
+        joinedload(Schedule.client),
+        joinedload(Schedule.pet),
+    )
+
+
+async def load_schedule_services(
+    session: AsyncSession, schedules: Sequence[Schedule]
+) -> Sequence[Schedule]:
+    """Carrega os serviços dos agendamentos pela tabela `ScheduleServices`
+    com uma única consulta `IN` por lote de ids"""
+    services_by_schedule: dict[int, list[Services]] = defaultdict(list)
+    ids = [schedule.id for schedule in schedules]
+
+    for start in range(0, len(ids), IN_BATCH_SIZE):
+        statement = (
+            select(ScheduleServices.schedule_id, Services)
+            .join(Services, Services.id == ScheduleServices.services_id)
+            .where(ScheduleServices.schedule_id.in_(ids[start : start + IN_BATCH_SIZE]))
+            .order_by(ScheduleServices.schedule_id, Services.id)
+        )
+        for schedule_id, service in await session.exec(statement):
+            services_by_schedule[schedule_id].append(service)
+
+    for schedule in schedules:
+        set_committed_value(
+            schedule, "services", services_by_schedule.get(schedule.id, [])
+        )
+
+    return schedules
+
+
+async def fetch_schedules(
+    session: AsyncSession, statement, services: bool = True
+) -> Sequence[Schedule]:
+    """Executa um `select` de agendamentos (ou um `lambda_stmt` de `app.statements`)
+    e carrega seus serviços em lote (exceto com `services=False`)"""
+    schedules = (await session.execute(statement)).scalars().all()
+    if not services:
+        return schedules
+    return await load_schedule_services(session, schedules)
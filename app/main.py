@@ -1,21 +1,58 @@
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
-from app.database import create_db_and_tables
-from app.routes import ClientRoutes, PetRoutes, ScheduleRoutes, ServicesRoutes
+from contextlib import asynccontextmanager, suppress
+import asyncio
+from app.counters import (
+    COUNTERS_RECONCILE_INTERVAL,
+    reconcile_counters,
+    reconcile_periodically,
+)
+from app.database import create_db_and_tables, dispose_engines, engine
+from app.instrumentation import QueryTimingMiddleware
+from app.metrics import MetricsMiddleware
+from app.read_routing import ReadAfterWriteMiddleware
+from app.routes import (
+    ClientRoutes,
+    HealthRoutes,
+    MetricsRoutes,
+    PetRoutes,
+    ScheduleRoutes,
+    ServicesRoutes,
+)
 
 
 # Configurações de inicialização
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    reconcile_counters(engine)
+    reconcile_task = None
+    if COUNTERS_RECONCILE_INTERVAL > 0:
+        reconcile_task = asyncio.create_task(
+            reconcile_periodically(engine, COUNTERS_RECONCILE_INTERVAL)
+        )
     yield
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await reconcile_task
+    await dispose_engines()
 
 
 # Inicializa o aplicativo FastAPI
 app = FastAPI(lifespan=lifespan)
 
+# Leituras da engine principal logo depois de uma escrita do mesmo cliente
+app.add_middleware(ReadAfterWriteMiddleware)
+# Métricas por rota de `GET /metrics`. O último middleware adicionado é o mais externo:
+# o `MetricsMiddleware` roda dentro do `QueryTimingMiddleware` e lê as consultas dele
+app.add_middleware(MetricsMiddleware)
+# Contagem e tempo das consultas por requisição
+app.add_middleware(QueryTimingMiddleware)
+
 # Rotas para Endpoints
 app.include_router(ClientRoutes.router)
 app.include_router(PetRoutes.router)
 app.include_router(ScheduleRoutes.router)
 app.include_router(ServicesRoutes.router)
+app.include_router(HealthRoutes.router)
+app.include_router(MetricsRoutes.router)
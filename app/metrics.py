@@ -0,0 +1,373 @@
+import os
+import time
+from bisect import bisect_left
+from anyio import to_thread
+from sqlalchemy.pool import QueuePool
+from app.instrumentation import current_query_stats
+
+# Liga o `MetricsMiddleware` e as métricas de `GET /metrics`
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Limites (em segundos) dos buckets do histograma de latência por rota
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RouteMetrics:
+    """Contadores de uma rota (método + path da rota, ex.: `GET /clients/{client_id}`).
+
+    O histograma guarda a contagem de cada bucket separada e só acumula os buckets ao
+    gerar o texto, de modo que cada requisição incrementa um único inteiro"""
+
+    __slots__ = (
+        "statuses",
+        "buckets",
+        "duration_sum",
+        "queries",
+        "query_seconds",
+        "cache_hits",
+        "cache_misses",
+    )
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class MetricsRegistry:
+    """Métricas HTTP deste worker.
+
+    Todas as atualizações acontecem na thread do event loop (no `MetricsMiddleware`),
+    então os contadores são inteiros simples, sem locks. Com vários workers, cada
+    processo expõe as próprias métricas."""
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.in_progress = 0
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        queries: int = 0,
+        query_seconds: float = 0.0,
+        cache_hits: int = 0,
+        cache_misses: int = 0,
+    ) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        metrics.duration_sum += duration
+        metrics.queries += queries
+        metrics.query_seconds += query_seconds
+        metrics.cache_hits += cache_hits
+        metrics.cache_misses += cache_misses
+
+
+registry = MetricsRegistry()
+
+
+def _route(scope) -> str:
+    # O path declarado na rota mantém a cardinalidade baixa; requisições que não
+    # chegaram a nenhuma rota (404) ficam agrupadas
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra, por rota, as requisições por status, a latência e
+    as consultas ao banco. Deve ficar dentro do `QueryTimingMiddleware`, para ler as
+    consultas da requisição no `QueryStats` aberto por ele"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            registry.in_progress -= 1
+            stats = current_query_stats()
+            if stats is None:
+                registry.observe(scope["method"], _route(scope), status, duration)
+            else:
+                registry.observe(
+                    scope["method"],
+                    _route(scope),
+                    status,
+                    duration,
+                    stats.count,
+                    stats.total_time,
+                    stats.cache_hits,
+                    stats.cache_misses,
+                )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Exposition:
+    """Monta o texto no formato de exposição do Prometheus, uma família por vez"""
+
+    def __init__(self):
+        self.lines: list[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels) -> None:
+        label_text = f"{{{_labels(**labels)}}}" if labels else ""
+        self.lines.append(f"{name}{label_text} {_number(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _http_metrics(out: _Exposition, routes: dict) -> None:
+    out.family("http_requests_total", "counter", "Requisições HTTP atendidas")
+    for (method, route), metrics in routes.items():
+        for status, count in sorted(metrics.statuses.items()):
+            out.sample(
+                "http_requests_total", count, method=method, route=route, status=status
+            )
+
+    out.family(
+        "http_request_duration_seconds", "histogram", "Latência das requisições HTTP"
+    )
+    for (method, route), metrics in routes.items():
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), metrics.buckets):
+            cumulative += count
+            out.sample(
+                "http_request_duration_seconds_bucket",
+                cumulative,
+                method=method,
+                route=route,
+                le=bound,
+            )
+        out.sample(
+            "http_request_duration_seconds_sum",
+            metrics.duration_sum,
+            method=method,
+            route=route,
+        )
+        out.sample(
+            "http_request_duration_seconds_count",
+            cumulative,
+            method=method,
+            route=route,
+        )
+
+    out.family("http_requests_in_progress", "gauge", "Requisições HTTP em andamento")
+    out.sample("http_requests_in_progress", registry.in_progress)
+
+    out.family(
+        "http_db_queries_total", "counter", "Consultas ao banco executadas por rota"
+    )
+    for (method, route), metrics in routes.items():
+        out.sample("http_db_queries_total", metrics.queries, method=method, route=route)
+    out.family(
+        "http_db_query_seconds_total",
+        "counter",
+        "Tempo gasto em consultas ao banco por rota",
+    )
+    for (method, route), metrics in routes.items():
+        out.sample(
+            "http_db_query_seconds_total",
+            metrics.query_seconds,
+            method=method,
+            route=route,
+        )
+    out.family(
+        "http_db_statement_cache_total",
+        "counter",
+        "Consultas por rota que reaproveitaram (hit) ou compilaram (miss) o SQL",
+    )
+    for (method, route), metrics in routes.items():
+        for result, count in (
+            ("hit", metrics.cache_hits),
+            ("miss", metrics.cache_misses),
+        ):
+            out.sample(
+                "http_db_statement_cache_total",
+                count,
+                method=method,
+                route=route,
+                result=result,
+            )
+
+
+def _threadpool_metrics(out: _Exposition) -> None:
+    from app.database import ThreadedSession
+
+    # O threadpool padrão do anyio (rotas síncronas, `run_in_threadpool`) e, no modo
+    # `sync`, o limitador de sessões dimensionado pelo pool de conexões
+    limiters = {"default": to_thread.current_default_thread_limiter()}
+    if ThreadedSession._limiter is not None:
+        limiters["sessions"] = ThreadedSession._limiter
+
+    out.family("threadpool_tokens", "gauge", "Vagas do limitador de threads")
+    for name, limiter in limiters.items():
+        out.sample("threadpool_tokens", limiter.total_tokens, limiter=name)
+    out.family("threadpool_tokens_in_use", "gauge", "Vagas do limitador em uso")
+    for name, limiter in limiters.items():
+        out.sample("threadpool_tokens_in_use", limiter.borrowed_tokens, limiter=name)
+    out.family(
+        "threadpool_tasks_waiting",
+        "gauge",
+        "Tarefas esperando uma vaga do limitador",
+    )
+    for name, limiter in limiters.items():
+        out.sample(
+            "threadpool_tasks_waiting",
+            limiter.statistics().tasks_waiting,
+            limiter=name,
+        )
+
+
+def _pool_metrics(out: _Exposition) -> None:
+    from app.database import named_engines
+
+    pools = {name: engine.pool for name, engine in named_engines().items()}
+    queue_pools = {
+        name: pool for name, pool in pools.items() if isinstance(pool, QueuePool)
+    }
+    timed_pools = {
+        name: pool.wait_stats
+        for name, pool in pools.items()
+        if getattr(pool, "wait_stats", None) is not None
+    }
+
+    gauges = [
+        ("db_pool_size", "Conexões mantidas pelo pool", QueuePool.size),
+        ("db_pool_checked_out", "Conexões em uso", QueuePool.checkedout),
+        ("db_pool_checked_in", "Conexões livres no pool", QueuePool.checkedin),
+        (
+            "db_pool_overflow",
+            "Conexões abertas além do tamanho do pool",
+            lambda pool: max(pool.overflow(), 0),
+        ),
+    ]
+    for name, help_text, read in gauges:
+        out.family(name, "gauge", help_text)
+        for engine_name, pool in queue_pools.items():
+            out.sample(name, read(pool), engine=engine_name)
+
+    counters = [
+        ("db_pool_checkouts_total", "Checkouts atendidos pelo pool", "checkouts"),
+        (
+            "db_pool_checkout_timeouts_total",
+            "Checkouts que desistiram de esperar por uma conexão",
+            "timeouts",
+        ),
+        (
+            "db_pool_checkout_wait_seconds_total",
+            "Tempo total de espera por uma conexão livre",
+            "total_wait",
+        ),
+    ]
+    for name, help_text, field in counters:
+        out.family(name, "counter", help_text)
+        for engine_name, stats in timed_pools.items():
+            out.sample(name, getattr(stats, field), engine=engine_name)
+    out.family(
+        "db_pool_checkout_wait_max_seconds",
+        "gauge",
+        "Maior espera por uma conexão livre",
+    )
+    for engine_name, stats in timed_pools.items():
+        out.sample(
+            "db_pool_checkout_wait_max_seconds", stats.max_wait, engine=engine_name
+        )
+
+
+def _compiled_cache_metrics(out: _Exposition) -> None:
+    from app.database import named_engines
+
+    # Entradas perto da capacidade indicam consultas montadas de formas demais,
+    # descartando SQL compilado que ainda seria reaproveitado
+    caches = {
+        name: cache
+        for name, engine in named_engines().items()
+        if (cache := engine._compiled_cache) is not None
+    }
+    out.family(
+        "db_compiled_cache_entries",
+        "gauge",
+        "SQL compilado guardado no cache da engine",
+    )
+    for name, cache in caches.items():
+        out.sample("db_compiled_cache_entries", len(cache), engine=name)
+    out.family(
+        "db_compiled_cache_capacity", "gauge", "Capacidade do cache de compilação"
+    )
+    for name, cache in caches.items():
+        out.sample("db_compiled_cache_capacity", cache.capacity, engine=name)
+
+
+def _write_queue_metrics(out: _Exposition) -> None:
+    from app.write_queue import WRITE_QUEUE_ENABLED, write_queue
+
+    if not WRITE_QUEUE_ENABLED:
+        return
+    out.family("write_queue_jobs_total", "counter", "Escritas executadas pela fila")
+    out.sample("write_queue_jobs_total", write_queue.jobs)
+    out.family(
+        "write_queue_batches_total", "counter", "Lotes (transações) gravados pela fila"
+    )
+    out.sample("write_queue_batches_total", write_queue.batches)
+    out.family(
+        "write_queue_failed_batches_total",
+        "counter",
+        "Lotes desfeitos por erro no commit",
+    )
+    out.sample("write_queue_failed_batches_total", write_queue.failed_batches)
+    out.family("write_queue_waiting", "gauge", "Escritas aguardando a tarefa escritora")
+    out.sample("write_queue_waiting", write_queue.waiting)
+
+
+def render_metrics() -> str:
+    """Texto de `GET /metrics`. Chamado no event loop, como as atualizações do
+    registro, então lê um retrato consistente dos contadores"""
+    out = _Exposition()
+    _http_metrics(out, registry.routes)
+    _threadpool_metrics(out)
+    _pool_metrics(out)
+    _compiled_cache_metrics(out)
+    _write_queue_metrics(out)
+    return out.text()
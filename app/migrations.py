@@ -0,0 +1,120 @@
+import argparse
+import logging
+from sqlalchemy import Engine, Table, inspect
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+# Registra todas as tabelas dos modelos em `SQLModel.metadata`
+import app.models.Schedule  # noqa: F401
+from app.search import drop_full_text_indexes
+
+logger = logging.getLogger(__name__)
+
+
+def _missing_cascades(engine: Engine, table: Table) -> bool:
+    """Se alguma chave estrangeira declarada com `ondelete` foi criada sem ele"""
+    existing = {
+        tuple(foreign_key["constrained_columns"]): (
+            foreign_key.get("options", {}).get("ondelete") or ""
+        ).upper()
+        for foreign_key in inspect(engine).get_foreign_keys(table.name)
+    }
+    return any(
+        constraint.ondelete
+        and existing.get(tuple(constraint.column_keys)) != constraint.ondelete.upper()
+        for constraint in table.foreign_key_constraints
+    )
+
+
+def pending_rebuilds(engine: Engine) -> list[Table]:
+    """Tabelas de um banco SQLite criadas antes do schema atual: sem o AUTOINCREMENT
+    declarado em `sqlite_autoincrement` ou sem o `ON DELETE` das chaves estrangeiras"""
+    if engine.dialect.name != "sqlite":
+        return []
+
+    with engine.connect() as connection:
+        schemas = dict(
+            connection.exec_driver_sql(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'table'"
+            ).all()
+        )
+    return [
+        table
+        for table in SQLModel.metadata.sorted_tables
+        if table.name in schemas
+        and (
+            (
+                table.dialect_options["sqlite"]["autoincrement"]
+                and "AUTOINCREMENT" not in schemas[table.name].upper()
+            )
+            or _missing_cascades(engine, table)
+        )
+    ]
+
+
+def rebuild_tables(engine: Engine) -> list[str]:
+    """Recria as tabelas de `pending_rebuilds` com o schema dos modelos, seguindo o
+    procedimento de alteração de tabelas do SQLite (cópia para uma tabela nova, troca
+    de nome e conferência das chaves estrangeiras), em uma única transação.
+
+    Os índices e os triggers da tabela antiga somem com ela; quem chama recria os dois
+    (`create_db_and_tables`)"""
+    pending = pending_rebuilds(engine)
+    if not pending:
+        return []
+
+    drop_full_text_indexes(engine)
+    connection = engine.raw_connection()
+    driver = connection.driver_connection
+    isolation_level = driver.isolation_level
+    # As chaves estrangeiras só podem ser desligadas fora de uma transação
+    driver.isolation_level = None
+    try:
+        driver.execute("PRAGMA foreign_keys=OFF")
+        driver.execute("BEGIN IMMEDIATE")
+        for table in pending:
+            rebuilt = f"{table.name}_rebuilt"
+            columns = ", ".join(column.name for column in table.columns)
+            driver.execute(
+                str(CreateTable(table).compile(engine)).replace(
+                    f"CREATE TABLE {table.name} (", f"CREATE TABLE {rebuilt} (", 1
+                )
+            )
+            driver.execute(
+                f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"
+            )
+            driver.execute(f"DROP TABLE {table.name}")
+            driver.execute(f"ALTER TABLE {rebuilt} RENAME TO {table.name}")
+        if driver.execute("PRAGMA foreign_key_check").fetchone() is not None:
+            raise RuntimeError("Chaves estrangeiras inválidas ao recriar as tabelas")
+        driver.execute("COMMIT")
+    except BaseException:
+        if driver.in_transaction:
+            driver.execute("ROLLBACK")
+        raise
+    finally:
+        driver.execute("PRAGMA foreign_keys=ON")
+        driver.isolation_level = isolation_level
+        connection.close()
+
+    logger.info(
+        "Tabelas recriadas com o schema atual: %s",
+        ", ".join(table.name for table in pending),
+    )
+    return [table.name for table in pending]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrações do schema que a subida do app não executa"
+    )
+    parser.add_argument("command", choices=["rebuild-tables"])
+    parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    rebuilt = rebuild_tables(engine)
+    # Índices e triggers de texto das tabelas recriadas
+    create_db_and_tables()
+    print(f"Tabelas recriadas: {', '.join(rebuilt) or 'nenhuma'}")
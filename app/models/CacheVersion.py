@@ -0,0 +1,9 @@
+from sqlmodel import SQLModel, Field
+
+
+class CacheVersion(SQLModel, table=True):
+    """Versão de um cache em memória, incrementada a cada escrita para que os demais
+    workers saibam que precisam descartar a cópia local"""
+
+    name: str = Field(primary_key=True)
+    version: int = 0
@@ -16,9 +16,25 @@ class ClientBase(SQLModel):
 
 
 class Client(ClientBase, table=True):
+    # AUTOINCREMENT: ids nunca são reaproveitados e a sequência pode ser reservada em blocos
+    __table_args__ = {"sqlite_autoincrement": True}
+
     pets: list["Pet"] = Relationship(back_populates="client")
     schedules: list["Schedule"] = Relationship(back_populates="client")
 
 
 class ClientBaseWithPets(ClientBase):
     pets: list[PetBase] = []
+
+
+class ClientImportReject(SQLModel):
+    line: int
+    reason: str
+
+
+class ClientImportReport(SQLModel):
+    rows: int = 0
+    clients_created: int = 0
+    pets_created: int = 0
+    rejected: int = 0
+    rejects: list[ClientImportReject] = []
@@ -0,0 +1,8 @@
+from sqlmodel import SQLModel, Field
+
+
+class EntityCounter(SQLModel, table=True):
+    """Total de registros de uma tabela, mantido pelas rotas de criação e exclusão"""
+
+    name: str = Field(primary_key=True)
+    total: int = 0
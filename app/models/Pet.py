@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import TYPE_CHECKING
 
@@ -22,6 +23,11 @@ class PetBase(SQLModel):
 
 
 class Pet(PetBase, table=True):
-    client_id: int = Field(foreign_key="client.id")
+    __table_args__ = (
+        Index("ix_pet_client_id_name", "client_id", "name"),
+        {"sqlite_autoincrement": True},
+    )
+
+    client_id: int = Field(foreign_key="client.id", ondelete="CASCADE")
     client: "Client" = Relationship(back_populates="pets")
     schedules: list["Schedule"] = Relationship(back_populates="pet")
@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import date, datetime
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from app.models.Client import ClientBase, Client
 from app.models.Pet import PetBase, Pet
@@ -6,8 +7,19 @@ from app.models.Services import Services
 
 
 class ScheduleServices(SQLModel, table=True):
-    services_id: int = Field(default=None, foreign_key="services.id", primary_key=True)
-    schedule_id: int = Field(default=None, foreign_key="schedule.id", primary_key=True)
+    # A chave primária (services_id, schedule_id) já atende as buscas por `services_id`
+    __table_args__ = (
+        Index(
+            "ix_scheduleservices_schedule_id_services_id", "schedule_id", "services_id"
+        ),
+    )
+
+    services_id: int = Field(
+        default=None, foreign_key="services.id", primary_key=True, ondelete="CASCADE"
+    )
+    schedule_id: int = Field(
+        default=None, foreign_key="schedule.id", primary_key=True, ondelete="CASCADE"
+    )
 
 
 class ScheduleBase(SQLModel):
@@ -16,8 +28,15 @@ class ScheduleBase(SQLModel):
 
 
 class Schedule(ScheduleBase, table=True):
-    client_id: int = Field(foreign_key="client.id")
-    pet_id: int = Field(foreign_key="pet.id")
+    __table_args__ = (
+        Index("ix_schedule_client_id_date_schedule", "client_id", "date_schedule"),
+        Index("ix_schedule_date_schedule_id", "date_schedule", "id"),
+        Index("ix_schedule_pet_id", "pet_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    client_id: int = Field(foreign_key="client.id", ondelete="CASCADE")
+    pet_id: int = Field(foreign_key="pet.id", ondelete="CASCADE")
     client: "Client" = Relationship(back_populates="schedules")
     pet: "Pet" = Relationship(back_populates="schedules")
     services: list["Services"] = Relationship(link_model=ScheduleServices)
@@ -27,3 +46,31 @@ class ScheduleWithClientPetServices(ScheduleBase):
     client: "ClientBase"
     pet: "PetBase"
     services: list["Services"]
+
+
+class ScheduleBulkItem(SQLModel):
+    date_schedule: datetime
+    client_id: int
+    pet_id: int
+    service_ids: list[int]
+
+
+class ScheduleBulkResult(SQLModel):
+    index: int
+    status_code: int
+    id: int | None = None
+    detail: str | None = None
+
+
+class AvailabilitySlot(SQLModel):
+    start: datetime
+    end: datetime
+
+
+class ScheduleDailySummary(SQLModel, table=True):
+    """Resumo diário dos agendamentos, mantido na mesma transação que altera os agendamentos"""
+
+    day: date = Field(primary_key=True)
+    appointments: int = 0
+    total_minutes: int = 0
+    revenue: float = 0.0
@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 
@@ -8,6 +9,12 @@ class ServicesUpdate(SQLModel):
 
 
 class Services(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_services_type_service", "type_service"),
+        Index("ix_services_price", "price"),
+        {"sqlite_autoincrement": True},
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     duration_in_minutes: int
     type_service: str
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Header usado para devolver o cursor da próxima página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Gera um cursor opaco a partir dos valores da chave de ordenação do último item"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parsers: Sequence[Callable[[Any], Any]]) -> tuple:
+    """Decodifica um cursor gerado por `encode_cursor`, convertendo cada valor com o parser correspondente"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(parsers):
+            raise ValueError(cursor)
+        return tuple(parse(value) for parse, value in zip(parsers, payload))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
+def keyset_page(statement, columns: Sequence, cursor: str | None, limit: int):
+    """Aplica ordenação estável e paginação por chave (keyset) a um `select`.
+
+    A ordenação é sempre feita pelas `columns` (a última deve ser a chave primária),
+    e o cursor filtra a partir do último item já entregue, de modo que a página N
+    custa o mesmo que a primeira página."""
+    if cursor is not None:
+        parsers = [_parser_for(column) for column in columns]
+        values = decode_cursor(cursor, parsers)
+        if len(columns) == 1:
+            statement = statement.where(columns[0] > values[0])
+        else:
+            statement = statement.where(tuple_(*columns) > tuple_(*values))
+    return statement.order_by(*columns).limit(limit)
+
+
+def set_next_cursor(
+    response: Response, items: Sequence, keys: Sequence[str], limit: int
+) -> None:
+    """Informa no header `X-Next-Cursor` o cursor da próxima página, caso ela possa existir"""
+    if len(items) < limit or not items:
+        return
+    last = items[-1]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+        *(getattr(last, key) for key in keys)
+    )
+
+
+async def table_has_rows(session: AsyncSession, model) -> bool:
+    """Verifica se a tabela possui registros com um `SELECT EXISTS`, sem carregar as linhas"""
+    return (await session.exec(select(select(model.id).exists()))).one()
+
+
+def _parser_for(column) -> Callable[[Any], Any]:
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat
+    return python_type
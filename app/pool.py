@@ -0,0 +1,109 @@
+import logging
+import os
+import time
+from sqlalchemy import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Configuração do pool de conexões, lida junto com a `DATABASE_URL`
+POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "-1"))
+
+
+# O SQLAlchemy registra os eventos de cada pool no logger da classe (`app.pool.*`), que
+# herdaria o nível INFO do logger "app"; assim como os do `sqlalchemy.pool`, ficam restritos
+# aos avisos
+logging.getLogger(__name__).setLevel(logging.WARNING)
+
+
+class PoolWaitStats:
+    """Acumula quantos checkouts o pool atendeu e quanto tempo eles esperaram por uma conexão"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if timed_out:
+            self.timeouts += 1
+
+
+class _TimedPoolMixin:
+    """Mede o tempo que cada checkout passa esperando uma conexão livre no pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url, asynchronous: bool = False) -> dict:
+    """Argumentos de pool para `create_engine`/`create_async_engine`.
+
+    Bancos SQLite em memória mantêm o pool padrão do dialeto, já que cada
+    nova conexão abriria um banco vazio."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if asynchronous else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+    }
+
+
+def pool_status(engine: Engine) -> dict:
+    """Retorna o estado atual do pool: conexões em uso, overflow e tempo de espera por checkout"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=MAX_OVERFLOW,
+            timeout_seconds=pool.timeout(),
+        )
+
+    stats = getattr(pool, "wait_stats", None)
+    if stats is not None:
+        status.update(
+            checkouts=stats.checkouts,
+            checkout_timeouts=stats.timeouts,
+            wait_total_ms=round(stats.total_wait * 1000, 3),
+            wait_avg_ms=round(stats.total_wait * 1000 / stats.checkouts, 3)
+            if stats.checkouts
+            else 0.0,
+            wait_max_ms=round(stats.max_wait * 1000, 3),
+        )
+
+    return status
@@ -0,0 +1,82 @@
+import logging
+from sqlalchemy import Engine
+
+logger = logging.getLogger(__name__)
+
+# Consultas representativas das rotas, usadas para comparar os planos do SQLite
+QUERY_PATTERNS: dict[str, tuple[str, tuple]] = {
+    "create_schedule (duplicidade de data/cliente)": (
+        "SELECT id FROM schedule WHERE date_schedule = ? AND client_id = ?",
+        ("2025-01-01 10:00:00.000000", 1),
+    ),
+    "get_schedules_by_month (intervalo de datas)": (
+        "SELECT id FROM schedule WHERE date_schedule >= ? AND date_schedule < ? "
+        "ORDER BY date_schedule, id",
+        ("2025-01-01 00:00:00.000000", "2025-02-01 00:00:00.000000"),
+    ),
+    "delete_pet_for_client (agendamentos do pet)": (
+        "SELECT id FROM schedule WHERE pet_id = ?",
+        (1,),
+    ),
+    "create_pet_for_client (nome do pet por cliente)": (
+        "SELECT id FROM pet WHERE name = ? AND client_id = ?",
+        ("Rex", 1),
+    ),
+    "delete_service (vínculos do serviço)": (
+        "SELECT schedule_id FROM scheduleservices WHERE services_id = ?",
+        (1,),
+    ),
+    "load_schedule_services (serviços dos agendamentos)": (
+        "SELECT services_id FROM scheduleservices WHERE schedule_id IN (?, ?)",
+        (1, 2),
+    ),
+    "create_service (tipo de serviço)": (
+        "SELECT id FROM services WHERE type_service = ?",
+        ("Banho",),
+    ),
+    "get_services_by_category_price (faixa de preço)": (
+        "SELECT id FROM services WHERE price > ? AND price <= ?",
+        (50.0, 100.0),
+    ),
+}
+
+
+def capture_query_plans(engine: Engine) -> dict[str, str]:
+    """Executa `EXPLAIN QUERY PLAN` para cada consulta de `QUERY_PATTERNS`"""
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    plans = {}
+    with engine.connect() as connection:
+        for name, (sql, params) in QUERY_PATTERNS.items():
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)
+            plans[name] = "; ".join(row[-1] for row in rows)
+    return plans
+
+
+def compare_query_plans(before: dict[str, str], after: dict[str, str]) -> list[str]:
+    """Lista as consultas cujo plano deixou de fazer varredura completa (SCAN) e passou a usar índice (SEARCH)"""
+    report = []
+    for name, plan in after.items():
+        previous = before.get(name)
+        if previous is None or previous == plan:
+            continue
+        if "SCAN" in previous and "SEARCH" in plan:
+            report.append(f"{name}: {previous} -> {plan}")
+    return report
+
+
+def log_query_plan_report(before: dict[str, str], after: dict[str, str]) -> None:
+    """Registra no log o relatório de planos de consulta que passaram a usar índice"""
+    report = compare_query_plans(before, after)
+    if not report:
+        logger.info("Nenhum plano de consulta mudou de varredura para busca por índice")
+        return
+    logger.info("Planos de consulta que passaram a usar índice:\n%s", "\n".join(report))
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    for name, plan in capture_query_plans(engine).items():
+        print(f"{name}: {plan}")
@@ -0,0 +1,60 @@
+import os
+from fastapi import Request
+from app.database import READ_REPLICA, open_session
+
+# Segundos em que um cliente lê da engine principal depois de uma escrita, para ver a
+# própria escrita mesmo com a réplica de `DATABASE_READ_URL` atrasada; 0 desativa
+READ_STICKY_SECONDS = int(os.getenv("DATABASE_READ_STICKY_SECONDS", "5"))
+READ_STICKY_COOKIE = "db_read_primary"
+
+# Métodos que não alteram dados e, portanto, não ligam a leitura da engine principal
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def open_read_session(request: Request):
+    """Sessão na engine de leitura, exceto para o cliente que acabou de escrever (cookie
+    de `ReadAfterWriteMiddleware`), que lê da engine principal"""
+    return open_session(read=READ_STICKY_COOKIE not in request.cookies)
+
+
+async def get_read_session(request: Request):
+    """Dependência das rotas somente leitura, com a sessão de `open_read_session`"""
+    async with open_read_session(request) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+
+class ReadAfterWriteMiddleware:
+    """Middleware ASGI que, depois de uma escrita bem-sucedida, devolve um cookie que
+    faz as leituras do mesmo cliente irem para a engine principal por
+    `READ_STICKY_SECONDS` (read-your-writes). Só age com uma réplica configurada em
+    `DATABASE_READ_URL`; a leitura `mode=ro` do mesmo arquivo já vê todas as escritas"""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f"{READ_STICKY_COOKIE}=1; Max-Age={READ_STICKY_SECONDS}; Path=/; "
+            "HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in _SAFE_METHODS
+            or READ_STICKY_SECONDS <= 0
+            or not READ_REPLICA
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", self.cookie))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
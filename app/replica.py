@@ -0,0 +1,63 @@
+import argparse
+import sqlite3
+import time
+from sqlalchemy import make_url
+
+# Espera (segundos) entre as tentativas do backup quando a réplica está sendo lida
+REPLICA_BUSY_SLEEP = 0.005
+
+
+def sqlite_path(url: str) -> str:
+    """Caminho do arquivo de uma URL do SQLite (aceita `file:...?mode=ro&uri=true`)"""
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        raise ValueError(f"URL sem arquivo SQLite: {url}")
+    return database.removeprefix("file:")
+
+
+def sync_replica(source: str, target: str) -> float:
+    """Copia o banco `source` para `target` com a API de backup do SQLite e devolve o
+    tempo gasto (segundos).
+
+    Cada chamada copia o arquivo inteiro, em um único passo: serve para testar
+    localmente a engine de leitura com dois arquivos, não como replicação de produção.
+    As leituras na réplica continuam durante a cópia; o backup só espera as que já
+    estão em andamento."""
+    started = time.perf_counter()
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection, sleep=REPLICA_BUSY_SLEEP)
+    finally:
+        target_connection.close()
+        source_connection.close()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mantém uma cópia do banco da DATABASE_URL para usar como "
+        "DATABASE_READ_URL em testes locais"
+    )
+    parser.add_argument("replica", help="Arquivo da réplica (ex.: replica.db)")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Segundos entre as cópias",
+    )
+    parser.add_argument("--once", action="store_true", help="Copia uma única vez")
+    args = parser.parse_args()
+
+    from app.database import DATABASE_URL
+
+    source = sqlite_path(DATABASE_URL)
+    try:
+        while True:
+            elapsed = sync_replica(source, args.replica)
+            print(f"Réplica {args.replica} atualizada em {elapsed * 1000:.1f} ms")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
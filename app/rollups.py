@@ -0,0 +1,116 @@
+import argparse
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Engine, and_, delete, func, insert, or_
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.Schedule import Schedule, ScheduleDailySummary, ScheduleServices
+from app.models.Services import Services
+
+# Quantidade de dias recalculados por consulta em `refresh_days`
+DAYS_BATCH_SIZE = 100
+
+
+def _summary_statement():
+    """Agregado por dia: agendamentos, minutos e faturamento dos serviços vinculados"""
+    day = func.date(Schedule.date_schedule)
+    return (
+        select(
+            day,
+            func.count(func.distinct(Schedule.id)),
+            func.coalesce(func.sum(Services.duration_in_minutes), 0),
+            func.coalesce(func.sum(Services.price), 0.0),
+        )
+        .outerjoin(ScheduleServices, ScheduleServices.schedule_id == Schedule.id)
+        .outerjoin(Services, Services.id == ScheduleServices.services_id)
+        .group_by(day)
+    )
+
+
+def _summary_values(rows) -> list[dict]:
+    # No SQLite `date()` devolve texto; em outros bancos já vem como `date`.
+    # A soma em ponto flutuante depende da ordem das linhas do join; o faturamento é
+    # arredondado a centavos para que os mesmos agendamentos gravem o mesmo valor
+    return [
+        {
+            "day": day if isinstance(day, date) else date.fromisoformat(day),
+            "appointments": appointments,
+            "total_minutes": total_minutes,
+            "revenue": round(revenue, 2),
+        }
+        for day, appointments, total_minutes, revenue in rows
+    ]
+
+
+def _day_range(day: date):
+    return and_(
+        Schedule.date_schedule >= datetime.combine(day, time.min),
+        Schedule.date_schedule < datetime.combine(day + timedelta(days=1), time.min),
+    )
+
+
+def schedule_day(moment: datetime) -> date:
+    """Dia de um agendamento, como gravado no banco (sem fuso)"""
+    return moment.replace(tzinfo=None).date()
+
+
+async def refresh_days(session: AsyncSession, days: Iterable[date]) -> None:
+    """Recalcula o resumo dos dias informados dentro da transação da sessão.
+
+    Deve ser chamada depois das alterações nos agendamentos e antes do commit;
+    cada dia é lido pelo índice de `date_schedule`, então o custo depende apenas
+    dos agendamentos dos dias alterados."""
+    days = sorted(set(days))
+    if not days:
+        return
+
+    await session.flush()
+    for start in range(0, len(days), DAYS_BATCH_SIZE):
+        batch = days[start : start + DAYS_BATCH_SIZE]
+        rows = await session.exec(
+            _summary_statement().where(or_(*(_day_range(day) for day in batch)))
+        )
+        values = _summary_values(rows.all())
+
+        await session.execute(
+            delete(ScheduleDailySummary)
+            .where(ScheduleDailySummary.day.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        if values:
+            await session.execute(insert(ScheduleDailySummary), values)
+
+
+async def service_days(session: AsyncSession, service_id: int) -> set[date]:
+    """Dias que têm agendamentos com o serviço informado"""
+    rows = await session.exec(
+        select(Schedule.date_schedule)
+        .join(ScheduleServices, ScheduleServices.schedule_id == Schedule.id)
+        .where(ScheduleServices.services_id == service_id)
+    )
+    return {schedule_day(moment) for moment in rows.all()}
+
+
+def rebuild_daily_summary(engine: Engine) -> int:
+    """Reconstrói todo o resumo diário a partir dos agendamentos existentes.
+    Retorna a quantidade de dias gravados"""
+    with Session(engine) as session:
+        values = _summary_values(session.exec(_summary_statement()).all())
+        session.execute(delete(ScheduleDailySummary))
+        if values:
+            session.execute(insert(ScheduleDailySummary), values)
+        session.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Manutenção do resumo diário de agendamentos"
+    )
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    print(f"Resumo diário reconstruído: {rebuild_daily_summary(engine)} dia(s)")
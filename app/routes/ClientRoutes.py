@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
+import io
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, UploadFile
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import joinedload
-from app.models.Client import Client, ClientBaseWithPets
+from app.models.Client import Client, ClientBaseWithPets, ClientImportReport
+from app.ids import accept_legacy_id
+from app.importer import IMPORT_CHUNK_SIZE, import_clients_csv
 from app.database import get_session
-from sqlalchemy import func
+from app.read_routing import get_read_session
+from app.counters import adjust_counter, read_counter
+from app.fieldsets import Fieldset, sparse_fields
+from app.pagination import keyset_page, set_next_cursor
+from app.serialization import json_response
+from app.statements import client_id_by_cpf, client_with_pets
+from app.write_queue import get_write_session, queued_write
+from app.cascades import bulk_delete, delete_schedules
+from sqlalchemy import or_
 from app.models.Schedule import Schedule, ScheduleBase
 from app.models.Pet import Pet
 
@@ -14,110 +26,165 @@ router = APIRouter(
 
 
 @router.post("/", response_model=Client)
-def creat_client(client: Client, session: Session = Depends(get_session)):
+@queued_write
+async def creat_client(
+    client: Client, session: AsyncSession = Depends(get_write_session)
+):
     """Endpoint para criar um novo Cliente"""
-    if client.id == 0:
-        max_id = session.query(func.max(Client.id)).scalar()
-        client.id = max_id + 1 if max_id is not None else 1
+    accept_legacy_id(client)
 
-    existing_client = session.exec(
-        select(Client).where(Client.cpf == client.cpf)
-    ).first()
+    existing_client = (
+        await session.execute(client_id_by_cpf(client.cpf))
+    ).scalar_one_or_none()
     if existing_client:
         raise HTTPException(
             status_code=400, detail=f"O CPF '{client.cpf}' já está cadastrado."
         )
 
     session.add(client)
-    session.commit()
-    session.refresh(client)
+    await adjust_counter(session, Client, 1)
+    await session.commit()
+    await session.refresh(client)
     return client
 
 
+@router.post("/import", response_model=ClientImportReport)
+async def import_clients(
+    file: UploadFile,
+    chunk_size: int = Query(default=IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    delimiter: str = Query(default=",", min_length=1, max_length=1),
+    session: AsyncSession = Depends(get_session),
+):
+    """Endpoint que importa clientes e pets de um arquivo CSV (uma linha por pet, com os dados
+    do cliente repetidos). O arquivo é lido e gravado em lotes de `chunk_size` linhas, cada
+    um com seu commit; linhas inválidas são rejeitadas sem interromper a importação"""
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return await import_clients_csv(
+            session, text, delimiter=delimiter, chunk_size=chunk_size
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    finally:
+        text.detach()
+
+
 @router.get("/", response_model=list[ClientBaseWithPets])
-def read_clients(
-    offset: int = 0,
+async def read_clients(
+    response: Response,
+    cursor: str | None = None,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session),
+    fieldset: Fieldset | None = Depends(sparse_fields(list[ClientBaseWithPets])),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Endpoint que retorna todos os clientes e seus pets"""
-    statement = (
-        select(Client).offset(offset).limit(limit).options(joinedload(Client.pets))
+    """Endpoint que retorna todos os clientes e seus pets ordenados pelo `id`.
+    O cursor da próxima página é retornado no header `X-Next-Cursor`.
+    Com `fields` e `include`, devolve e carrega do banco apenas os campos e relações pedidos"""
+    if fieldset is None:
+        options = [joinedload(Client.pets)]
+    else:
+        options = [fieldset.load_only(Client), *fieldset.joinedloads(Client, "pets")]
+    statement = keyset_page(
+        select(Client).options(*options), [Client.id], cursor, limit
     )
-    return session.exec(statement).unique().all()
+    if cursor is None and offset:
+        statement = statement.offset(offset)
+
+    clients = (await session.exec(statement)).unique().all()
+    set_next_cursor(response, clients, ["id"], limit)
+    if fieldset is not None:
+        return fieldset.response(clients, response)
+    return json_response(list[ClientBaseWithPets], clients, response)
 
 
 @router.get("/{client_id}", response_model=ClientBaseWithPets)
-def get_client_by_id(client_id: int, session: Session = Depends(get_session)):
+async def get_client_by_id(
+    client_id: int,
+    fieldset: Fieldset | None = Depends(sparse_fields(ClientBaseWithPets)),
+    session: AsyncSession = Depends(get_read_session),
+):
     """Endpoint que retorna um cliente e seus pets a partir de um `client_id`"""
-    statement = (
-        select(Client).where(Client.id == client_id).options(joinedload(Client.pets))
-    )
-
-    client = session.exec(statement).first()
+    if fieldset is None:
+        statement = client_with_pets(client_id)
+    else:
+        statement = (
+            select(Client)
+            .where(Client.id == client_id)
+            .options(fieldset.load_only(Client), *fieldset.joinedloads(Client, "pets"))
+        )
+    client = (await session.execute(statement)).unique().scalars().first()
 
     if not client:
         raise HTTPException(
             status_code=404, detail=f"Cliente com ID {client_id} não encontrado"
         )
 
+    if fieldset is not None:
+        return fieldset.response(client)
     return client
 
 
 @router.put("/{client_id}", response_model=Client)
-def update_client(
-    client_id: int, client: Client, session: Session = Depends(get_session)
+@queued_write
+async def update_client(
+    client_id: int, client: Client, session: AsyncSession = Depends(get_write_session)
 ):
     """Endpoint que atualiza os dados de um cliente a partir de um `client_id`"""
-    db_client = session.get(Client, client_id)
+    db_client = await session.get(Client, client_id)
     if not db_client:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
 
-    for key, value in client.model_dump(exclude_unset=True).items():
+    # O id vem do caminho; o `"id": 0` enviado por clientes antigos é ignorado
+    for key, value in client.model_dump(exclude_unset=True, exclude={"id"}).items():
         setattr(db_client, key, value)
 
-    session.commit()
-    session.refresh(db_client)
+    await session.commit()
+    await session.refresh(db_client)
 
     return db_client
 
 
 @router.delete("/{client_id}")
-def delete_client(client_id: int, session: Session = Depends(get_session)):
+async def delete_client(client_id: int, session: AsyncSession = Depends(get_session)):
     """Endpoint que deleta um cliente, seus pets e os agendamentos que estão associados a ele a partir de um `client_id`"""
-    client = session.get(Client, client_id)
+    client = await session.get(Client, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
 
-    schedules_to_delete = (
-        session.query(Schedule).filter(Schedule.client_id == client_id).all()
+    client_pets = select(Pet.id).where(Pet.client_id == client_id)
+    await delete_schedules(
+        session,
+        or_(Schedule.client_id == client_id, Schedule.pet_id.in_(client_pets)),
     )
-    for schedule in schedules_to_delete:
-        session.delete(schedule)
 
-    pets_to_delete = session.query(Pet).filter(Pet.client_id == client_id).all()
-    for pet in pets_to_delete:
-        session.delete(pet)
+    deleted_pets = (
+        await session.execute(bulk_delete(Pet, Pet.client_id == client_id))
+    ).rowcount
+    await session.execute(bulk_delete(Client, Client.id == client_id))
 
-    session.delete(client)
-    session.commit()
+    await adjust_counter(session, Pet, -deleted_pets)
+    await adjust_counter(session, Client, -1)
+    await session.commit()
 
     return {"ok": True}
 
 
 @router.get("/get_schedule/{client_id}", response_model=list[ScheduleBase])
-def get_client_schedules(client_id: int, session: Session = Depends(get_session)):
+async def get_client_schedules(
+    client_id: int, session: AsyncSession = Depends(get_read_session)
+):
     """Endpoint que realiza a busca dos agendamentos que estão associados ao cliente por um `client_id`"""
     # Buscar o cliente
     statement = select(Client).where(Client.id == client_id)
-    client = session.exec(statement).first()
+    client = (await session.exec(statement)).first()
 
     if not client:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
 
     # Buscar os agendamentos do cliente
-    schedules = session.exec(
-        select(Schedule).where(Schedule.client_id == client_id)
+    schedules = (
+        await session.exec(select(Schedule).where(Schedule.client_id == client_id))
     ).all()
 
     if not schedules:
@@ -125,4 +192,10 @@ def get_client_schedules(client_id: int, session: Session = Depends(get_session)
             status_code=404, detail="Nenhum agendamento encontrado para este cliente"
         )
 
-    return schedules
+    return json_response(list[ScheduleBase], schedules)
+
+
+@router.get("/total-clients/", response_model=int)
+async def get_total_clients(session: AsyncSession = Depends(get_read_session)):
+    """Endpoint que retorna o total de clientes cadastrados"""
+    return await read_counter(session, Client)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from app.cache import services_cache
+from app.database import database_pool_status
+from app.write_queue import write_queue
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+)
+
+
+@router.get("/pool")
+async def get_pool_status():
+    """Endpoint que retorna o estado dos pools de conexão: conexões em uso, overflow e tempo de espera por conexão"""
+    return database_pool_status()
+
+
+@router.get("/cache")
+async def get_cache_status():
+    """Endpoint que retorna as estatísticas dos caches em memória deste worker: tamanho, acertos, falhas e taxa de acerto"""
+    return {"services": services_cache.stats()}
+
+
+@router.get("/write-queue")
+async def get_write_queue_status():
+    """Endpoint que retorna o estado da fila de escritas deste worker: lotes gravados, escritas por lote e escritas aguardando"""
+    return write_queue.stats()
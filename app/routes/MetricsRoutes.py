@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from app.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Endpoint que retorna as métricas deste worker no formato de texto do Prometheus:
+    requisições, latência, consultas e acertos do cache de SQL compilado por rota,
+    threadpool e pools de conexão"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
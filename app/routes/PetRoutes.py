@@ -1,11 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import joinedload
-from sqlmodel import Session, select
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.database import get_session
+from app.read_routing import get_read_session
+from app.ids import accept_legacy_id
+from app.counters import adjust_counter, read_counter
+from app.fieldsets import Fieldset, sparse_fields
+from app.pagination import keyset_page, set_next_cursor, table_has_rows
+from app.search import pet_search_statement
+from app.serialization import json_response
+from app.statements import client_with_pets, pet_id_by_client_name
+from app.write_queue import get_write_session, queued_write
+from app.cascades import bulk_delete, delete_schedules
 from typing import Optional
 from app.models.Pet import Pet, PetUpdate
-from app.models.Client import Client
-from app.models.Schedule import ScheduleServices, Schedule
+from app.models.Schedule import Schedule
 
 
 router = APIRouter(
@@ -15,24 +24,23 @@ router = APIRouter(
 
 
 @router.post("/{client_id}/pet/", response_model=Pet)
-def create_pet_for_client(
-    client_id: int, pet: Pet, session: Session = Depends(get_session)
+@queued_write
+async def create_pet_for_client(
+    client_id: int, pet: Pet, session: AsyncSession = Depends(get_write_session)
 ):
     """Endpoint que cria um novo pet associado a um cliente a partir do `client_id`"""
-    statement = (
-        select(Client).options(joinedload(Client.pets)).where(Client.id == client_id)
+    client = (
+        (await session.execute(client_with_pets(client_id))).unique().scalars().first()
     )
 
-    client = session.exec(statement).unique().all()
-
     if not client:
         raise HTTPException(
             status_code=404, detail=f"Client com o ID {client_id} não encontrado"
         )
 
-    pet_name_existing = session.exec(
-        select(Pet).where(Pet.name == pet.name, Pet.client_id == client_id)
-    ).first()
+    pet_name_existing = (
+        await session.execute(pet_id_by_client_name(client_id, pet.name))
+    ).scalar_one_or_none()
 
     if pet_name_existing:
         raise HTTPException(
@@ -40,89 +48,94 @@ def create_pet_for_client(
             detail=f"O cliente {client_id} já apresenta um Pet com o nome {pet.name} cadastrado",
         )
 
+    accept_legacy_id(pet)
     pet.client_id = client_id
     session.add(pet)
-    session.commit()
-    session.refresh(pet)
+    await adjust_counter(session, Pet, 1)
+    await session.commit()
+    await session.refresh(pet)
     return pet
 
 
 @router.get("/", response_model=list[Pet])
-def read_pets(
-    offset: int = 0,
+async def read_pets(
+    response: Response,
+    cursor: str | None = None,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session),
+    fieldset: Fieldset | None = Depends(sparse_fields(list[Pet])),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Endpoint que retorna todos os pets cadastrados no sistema,
-    utilizando do offset e do limit para restriguir a quantidades de pets retornados"""
-    statement = select(Pet)
-
-    pets = session.exec(statement).all()
-
-    if not pets:
+    """Endpoint que retorna todos os pets cadastrados no sistema ordenados pelo `id`,
+    utilizando do cursor e do limit para restriguir a quantidades de pets retornados.
+    O cursor da próxima página é retornado no header `X-Next-Cursor`.
+    Com `fields`, devolve e carrega do banco apenas os campos pedidos"""
+    if not await table_has_rows(session, Pet):
         raise HTTPException(status_code=404, detail="Nenhum pet cadastrado")
 
-    statement = select(Pet).offset(offset).limit(limit)
-    return session.exec(statement).unique().all()
+    statement = select(Pet)
+    if fieldset is not None:
+        statement = statement.options(fieldset.load_only(Pet))
+    statement = keyset_page(statement, [Pet.id], cursor, limit)
+    if cursor is None and offset:
+        statement = statement.offset(offset)
+
+    pets = (await session.exec(statement)).all()
+    set_next_cursor(response, pets, ["id"], limit)
+    if fieldset is not None:
+        return fieldset.response(pets, response)
+    return json_response(list[Pet], pets, response)
 
 
 @router.get("/{client_id}", response_model=list[Pet])
-def read_pet_for_client(client_id: int, session: Session = Depends(get_session)):
+async def read_pet_for_client(
+    client_id: int, session: AsyncSession = Depends(get_read_session)
+):
     """Endpoint que retorna um pet associado a um `client_id` de um cliente"""
 
-    statement = (
-        select(Client).options(joinedload(Client.pets)).where(Client.id == client_id)
+    client = (
+        (await session.execute(client_with_pets(client_id))).unique().scalars().first()
     )
 
-    client = session.exec(statement).first()
-
     if not client:
         raise HTTPException(
             status_code=404, detail=f"Cliente com ID {client_id} não encontrado"
         )
 
-    return client.pets
+    return json_response(list[Pet], client.pets)
 
 
 @router.delete("/{client_id}/pets/{pet_id}")
-def delete_pet_for_client(
-    client_id: int, pet_id: int, session: Session = Depends(get_session)
+async def delete_pet_for_client(
+    client_id: int, pet_id: int, session: AsyncSession = Depends(get_session)
 ):
     """Endpoint que deleta o pet pelo `client_id` do cliente e o `pet_id` do pet que são fornecidos"""
-    pet = session.get(Pet, pet_id)
+    pet = await session.get(Pet, pet_id)
 
     if not pet or pet.client_id != client_id:
         raise HTTPException(status_code=404, detail="Pet não encontrado")
 
-    schedules = session.exec(select(Schedule).where(Schedule.pet_id == pet_id)).all()
-
-    for schedule in schedules:
-        scheduleService = session.exec(
-            select(ScheduleServices).where(ScheduleServices.schedule_id == schedule.id)
-        ).all()
-
-        for schedule_service in scheduleService:
-            session.delete(schedule_service)
-
-        session.delete(schedule)
+    await delete_schedules(session, Schedule.pet_id == pet_id)
+    await session.execute(bulk_delete(Pet, Pet.id == pet_id))
 
-    session.delete(pet)
-    session.commit()
+    await adjust_counter(session, Pet, -1)
+    await session.commit()
     return {"ok": True}
 
 
 @router.put("/{client_id}/pets/{pet_id}")
-def update_pet_for_client(
+@queued_write
+async def update_pet_for_client(
     client_id: int,
     pet_id: int,
     pet_update: PetUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Endpoint que realiza a atualização de dados de um pet, a partir do `client_id` e do `pet_id` que estão sendo passados"""
 
     statement = select(Pet).where(Pet.id == pet_id)
 
-    pet = session.exec(statement).first()
+    pet = (await session.exec(statement)).first()
 
     if not pet or pet.client_id != client_id:
         raise HTTPException(status_code=404, detail="Pet não encontrado")
@@ -131,39 +144,41 @@ def update_pet_for_client(
         setattr(pet, key, value)
 
     session.add(pet)
-    session.commit()
-    session.refresh(pet)
+    await session.commit()
+    await session.refresh(pet)
 
     return pet
 
 
 # busca por texto parcial
 @router.get("/{pet_name}/pet-name", response_model=list[Pet])
-def get_pet_by_name(
+async def get_pet_by_name(
     pet_name: str,
     client_id: Optional[int] = None,
     offset: int = 0,
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """
     Endpoint para buscar pets por texto parcial ou completo.
     Se `client_id` for passado, a busca será filtrada pelos pets do cliente.
     Caso contrário, a busca será realizada em todos os pets.
+    No SQLite a busca usa o índice de texto e ordena pela qualidade da correspondência.
     """
 
-    statement = (
-        select(Pet).offset(offset).limit(limit).where(Pet.name.ilike(f"%{pet_name}%"))
-    )
-
-    if client_id is not None:
-        statement = statement.where(Pet.client_id == client_id)
+    statement = pet_search_statement(pet_name, client_id, offset, limit)
 
-    pets = session.exec(statement).all()
+    pets = (await session.exec(statement)).all()
 
     if not pets:
         raise HTTPException(
             status_code=404, detail="Nenhum pet encontrado para a busca realizada"
         )
 
-    return pets
+    return json_response(list[Pet], pets)
+
+
+@router.get("/total-pets/", response_model=int)
+async def get_total_pets(session: AsyncSession = Depends(get_read_session)):
+    """Endpoint que retorna o total de pets cadastrados"""
+    return await read_counter(session, Pet)
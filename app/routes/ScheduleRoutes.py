@@ -1,16 +1,52 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
+from enum import Enum
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, Body
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.availability import (
+    appointment_end,
+    conflict_detail,
+    load_agenda,
+    naive,
+    schedule_duration,
+    service_durations,
+)
+from app.counters import adjust_counter, read_counter
 from app.database import get_session
-from app.models.Services import Services
+from app.read_routing import get_read_session, open_read_session
+from app.export import accepts_gzip, export_schedules
+from app.fieldsets import Fieldset, sparse_fields
+from app.ids import accept_legacy_id, insert_rows, schedule_id_allocator
+from app.loaders import fetch_schedules, select_schedules
+from app.pagination import keyset_page, set_next_cursor
+from app.rollups import refresh_days, schedule_day
+from app.serialization import json_response
+from app.statements import schedule_by_id, schedule_id_by_client_date
+from app.write_queue import get_write_session, queued_write
 from app.models.Pet import Pet
 from app.models.Schedule import (
+    AvailabilitySlot,
     Schedule,
+    ScheduleBulkItem,
+    ScheduleBulkResult,
+    ScheduleDailySummary,
     ScheduleServices,
     ScheduleWithClientPetServices,
 )
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import insert, tuple_
+from datetime import date, datetime, time, timedelta
+import calendar
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
 
 
 router = APIRouter(
@@ -20,8 +56,11 @@ router = APIRouter(
 
 
 @router.post("/", response_model=Schedule)
-def create_schedule(
-    schedule: Schedule, service_ids: list[int], session: Session = Depends(get_session)
+@queued_write
+async def create_schedule(
+    schedule: Schedule,
+    service_ids: list[int],
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Endpoint que realiza a criação de um novo agendamento, informando um cliente, um pet e os serviços que estarão nesse agendamento"""
 
@@ -30,7 +69,7 @@ def create_schedule(
             schedule.date_schedule.replace("Z", "+00:00")
         )
 
-    pet = session.get(Pet, schedule.pet_id)
+    pet = await session.get(Pet, schedule.pet_id)
     if not pet:
         raise HTTPException(status_code=404, detail="Pet não encontrado")
 
@@ -39,12 +78,11 @@ def create_schedule(
             status_code=400, detail="Este pet não pertence ao cliente informado"
         )
 
-    schedule_existing = session.exec(
-        select(Schedule).where(
-            Schedule.date_schedule == schedule.date_schedule,
-            Schedule.client_id == schedule.client_id,
+    schedule_existing = (
+        await session.execute(
+            schedule_id_by_client_date(schedule.client_id, schedule.date_schedule)
         )
-    ).first()
+    ).scalar_one_or_none()
 
     if schedule_existing:
         raise HTTPException(
@@ -52,91 +90,316 @@ def create_schedule(
             detail=f"Já existe um agendamento com a data {schedule.date_schedule} cadastrado!",
         )
 
-    if schedule.id == 0:
-        max_id = session.query(func.max(Schedule.id)).scalar()
-        schedule.id = max_id + 1 if max_id is not None else 1
+    # Valida todos os serviços antes de gravar, para não deixar agendamento sem serviço
+    service_ids = list(dict.fromkeys(service_ids))
+    durations = await service_durations(session, service_ids, fresh=True)
+    for service_id in service_ids:
+        if service_id not in durations:
+            raise HTTPException(
+                status_code=404, detail=f"Serviço com ID {service_id} não encontrado"
+            )
 
+    start = naive(schedule.date_schedule)
+    end = appointment_end(start, sum(durations.values()))
+    agenda = await load_agenda(
+        session, start.date(), end.date(), client_ids=[schedule.client_id]
+    )
+    if not agenda.is_free(schedule.client_id, start, end):
+        raise HTTPException(status_code=400, detail=conflict_detail(start, end))
+
+    accept_legacy_id(schedule)
     session.add(schedule)
-    session.commit()
-    session.refresh(schedule)
+    await session.flush()
+
+    for service_id in service_ids:
+        session.add(ScheduleServices(schedule_id=schedule.id, services_id=service_id))
+
+    await refresh_days(session, [start.date()])
+    await adjust_counter(session, Schedule, 1)
+    await session.commit()
+    await session.refresh(schedule)
+
+    return schedule
+
+
+@router.post("/bulk", response_model=list[ScheduleBulkResult])
+async def create_schedules_bulk(
+    items: list[ScheduleBulkItem] = Body(max_length=1000),
+    session: AsyncSession = Depends(get_session),
+):
+    """Endpoint que cria vários agendamentos de uma vez (ex.: importação de um dia inteiro).
+    Pets, clientes e serviços são validados com uma consulta por tabela, e os agendamentos
+    válidos e seus serviços são gravados em uma única transação.
+    Retorna o resultado de cada item, na mesma ordem do envio"""
+    results = [
+        ScheduleBulkResult(index=index, status_code=200) for index in range(len(items))
+    ]
+    if not items:
+        return results
+
+    pet_ids = {item.pet_id for item in items}
+    service_ids = {service_id for item in items for service_id in item.service_ids}
+    keys = [(item.client_id, naive(item.date_schedule)) for item in items]
+
+    pet_owners = dict(
+        (
+            await session.exec(select(Pet.id, Pet.client_id).where(Pet.id.in_(pet_ids)))
+        ).all()
+    )
+    durations = await service_durations(session, service_ids, fresh=True)
+    existing_keys = set(
+        (
+            await session.exec(
+                select(Schedule.client_id, Schedule.date_schedule).where(
+                    tuple_(Schedule.client_id, Schedule.date_schedule).in_(set(keys))
+                )
+            )
+        ).all()
+    )
+
+    spans = [
+        (
+            start,
+            appointment_end(
+                start,
+                sum(
+                    durations.get(service_id, 0)
+                    for service_id in dict.fromkeys(item.service_ids)
+                ),
+            ),
+        )
+        for (_, start), item in zip(keys, items)
+    ]
+    agenda = await load_agenda(
+        session,
+        min(start for start, _ in spans).date(),
+        max(end for _, end in spans).date(),
+        client_ids={item.client_id for item in items},
+    )
 
+    valid: list[int] = []
+    for index, item in enumerate(items):
+        result = results[index]
+        missing_service = next(
+            (
+                service_id
+                for service_id in item.service_ids
+                if service_id not in durations
+            ),
+            None,
+        )
+        if item.pet_id not in pet_owners:
+            result.status_code, result.detail = 404, "Pet não encontrado"
+        elif pet_owners[item.pet_id] != item.client_id:
+            result.status_code, result.detail = (
+                400,
+                "Este pet não pertence ao cliente informado",
+            )
+        elif keys[index] in existing_keys:
+            result.status_code, result.detail = (
+                400,
+                f"Já existe um agendamento com a data {item.date_schedule} cadastrado!",
+            )
+        elif missing_service is not None:
+            result.status_code, result.detail = (
+                404,
+                f"Serviço com ID {missing_service} não encontrado",
+            )
+        elif not agenda.is_free(item.client_id, *spans[index]):
+            result.status_code, result.detail = 400, conflict_detail(*spans[index])
+        else:
+            # Itens do próprio lote também ocupam a agenda e contam como duplicados
+            existing_keys.add(keys[index])
+            agenda.add(item.client_id, *spans[index])
+            valid.append(index)
+
+    if not valid:
+        return results
+
+    # No SQLite os ids vêm de um bloco já reservado (hi/lo): agendamentos e serviços são
+    # gravados com `executemany`, sem precisar ler os ids gerados de volta
+    schedule_ids = await insert_rows(
+        session,
+        Schedule,
+        [
+            {
+                "date_schedule": items[index].date_schedule,
+                "client_id": items[index].client_id,
+                "pet_id": items[index].pet_id,
+            }
+            for index in valid
+        ],
+        await schedule_id_allocator.allocate(len(valid)),
+    )
+
+    links = []
+    for index, schedule_id in zip(valid, schedule_ids):
+        results[index].id = schedule_id
+        links.extend(
+            {"schedule_id": schedule_id, "services_id": service_id}
+            for service_id in dict.fromkeys(items[index].service_ids)
+        )
+
+    if links:
+        await session.execute(insert(ScheduleServices), links)
+    await refresh_days(session, (spans[index][0].date() for index in valid))
+    await adjust_counter(session, Schedule, len(valid))
+    await session.commit()
+
+    return results
+
+
+@router.get("/availability", response_model=list[AvailabilitySlot])
+async def get_availability(
+    day: date = Query(alias="date"),
+    service_ids: list[int] = Query(default=[]),
+    client_id: int | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Endpoint que retorna os horários livres de um dia para um atendimento com os serviços informados.
+    A duração do atendimento é a soma das durações dos serviços. Com `client_id`, os horários
+    que se sobrepõem aos atendimentos do próprio cliente também ficam de fora"""
+    service_ids = list(dict.fromkeys(service_ids))
+    durations = await service_durations(session, service_ids)
     for service_id in service_ids:
-        service = session.get(Services, service_id)
-        if not service:
+        if service_id not in durations:
             raise HTTPException(
                 status_code=404, detail=f"Serviço com ID {service_id} não encontrado"
             )
 
-        association = ScheduleServices(schedule_id=schedule.id, services_id=service_id)
-        session.add(association)
+    agenda = await load_agenda(
+        session,
+        day,
+        day + timedelta(days=1),
+        client_ids=None if client_id is None else [client_id],
+    )
+    return json_response(
+        list[AvailabilitySlot],
+        [
+            AvailabilitySlot(start=start, end=end)
+            for start, end in agenda.free_slots(day, sum(durations.values()), client_id)
+        ],
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_schedules_by_period(
+    request: Request,
+    date_from: date | None = Query(default=None, alias="from"),
+    date_to: date | None = Query(default=None, alias="to"),
+    output_format: ExportFormat = Query(default=ExportFormat.ndjson, alias="format"),
+):
+    """Endpoint que exporta os agendamentos de um período (`from` e `to`, inclusivos) com
+    cliente, pet e serviços, em NDJSON ou CSV. As linhas são enviadas em streaming à medida
+    que são lidas do banco, e o corpo é comprimido com gzip quando o cliente aceita"""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=400, detail="A data inicial deve ser anterior à data final"
+        )
 
-    session.commit()
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), time.min) if date_to else None
 
-    schedule = session.query(Schedule).filter(Schedule.id == schedule.id).first()
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
 
-    return schedule
+    headers = {
+        "Content-Disposition": f'attachment; filename="schedules.{output_format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export_schedules(
+            open_read_session(request), start, end, output_format.value, compress
+        ),
+        media_type=EXPORT_MEDIA_TYPES[output_format],
+        headers=headers,
+    )
 
 
 @router.get("/", response_model=list[ScheduleWithClientPetServices])
-def read_schedules(
-    offset: int = 0,
+async def read_schedules(
+    response: Response,
+    cursor: str | None = None,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session),
+    fieldset: Fieldset | None = Depends(
+        sparse_fields(list[ScheduleWithClientPetServices])
+    ),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Endpoint que retorna todos os agendamentos cadastrados com o cliente, o pet e os serviços que estão associados aos agendamentos"""
-    statement = (
-        select(Schedule)
-        .offset(offset)
-        .limit(limit)
-        .options(
-            joinedload(Schedule.client),
-            joinedload(Schedule.pet),
-            joinedload(Schedule.services),
-        )
+    """Endpoint que retorna todos os agendamentos cadastrados com o cliente, o pet e os serviços que estão associados aos agendamentos,
+    ordenados por `date_schedule` e `id`. O cursor da próxima página é retornado no header `X-Next-Cursor`.
+    Com `fields` e `include`, devolve e carrega do banco apenas os campos e relações pedidos"""
+    statement = keyset_page(
+        select_schedules(fieldset),
+        [Schedule.date_schedule, Schedule.id],
+        cursor,
+        limit,
     )
-    return session.exec(statement).unique().all()
+    if cursor is None and offset:
+        statement = statement.offset(offset)
+
+    schedules = await fetch_schedules(
+        session, statement, services=fieldset is None or fieldset.includes("services")
+    )
+    set_next_cursor(response, schedules, ["date_schedule", "id"], limit)
+    if fieldset is not None:
+        return fieldset.response(schedules, response)
+    return json_response(list[ScheduleWithClientPetServices], schedules, response)
 
 
 @router.get("/{schedule_id}", response_model=ScheduleWithClientPetServices)
-def get_schedule_by_id(schedule_id: int, session: Session = Depends(get_session)):
+async def get_schedule_by_id(
+    schedule_id: int,
+    fieldset: Fieldset | None = Depends(sparse_fields(ScheduleWithClientPetServices)),
+    session: AsyncSession = Depends(get_read_session),
+):
     """Endpoint que retorna um agendamento a partir do `schedule_id`"""
-    statement = (
-        select(Schedule)
-        .where(Schedule.id == schedule_id)
-        .options(
-            joinedload(Schedule.client),
-            joinedload(Schedule.pet),
-            joinedload(Schedule.services),
+    if fieldset is None:
+        schedules = await fetch_schedules(session, schedule_by_id(schedule_id))
+    else:
+        schedules = await fetch_schedules(
+            session,
+            select_schedules(fieldset).where(Schedule.id == schedule_id),
+            services=fieldset.includes("services"),
         )
-    )
 
-    schedule = session.exec(statement).first()
-
-    if not schedule:
+    if not schedules:
         raise HTTPException(
             status_code=404, detail=f"Agendamento com ID {schedule_id} não encontrado"
         )
 
-    return schedule
+    if fieldset is not None:
+        return fieldset.response(schedules[0])
+    return schedules[0]
 
 
 @router.delete("/{schedule_id}")
-def delete_schedule(schedule_id: int, session: Session = Depends(get_session)):
+async def delete_schedule(
+    schedule_id: int, session: AsyncSession = Depends(get_session)
+):
     """Endpoint que deleta um agandamento a partir de um `schedule_id`"""
-    schedule = session.get(Schedule, schedule_id)
+    schedule = await session.get(Schedule, schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
-    session.delete(schedule)
-    session.commit()
+    await session.delete(schedule)
+    await refresh_days(session, [schedule_day(schedule.date_schedule)])
+    await adjust_counter(session, Schedule, -1)
+    await session.commit()
     return {"ok": True}
 
 
 @router.put("/{schedule_id}", response_model=Schedule)
-def update_schedule(
-    schedule_id: int, schedule: Schedule, session: Session = Depends(get_session)
+@queued_write
+async def update_schedule(
+    schedule_id: int,
+    schedule: Schedule,
+    session: AsyncSession = Depends(get_write_session),
 ):
     """Endpoint que atualiza os dados de um agendamento a partir de um `schedule_id`"""
-    db_schedule = session.get(Schedule, schedule_id)
+    db_schedule = await session.get(Schedule, schedule_id)
 
     if not db_schedule:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
@@ -148,18 +411,40 @@ def update_schedule(
             update_data["date_schedule"].replace("Z", "+00:00")
         )
 
+    # Mudar o horário ou o cliente pode colocar o atendimento sobre outro do cliente
+    if update_data.keys() & {"date_schedule", "client_id"}:
+        start = naive(update_data.get("date_schedule", db_schedule.date_schedule))
+        end = appointment_end(start, await schedule_duration(session, schedule_id))
+        client_id = update_data.get("client_id", db_schedule.client_id)
+        agenda = await load_agenda(
+            session,
+            start.date(),
+            end.date(),
+            client_ids=[client_id],
+            exclude_id=schedule_id,
+        )
+        if not agenda.is_free(client_id, start, end):
+            raise HTTPException(status_code=400, detail=conflict_detail(start, end))
+
+    previous_day = schedule_day(db_schedule.date_schedule)
     for key, value in update_data.items():
         setattr(db_schedule, key, value)
 
-    session.commit()
-    session.refresh(db_schedule)
+    await refresh_days(session, {previous_day, schedule_day(db_schedule.date_schedule)})
+    await session.commit()
+    await session.refresh(db_schedule)
 
     return db_schedule
 
 
 @router.get("/{year}/{month}", response_model=list[ScheduleWithClientPetServices])
-def get_schedules_by_month(
-    year: int, month: int, session: Session = Depends(get_session)
+async def get_schedules_by_month(
+    year: int,
+    month: int,
+    fieldset: Fieldset | None = Depends(
+        sparse_fields(list[ScheduleWithClientPetServices])
+    ),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Endpoint que retorna os agendamentos que foram castrados em um determinado mês e ano a partir de um `year` e um `month`"""
     try:
@@ -174,27 +459,62 @@ def get_schedules_by_month(
         )
 
     statement = (
-        select(Schedule)
+        select_schedules(fieldset)
         .where(Schedule.date_schedule >= start_date, Schedule.date_schedule < end_date)
-        .options(
-            joinedload(Schedule.client),
-            joinedload(Schedule.pet),
-            joinedload(Schedule.services),
-        )
+        .order_by(Schedule.date_schedule, Schedule.id)
     )
 
-    schedules = session.exec(statement).unique().all()
+    schedules = await fetch_schedules(
+        session, statement, services=fieldset is None or fieldset.includes("services")
+    )
 
     if not schedules:
         raise HTTPException(
             status_code=404, detail=f"Nenhum agendamento encontrado para {month}/{year}"
         )
 
-    return schedules
+    if fieldset is not None:
+        return fieldset.response(schedules)
+    return json_response(list[ScheduleWithClientPetServices], schedules)
+
+
+@router.get("/{year}/{month}/summary", response_model=list[ScheduleDailySummary])
+async def get_schedules_summary_by_month(
+    year: int, month: int, session: AsyncSession = Depends(get_read_session)
+):
+    """Endpoint que retorna, para cada dia do mês, a quantidade de agendamentos, os minutos
+    e o faturamento previstos, lidos do resumo diário (sem carregar os agendamentos)"""
+    try:
+        first_day = date(year, month, 1)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Data inválida. Verifique o ano e o mês informados."
+        )
+    days = [
+        first_day + timedelta(days=offset)
+        for offset in range(calendar.monthrange(year, month)[1])
+    ]
+
+    summaries = {
+        summary.day: summary
+        for summary in (
+            await session.exec(
+                select(ScheduleDailySummary).where(
+                    ScheduleDailySummary.day >= days[0],
+                    ScheduleDailySummary.day <= days[-1],
+                )
+            )
+        ).all()
+    }
+
+    return json_response(
+        list[ScheduleDailySummary],
+        [summaries.get(day) or ScheduleDailySummary(day=day) for day in days],
+    )
 
 
 @router.get("/total-schedule/", response_model=int)
-def get_total_schedules(session: Session = Depends(get_session)):
-    """Endpoint que retorna o total de agendamentos cadastrados"""
-    total_schedules = session.exec(select(func.count(Schedule.id))).one()
-    return total_schedules
+async def get_total_schedules(session: AsyncSession = Depends(get_read_session)):
+    """Endpoint que retorna o total de agendamentos cadastrados, lido do contador mantido
+    pelas rotas de criação e exclusão (sem contar a tabela a cada chamada)"""
+    return await read_counter(session, Schedule)
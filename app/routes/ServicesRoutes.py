@@ -1,10 +1,18 @@
 from enum import Enum
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.availability import conflict_detail, extended_schedules, first_overlap
+from app.cache import services_cache, snapshot
+from app.counters import adjust_counter, read_counter
 from app.database import get_session
-from sqlalchemy import func
+from app.read_routing import get_read_session
+from app.ids import accept_legacy_id
+from app.pagination import keyset_page, set_next_cursor, table_has_rows
 from app.models.Services import Services, ServicesUpdate
-from app.models.Schedule import Schedule, ScheduleServices
+from app.cascades import bulk_delete, delete_service_links
+from app.rollups import refresh_days, service_days
+from app.serialization import json_response
 
 
 class categoryPrice(str, Enum):
@@ -20,11 +28,15 @@ router = APIRouter(
 
 
 @router.post("/", response_model=Services)
-def create_service(service: Services, session: Session = Depends(get_session)):
+async def create_service(
+    service: Services, session: AsyncSession = Depends(get_session)
+):
     """Endpoint para criar um novo serviço"""
-
-    service_existing = session.exec(
-        select(Services).where(Services.type_service == service.type_service)
+    accept_legacy_id(service)
+    service_existing = (
+        await session.exec(
+            select(Services).where(Services.type_service == service.type_service)
+        )
     ).first()
 
     if service_existing:
@@ -33,36 +45,50 @@ def create_service(service: Services, session: Session = Depends(get_session)):
         )
 
     session.add(service)
-    session.commit()
-    session.refresh(service)
+    await adjust_counter(session, Services, 1)
+    await services_cache.mark_changed(session)
+    await session.commit()
+    services_cache.clear()
+    await session.refresh(service)
     return service
 
 
 @router.get("/", response_model=list[Services])
-def read_services(
-    offset: int = 0,
+async def read_services(
+    response: Response,
+    cursor: str | None = None,
+    offset: int = Query(default=0, deprecated=True),
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Endpoint para listar todos os Serviços"""
-    statement = select(Services)
-
-    sercice = session.exec(statement).all()
-
-    if not sercice:
+    """Endpoint para listar todos os Serviços ordenados pelo `id`.
+    O cursor da próxima página é retornado no header `X-Next-Cursor`"""
+    has_rows = await services_cache.get_or_load(
+        session, ("has_rows",), lambda: table_has_rows(session, Services)
+    )
+    if not has_rows:
         raise HTTPException(status_code=404, detail="Nenhum serviço cadastrado")
 
-    services = select(Services).offset(offset).limit(limit)
-    return session.exec(services).unique().all()
+    async def load_page():
+        statement = keyset_page(select(Services), [Services.id], cursor, limit)
+        if cursor is None and offset:
+            statement = statement.offset(offset)
+        return [snapshot(service) for service in (await session.exec(statement)).all()]
+
+    services = await services_cache.get_or_load(
+        session, ("page", cursor, offset, limit), load_page
+    )
+    set_next_cursor(response, services, ["id"], limit)
+    return json_response(list[Services], services, response)
 
 
 @router.get("/{service_id}", response_model=Services)
-def read_service_for_id(service_id: int, session: Session = Depends(get_session)):
+async def read_service_for_id(
+    service_id: int, session: AsyncSession = Depends(get_read_session)
+):
     """Endpoint que retorna um serviço a partir de um `service_id` do serviço"""
 
-    statement = select(Services).where(Services.id == service_id)
-
-    service = session.exec(statement).first()
+    service = (await services_cache.get_many(session, [service_id])).get(service_id)
 
     if not service:
         raise HTTPException(
@@ -73,76 +99,73 @@ def read_service_for_id(service_id: int, session: Session = Depends(get_session)
 
 
 @router.delete("/{service_id}")
-def delete_service(service_id: int, session: Session = Depends(get_session)):
+async def delete_service(service_id: int, session: AsyncSession = Depends(get_session)):
     """Endpoint que deleta o serviço a partir de um `service_id` fornecido,
     e caso o agendamento tenha o serviço que foi apagado, o agendamento é deletado caso não tenha mais nenhum serviço"""
 
-    service = session.get(Services, service_id)
+    service = await session.get(Services, service_id)
 
     if not service:
         raise HTTPException(status_code=404, detail="Serviço não foi encontrado")
 
-    schedule_services = session.exec(
-        select(ScheduleServices).where(ScheduleServices.services_id == service.id)
-    ).all()
-
-    # Mantém o controle dos schedules afetados
-    affected_schedules = set()
-    for schedule_service in schedule_services:
-        affected_schedules.add(
-            schedule_service.schedule_id
-        )  # Rastreia os schedules relacionados
-        session.delete(
-            schedule_service
-        )  # Remove as associações do serviço com o schedule
-
-    session.delete(service)
-
-    # Verifica os schedules que precisam ser apagados
-    for schedule_id in affected_schedules:
-        # Busca outros serviços associados ao schedule
-        remaining_services = session.exec(
-            select(ScheduleServices).where(ScheduleServices.schedule_id == schedule_id)
-        ).all()
+    await delete_service_links(session, service.id)
+    await session.execute(bulk_delete(Services, Services.id == service.id))
 
-        # Apaga o schedule se não houver mais serviços associados
-        if not remaining_services:
-            schedule = session.get(Schedule, schedule_id)
-            session.delete(schedule)
-
-    session.commit()
+    await adjust_counter(session, Services, -1)
+    await services_cache.mark_changed(session)
+    await session.commit()
+    services_cache.clear()
 
     return {"ok": True}
 
 
 @router.put("/{serice_id}", response_model=Services)
-def update_service(
+async def update_service(
     service_id: int,
     serviceUpdate: ServicesUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """Endpoint que realiza o update dos dados do serviço a partir do `service_id` repassado"""
 
     statement = select(Services).where(Services.id == service_id)
 
-    service = session.exec(statement).first()
+    service = (await session.exec(statement)).first()
 
     if not service:
         raise HTTPException(status_code=404, detail="Serviço não foi encontrado")
 
-    for key, value in serviceUpdate.model_dump(exclude_unset=True).items():
+    update_data = serviceUpdate.model_dump(exclude_unset=True)
+    # Um serviço mais longo estende os agendamentos que o usam, que não podem passar a
+    # invadir o agendamento seguinte do mesmo cliente
+    days = None
+    duration = update_data.get("duration_in_minutes")
+    if duration is not None and duration > service.duration_in_minutes:
+        extended = await extended_schedules(session, service.id, duration)
+        overlap = first_overlap(extended)
+        if overlap is not None:
+            raise HTTPException(status_code=400, detail=conflict_detail(*overlap))
+        days = {start.date() for start, _, _ in extended}
+
+    for key, value in update_data.items():
         setattr(service, key, value)
 
     session.add(service)
-    session.commit()
-    session.refresh(service)
+    # Duração e preço entram no resumo diário dos dias em que o serviço foi agendado
+    if update_data.keys() & {"duration_in_minutes", "price"}:
+        if days is None:
+            days = await service_days(session, service.id)
+        await refresh_days(session, days)
+    await services_cache.mark_changed(session)
+    await session.commit()
+    services_cache.clear()
+    await session.refresh(service)
 
     return service
 
 
 @router.get("/category-price/", response_model=list[Services])
-def get_services_by_category_price(
-    category_price: categoryPrice, session: Session = Depends(get_session)
+async def get_services_by_category_price(
+    category_price: categoryPrice, session: AsyncSession = Depends(get_read_session)
 ):
     """
     Endpoint que retorna os serviços por uma categoria de preço, delimitada em:
@@ -167,7 +190,12 @@ def get_services_by_category_price(
     else:
         raise HTTPException(status_code=400, detail="Categoria de preço invalida")
 
-    services = session.exec(statement).all()
+    async def load_services():
+        return [snapshot(service) for service in (await session.exec(statement)).all()]
+
+    services = await services_cache.get_or_load(
+        session, ("category", category_price.value), load_services
+    )
 
     if not services:
         raise HTTPException(
@@ -175,15 +203,11 @@ def get_services_by_category_price(
             detail="Nenhum serviço encontrado na faixa de preço selecionada",
         )
 
-    return services
+    return json_response(list[Services], services)
 
 
 @router.get("/total-services/", response_model=int)
-def get_total_services(session: Session = Depends(get_session)):
+async def get_total_services(session: AsyncSession = Depends(get_read_session)):
     """Endpoint que retorna a quantidade total de serviços cadastrados no sistema"""
 
-    statement = select(func.count(Services.id))
-
-    total_services = session.exec(statement).one()
-
-    return total_services
+    return await read_counter(session, Services)
@@ -0,0 +1,133 @@
+import logging
+from sqlalchemy import Engine, bindparam, column, func, literal_column, table
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+from app.models.Pet import Pet
+
+logger = logging.getLogger(__name__)
+
+# Tamanho mínimo do termo para usar o índice: o tokenizador trigram indexa trechos
+# de 3 caracteres, então termos menores continuam na busca por `ilike`
+MIN_FULL_TEXT_TERM = 3
+
+# Índices de texto (FTS5 com tokenizador trigram) por tabela: nome do índice e coluna indexada.
+# Os índices usam a própria tabela como conteúdo (content=...), guardando apenas os trigramas
+FULL_TEXT_INDEXES: dict[str, tuple[str, str]] = {
+    "pet": ("pet_name_fts", "name"),
+}
+
+# Tabelas cujo índice de texto existe no banco em uso (preenchido por `create_full_text_indexes`)
+_available: set[str] = set()
+
+
+def _index_ddl(source: str, index: str, field: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE {index} USING fts5("
+        f"{field}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {index}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {index}(rowid, {field}) VALUES (new.id, new.{field}); END",
+        f"CREATE TRIGGER {index}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {field}) VALUES ('delete', old.id, old.{field}); END",
+        f"CREATE TRIGGER {index}_au AFTER UPDATE OF {field} ON {source} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {field}) VALUES ('delete', old.id, old.{field}); "
+        f"INSERT INTO {index}(rowid, {field}) VALUES (new.id, new.{field}); END",
+        # Indexa as linhas que já existiam antes do índice
+        f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+    ]
+
+
+def create_full_text_indexes(engine: Engine) -> list[str]:
+    """Cria os índices FTS5 (e os triggers que os mantêm sincronizados) que ainda não
+    existem. Em bancos que não são SQLite, ou sem o módulo FTS5, as buscas seguem com `ilike`"""
+    _available.clear()
+    if engine.dialect.name != "sqlite":
+        return []
+
+    created = []
+    with engine.begin() as connection:
+        existing = {
+            row[0]
+            for row in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        for source, (index, field) in FULL_TEXT_INDEXES.items():
+            if index not in existing:
+                try:
+                    for statement in _index_ddl(source, index, field):
+                        connection.exec_driver_sql(statement)
+                except OperationalError:
+                    logger.warning(
+                        "FTS5 indisponível; a busca em %s.%s continua com ilike",
+                        source,
+                        field,
+                    )
+                    continue
+                created.append(index)
+            _available.add(source)
+
+    if created:
+        logger.info("Índices de texto criados: %s", ", ".join(created))
+    return created
+
+
+def drop_full_text_indexes(engine: Engine) -> None:
+    """Remove os índices FTS5 e seus triggers (usado em cargas em massa, que recriam
+    os índices de uma vez no final com `create_full_text_indexes`)"""
+    _available.clear()
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as connection:
+        for index, _ in FULL_TEXT_INDEXES.values():
+            for suffix in ("ai", "ad", "au"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index}_{suffix}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index}")
+
+
+def uses_full_text(source: str, term: str) -> bool:
+    return source in _available and len(term) >= MIN_FULL_TEXT_TERM
+
+
+def _match_query(term: str) -> str:
+    # Frase entre aspas: o termo é buscado como trecho literal, sem a sintaxe do FTS5
+    return '"' + term.replace('"', '""') + '"'
+
+
+def pet_search_statement(term: str, client_id: int | None, offset: int, limit: int):
+    """Consulta de pets por trecho do nome.
+
+    Os resultados vêm ordenados pela qualidade da correspondência: nome idêntico,
+    depois nomes que começam pelo termo e, com o índice de texto, o `bm25` do FTS5.
+    Com `client_id`, os poucos pets do cliente já chegam pelo índice (client_id, name)
+    e são filtrados com `ilike`; sem o índice de texto (outro banco ou termo curto),
+    a busca geral usa o `ilike` original"""
+    name = func.lower(Pet.name)
+    quality = [
+        (name == term.lower()).desc(),
+        name.startswith(term.lower(), autoescape=True).desc(),
+    ]
+
+    if client_id is not None:
+        statement = (
+            select(Pet)
+            .where(Pet.client_id == client_id, Pet.name.ilike(f"%{term}%"))
+            .order_by(*quality, Pet.id)
+        )
+    elif uses_full_text("pet", term):
+        index, _ = FULL_TEXT_INDEXES["pet"]
+        fts = table(index, column("rowid"))
+        statement = (
+            select(Pet)
+            .join(fts, fts.c.rowid == Pet.id)
+            .where(
+                literal_column(index).op("MATCH")(
+                    bindparam("match", _match_query(term))
+                )
+            )
+            .order_by(*quality, literal_column(f"{index}.rank"), Pet.id)
+        )
+    else:
+        statement = select(Pet).where(Pet.name.ilike(f"%{term}%"))
+
+    return statement.offset(offset).limit(limit)
@@ -0,0 +1,392 @@
+import argparse
+import sys
+import time
+from array import array
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from random import Random
+from sqlalchemy import Engine, func, inspect
+from sqlmodel import Session, SQLModel, select
+from app.availability import (
+    SCHEDULE_CLOSES_AT,
+    SCHEDULE_OPENS_AT,
+    SCHEDULE_SLOT_MINUTES,
+)
+from app.counters import reconcile_counters
+from app.models.Client import Client
+from app.models.Pet import Pet
+from app.models.Schedule import Schedule
+from app.models.Services import Services
+from app.rollups import rebuild_daily_summary
+from app.search import create_full_text_indexes, drop_full_text_indexes
+from app.sqlite_profile import apply_sqlite_pragmas
+
+# Agendamentos (e seus vínculos com serviços) gravados por `executemany`
+SEED_BATCH_SIZE = 50_000
+# Serviços sorteados por agendamento, no máximo
+MAX_SERVICES_PER_SCHEDULE = 3
+
+# Pragmas da carga: sem fsync e com o journal em memória. Uma queda no meio da carga
+# pode corromper o arquivo, o que é aceitável para um banco descartável de testes
+LOAD_PRAGMAS: dict[str, str | int] = {
+    "foreign_keys": "OFF",
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Camila", "Daniel", "Eduarda", "Felipe", "Gabriela", "Heitor",
+    "Isabela", "João", "Larissa", "Lucas", "Mariana", "Mateus", "Natália", "Otávio",
+    "Paula", "Pedro", "Rafaela", "Rodrigo", "Sofia", "Thiago", "Valentina", "Vinícius",
+]  # fmt: skip
+LAST_NAMES = [
+    "Almeida", "Barbosa", "Carvalho", "Costa", "Ferreira", "Gomes", "Lima", "Martins",
+    "Melo", "Oliveira", "Pereira", "Ribeiro", "Rocha", "Santos", "Silva", "Souza",
+]  # fmt: skip
+PET_NAMES = [
+    "Amora", "Bidu", "Bolinha", "Chico", "Cookie", "Fred", "Frida", "Luna", "Mel",
+    "Nina", "Paçoca", "Pipoca", "Pretinha", "Simba", "Thor", "Toby", "Zeus", "Lola",
+]  # fmt: skip
+# Raça e faixa de tamanho (em centímetros)
+BREEDS = [
+    ("SRD", 25, 70), ("Shih Tzu", 20, 30), ("Poodle", 25, 45), ("Labrador", 55, 62),
+    ("Golden Retriever", 51, 61), ("Yorkshire", 18, 23), ("Pinscher", 25, 30),
+    ("Bulldog Francês", 28, 33), ("Border Collie", 46, 56), ("Persa", 20, 25),
+    ("Siamês", 20, 28),
+]  # fmt: skip
+# Tipo, duração em minutos e preço de referência
+SERVICE_CATALOG = [
+    ("Banho", 30, 50.0), ("Tosa higiênica", 30, 45.0), ("Tosa completa", 60, 90.0),
+    ("Banho e tosa", 90, 120.0), ("Hidratação", 30, 40.0), ("Corte de unhas", 15, 20.0),
+    ("Limpeza de ouvidos", 15, 25.0), ("Escovação de dentes", 15, 30.0),
+    ("Consulta veterinária", 45, 180.0), ("Vacinação", 15, 90.0),
+]  # fmt: skip
+
+
+def _cpf(base: int) -> str:
+    """CPF válido (com os dígitos verificadores) a partir dos 9 primeiros dígitos"""
+    digits = [int(digit) for digit in f"{base:09d}"]
+    for weight in (10, 11):
+        remainder = sum(d * w for d, w in zip(digits, range(weight, 1, -1))) * 10 % 11
+        digits.append(remainder % 10)
+    return "".join(map(str, digits))
+
+
+def _durations(services: int) -> list[int]:
+    """Duração, em minutos, de cada serviço gravado por `seed_services`, na ordem dos ids"""
+    return [SERVICE_CATALOG[i % len(SERVICE_CATALOG)][1] for i in range(services)]
+
+
+def _slots(start: date, days: int) -> list[str]:
+    """Horários de atendimento dos dias úteis e sábados do período, já no formato
+    em que o SQLAlchemy grava `datetime` no SQLite"""
+    slots = []
+    step = timedelta(minutes=SCHEDULE_SLOT_MINUTES)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() == 6:
+            continue
+        moment = datetime.combine(day, SCHEDULE_OPENS_AT)
+        closes = datetime.combine(day, SCHEDULE_CLOSES_AT)
+        while moment + step <= closes:
+            slots.append(moment.strftime("%Y-%m-%d %H:%M:%S.%f"))
+            moment += step
+    return slots
+
+
+class DatabaseSeeder:
+    """Popula um banco vazio com dados sintéticos determinísticos.
+
+    Cada tabela usa um gerador próprio derivado de `seed`, então a mesma semente gera
+    os mesmos dados (e aumentar os agendamentos não muda os clientes). As regras dos
+    modelos valem por construção: os CPFs vêm de uma bijeção sobre o número do cliente,
+    os pets de cada agendamento pertencem ao cliente dele e os agendamentos de um
+    mesmo cliente não se sobrepõem, considerando a soma da duração dos serviços.
+
+    A carga usa o `executemany` do sqlite3 com ids explícitos e `LOAD_PRAGMAS`, sem
+    os índices secundários e o índice de texto, que são recriados no final junto com
+    o resumo diário e os contadores."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        seed: int = 42,
+        start: date = date(2024, 1, 1),
+        days: int = 365,
+        batch_size: int = SEED_BATCH_SIZE,
+        on_progress: Callable[[str, int], None] | None = None,
+    ):
+        self.engine = engine
+        self.seed = seed
+        self.start = start
+        self.days = days
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.rows: dict[str, int] = {}
+
+    def _random(self, table: str) -> Random:
+        return Random(f"{self.seed}:{table}")
+
+    def _progress(self, table: str, rows: int) -> None:
+        self.rows[table] = self.rows.get(table, 0) + rows
+        if self.on_progress is not None:
+            self.on_progress(table, self.rows[table])
+
+    def check_empty(self) -> None:
+        """Os ids são gerados a partir de 1: a carga exige as tabelas vazias"""
+        with Session(self.engine) as session:
+            for model in (Client, Pet, Services, Schedule):
+                if session.exec(select(func.count()).select_from(model)).one():
+                    raise ValueError(
+                        f"A tabela {model.__tablename__} já tem registros; "
+                        "use um banco vazio"
+                    )
+
+    def seed_clients(self, cursor, clients: int) -> tuple[array, array]:
+        """Grava clientes e pets. Retorna o primeiro pet e a quantidade de pets de cada
+        cliente, usados para sortear o pet dos agendamentos"""
+        rng = self._random("clients")
+        # Multiplicador coprimo de 10: a bijeção mantém os CPFs únicos sem parecerem sequenciais
+        offset = rng.randrange(10**9)
+        cursor.executemany(
+            "INSERT INTO client (id, name, cpf, age, is_admin) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    _cpf((i * 387_420_489 + offset) % 10**9),
+                    rng.randint(18, 80),
+                    rng.random() < 0.01,
+                )
+                for i in range(1, clients + 1)
+            ),
+        )
+        self._progress("client", clients)
+
+        rng = self._random("pets")
+        first_pet = array("i", [0]) * (clients + 1)
+        pet_count = array("b", [0]) * (clients + 1)
+        pets = []
+        pet_id = 0
+        for client_id in range(1, clients + 1):
+            count = rng.choices((1, 2, 3), weights=(60, 30, 10))[0]
+            first_pet[client_id] = pet_id + 1
+            pet_count[client_id] = count
+            # Nomes distintos por cliente, como exige `create_pet_for_client`
+            for name in rng.sample(PET_NAMES, count):
+                pet_id += 1
+                breed, smallest, largest = rng.choice(BREEDS)
+                pets.append(
+                    (
+                        pet_id,
+                        name,
+                        breed,
+                        rng.randint(1, 15),
+                        rng.randint(smallest, largest),
+                        client_id,
+                    )
+                )
+            if len(pets) >= self.batch_size:
+                self._insert_pets(cursor, pets)
+                pets = []
+        self._insert_pets(cursor, pets)
+        return first_pet, pet_count
+
+    def _insert_pets(self, cursor, pets: list[tuple]) -> None:
+        cursor.executemany(
+            "INSERT INTO pet (id, name, breed, age, size_in_centimeters, client_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            pets,
+        )
+        self._progress("pet", len(pets))
+
+    def seed_services(self, cursor, services: int) -> None:
+        rng = self._random("services")
+        rows = []
+        for i in range(services):
+            type_service, duration, price = SERVICE_CATALOG[i % len(SERVICE_CATALOG)]
+            if i >= len(SERVICE_CATALOG):
+                type_service = f"{type_service} {i // len(SERVICE_CATALOG) + 1}"
+            rows.append(
+                (i + 1, duration, type_service, round(price * rng.uniform(0.8, 1.5), 2))
+            )
+        cursor.executemany(
+            "INSERT INTO services (id, duration_in_minutes, type_service, price) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._progress("services", services)
+
+    def seed_schedules(
+        self,
+        cursor,
+        slots: list[str],
+        schedules: int,
+        durations: list[int],
+        first_pet: array,
+        pet_count: array,
+    ) -> None:
+        """Distribui os agendamentos igualmente pelos horários do período. Cada cliente
+        sorteado fica ocupado pelos horários que a soma dos seus serviços cobre e só
+        volta a ser sorteado depois deles"""
+        clients = len(first_pet) - 1
+        per_slot, remainder = divmod(schedules, len(slots))
+
+        rng = self._random("schedules")
+        service_ids = range(1, len(durations) + 1)
+        most_services = min(MAX_SERVICES_PER_SCHEDULE, len(durations))
+        # Índice (em `slots`) do primeiro horário em que cada cliente está livre
+        free_from = array("i", [0]) * (clients + 1)
+        rows, links = [], []
+        schedule_id = 0
+        for index, moment in enumerate(slots):
+            missing = per_slot + (index < remainder)
+            while missing:
+                client_id = rng.randint(1, clients)
+                if free_from[client_id] > index:
+                    continue
+                missing -= 1
+                schedule_id += 1
+                pet_id = first_pet[client_id] + rng.randrange(pet_count[client_id])
+                rows.append((schedule_id, moment, client_id, pet_id))
+                chosen = rng.sample(service_ids, rng.randint(1, most_services))
+                links.extend((schedule_id, service_id) for service_id in chosen)
+                duration = sum(durations[service_id - 1] for service_id in chosen)
+                free_from[client_id] = index + -(-duration // SCHEDULE_SLOT_MINUTES)
+            if len(rows) >= self.batch_size:
+                self._insert_schedules(cursor, rows, links)
+                rows, links = [], []
+        self._insert_schedules(cursor, rows, links)
+
+    def _insert_schedules(self, cursor, rows: list[tuple], links: list[tuple]) -> None:
+        cursor.executemany(
+            "INSERT INTO schedule (id, date_schedule, client_id, pet_id) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        cursor.executemany(
+            "INSERT INTO scheduleservices (schedule_id, services_id) VALUES (?, ?)",
+            links,
+        )
+        self._progress("schedule", len(rows))
+        self._progress("scheduleservices", len(links))
+
+    def _drop_indexes(self) -> None:
+        existing = {
+            index["name"]
+            for table in SQLModel.metadata.sorted_tables
+            for index in inspect(self.engine).get_indexes(table.name)
+        }
+        with self.engine.begin() as connection:
+            for table in SQLModel.metadata.sorted_tables:
+                for index in table.indexes:
+                    if index.name in existing:
+                        index.drop(connection)
+        drop_full_text_indexes(self.engine)
+
+    def _rebuild(self) -> None:
+        from app.database import create_missing_indexes
+
+        create_missing_indexes()
+        create_full_text_indexes(self.engine)
+        rebuild_daily_summary(self.engine)
+        reconcile_counters(self.engine)
+
+    def run(self, clients: int, schedules: int, services: int) -> dict[str, int]:
+        """Executa a carga completa e retorna as linhas gravadas por tabela"""
+        from app.database import SQLITE_PRAGMAS
+
+        if self.engine.dialect.name != "sqlite":
+            raise ValueError("O seeder grava direto pelo driver do SQLite")
+        if schedules and (not clients or not services):
+            raise ValueError("Agendamentos exigem pelo menos um cliente e um serviço")
+        slots = _slots(self.start, self.days)
+        durations = _durations(services)
+        if schedules:
+            # Um cliente sorteado fica ocupado por até `blocks` horários (os serviços
+            # mais longos); cada horário precisa de clientes livres para os seus sorteios
+            longest = sum(sorted(durations)[-MAX_SERVICES_PER_SCHEDULE:])
+            blocks = -(-longest // SCHEDULE_SLOT_MINUTES)
+            needed = -(-schedules // max(len(slots), 1)) * blocks
+            if not slots or clients < needed:
+                raise ValueError(
+                    f"{schedules} agendamentos em {len(slots)} horários, de até "
+                    f"{longest} minutos cada, exigem pelo menos {needed} clientes; "
+                    "aumente --clients ou --days"
+                )
+        self.check_empty()
+        self._drop_indexes()
+
+        # Sem outras conexões abertas, o journal pode sair do WAL durante a carga
+        self.engine.dispose()
+        connection = self.engine.raw_connection()
+        try:
+            apply_sqlite_pragmas(connection.driver_connection, LOAD_PRAGMAS)
+            cursor = connection.cursor()
+            first_pet, pet_count = self.seed_clients(cursor, clients)
+            self.seed_services(cursor, services)
+            if schedules:
+                self.seed_schedules(
+                    cursor, slots, schedules, durations, first_pet, pet_count
+                )
+            cursor.close()
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            apply_sqlite_pragmas(connection.driver_connection, SQLITE_PRAGMAS)
+            connection.close()
+            # Os índices voltam mesmo se a carga falhar
+            self._rebuild()
+        return dict(self.rows)
+
+
+def _print_progress(table: str, rows: int) -> None:
+    print(f"{table}: {rows} linhas", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Popula um banco vazio com dados sintéticos determinísticos"
+    )
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--schedules", type=int, default=1_000_000)
+    parser.add_argument("--services", type=int, default=len(SERVICE_CATALOG))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--start",
+        type=date.fromisoformat,
+        default=date(2024, 1, 1),
+        help="Primeiro dia da agenda (AAAA-MM-DD)",
+    )
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    seeder = DatabaseSeeder(
+        engine,
+        seed=args.seed,
+        start=args.start,
+        days=args.days,
+        batch_size=args.batch_size,
+        on_progress=_print_progress,
+    )
+    started = time.perf_counter()
+    try:
+        rows = seeder.run(args.clients, args.schedules, args.services)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - started
+
+    total = sum(rows.values())
+    print(
+        f"Carga concluída: {total} linhas em {elapsed:.1f} s "
+        f"({total / elapsed:,.0f} linhas/s) | "
+        + ", ".join(f"{table}={count}" for table, count in rows.items())
+    )
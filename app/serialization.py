@@ -0,0 +1,134 @@
+import json
+import os
+import re
+from functools import cache
+from typing import Any, get_args, get_origin
+from fastapi import Response
+from pydantic import TypeAdapter
+from pydantic_core import CoreConfig, SchemaSerializer, core_schema
+
+# Serializa as listagens direto dos objetos do ORM, sem a revalidação do `response_model`
+FAST_JSON = os.getenv("FAST_JSON", "").lower() in ("1", "true", "yes")
+
+# Números que o encoder em Rust escreve diferente do `json.dumps` (`1e16` x `1e+16`)
+# e NaN/Infinity, que o `JSONResponse` recusa; nesses casos a resposta usa o `json.dumps`
+_DIVERGENT_JSON = re.compile(rb"\d[eE][+-]?\d|NaN|Infinity")
+
+
+def _model_fields_schema(model) -> tuple[dict, list]:
+    """Schema dos campos do modelo (sem a checagem de classe) e as definições que ele referencia"""
+    schema = model.__pydantic_core_schema__
+    definitions = []
+    if schema["type"] == "definitions":
+        definitions = schema["definitions"]
+        schema = schema["schema"]
+    if schema["type"] == "definition-ref":
+        schema = next(
+            definition
+            for definition in definitions
+            if definition.get("ref") == schema["schema_ref"]
+        )
+    return schema["schema"], definitions
+
+
+class ResponseSerializer:
+    """Serializador pré-compilado de um `response_model` (um modelo ou `list[modelo]`).
+
+    Usa o schema de serialização do próprio modelo aplicado ao `__dict__` dos objetos,
+    de modo que instâncias do ORM (ex.: `Schedule` com cliente, pet e serviços já
+    carregados) viram JSON sem serem convertidas no modelo de resposta. Objetos com
+    algum campo não carregado seguem pela validação completa, como no FastAPI."""
+
+    def __init__(self, response_type):
+        self.many = get_origin(response_type) is list
+        self.model = get_args(response_type)[0] if self.many else response_type
+        fields_schema, definitions = _model_fields_schema(self.model)
+        self.fields = tuple(fields_schema["fields"])
+        self._required = frozenset(self.fields)
+
+        schema = core_schema.list_schema(fields_schema) if self.many else fields_schema
+        if definitions:
+            schema = core_schema.definitions_schema(schema, definitions)
+        self._serializer = SchemaSerializer(
+            schema, CoreConfig(ser_json_inf_nan="constants")
+        )
+        self._adapter = TypeAdapter(response_type)
+
+    def _values(self, content) -> list[dict] | None:
+        values = []
+        for item in content if self.many else [content]:
+            if isinstance(item, self.model):
+                # Instâncias do próprio modelo não são recriadas pela validação do FastAPI
+                # e mantêm a ordem de `__dict__`
+                if not self._required <= item.__dict__.keys():
+                    return None
+                values.append(item.__dict__)
+                continue
+            data = item if isinstance(item, dict) else getattr(item, "__dict__", None)
+            try:
+                # Os demais objetos viram um novo modelo, com os campos na ordem declarada
+                values.append({field: data[field] for field in self.fields})
+            except (KeyError, TypeError):
+                return None
+        return values
+
+    def to_json(self, content) -> bytes:
+        """JSON idêntico ao do `JSONResponse` do FastAPI para o mesmo conteúdo"""
+        values = self._values(content)
+        if values is None:
+            validated = self._adapter.validate_python(content, from_attributes=True)
+            return _dumps(self._adapter.dump_python(validated, mode="json"))
+
+        payload = values if self.many else values[0]
+        body = self._serializer.to_json(payload)
+        if _DIVERGENT_JSON.search(body):
+            return _dumps(self._serializer.to_python(payload, mode="json"))
+        return body
+
+
+def _dumps(content: Any) -> bytes:
+    # Mesmos parâmetros do `JSONResponse.render`
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+@cache
+def response_serializer(response_type) -> ResponseSerializer:
+    return ResponseSerializer(response_type)
+
+
+def json_response(response_type, content, response: Response | None = None):
+    """Com `FAST_JSON` ligado, devolve a resposta já serializada por `ResponseSerializer`,
+    com os headers e o status definidos na `response` da rota (ex.: `X-Next-Cursor`).
+    Desligado, devolve o próprio conteúdo para o caminho padrão do `response_model`"""
+    if not FAST_JSON:
+        return content
+
+    return _json_body(response_serializer(response_type).to_json(content), response)
+
+
+@cache
+def _type_adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def validated_response(response_type, content, response: Response | None = None):
+    """Valida o conteúdo em `response_type` (lendo os atributos dos objetos do ORM) e
+    devolve a resposta já serializada, com os headers e o status da `response` da rota.
+    Usado quando a resposta não segue o `response_model` declarado na rota (ex.: só os
+    campos pedidos em `fields=`)"""
+    adapter = _type_adapter(response_type)
+    validated = adapter.validate_python(content, from_attributes=True)
+    return _json_body(_dumps(adapter.dump_python(validated, mode="json")), response)
+
+
+def _json_body(body: bytes, response: Response | None) -> Response:
+    fast = Response(
+        body,
+        status_code=(response.status_code if response else None) or 200,
+        media_type="application/json",
+    )
+    if response is not None:
+        fast.headers.raw.extend(response.headers.raw)
+    return fast
@@ -0,0 +1,71 @@
+import os
+
+# Perfis de desempenho do SQLite aplicados em cada nova conexão.
+# "integrity" prioriza durabilidade (WAL com synchronous=FULL) e é o padrão;
+# "throughput" troca um pouco de durabilidade em queda de energia por menos fsyncs,
+# o que aumenta as escritas por segundo, e não as leituras: sem limite de escritas, a
+# CPU liberada pelo fsync vai para mais commits, e as leituras concorrentes caem (ver
+# `benchmarks/bench_sqlite_profile.py`); sob a mesma carga de escritas, ficam iguais.
+# O cache_size vale por conexão e se multiplica pelas conexões dos pools, por isso é
+# moderado; o mmap_size usa o cache de páginas do sistema, compartilhado entre elas.
+# O busy_timeout vem primeiro para que a troca do journal_mode espere por outras
+# conexões em vez de falhar com "database is locked".
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    "integrity": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "throughput": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16384,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+
+# Valores aceitos para os pragmas textuais
+_ALLOWED_VALUES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
+
+def sqlite_pragmas(profile: str | None = None) -> dict[str, str | int]:
+    """Resolve os pragmas do perfil escolhido em `SQLITE_PROFILE`, aplicando por cima
+    os valores individuais definidos em `SQLITE_<PRAGMA>` (ex.: `SQLITE_SYNCHRONOUS=NORMAL`)"""
+    profile = (profile or os.getenv("SQLITE_PROFILE", "integrity")).lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"SQLITE_PROFILE inválido: {profile!r}. Use um de {sorted(SQLITE_PROFILES)}"
+        )
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name, default in SQLITE_PROFILES[profile].items():
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, int):
+            pragmas[name] = int(value)
+            continue
+        value = value.upper()
+        if value not in _ALLOWED_VALUES[name]:
+            raise ValueError(f"SQLITE_{name.upper()} inválido: {value!r}")
+        pragmas[name] = value
+
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict[str, str | int]) -> None:
+    """Executa os pragmas em uma conexão DBAPI do SQLite (sqlite3 ou aiosqlite adaptada)"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
@@ -0,0 +1,62 @@
+from datetime import datetime
+from sqlalchemy import lambda_stmt
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+from app.loaders import select_schedules
+from app.models.Client import Client
+from app.models.Pet import Pet
+from app.models.Schedule import Schedule
+
+# Consultas das rotas mais chamadas, montadas com `lambda_stmt`. O SQLAlchemy monta o
+# `select` (com os `.where()` e `.options()`) uma única vez por lambda e, nas chamadas
+# seguintes, só troca os valores das variáveis usadas dentro dela, que viram parâmetros.
+# A chave do cache de compilação também sai pronta, então cada requisição vai direto
+# para o SQL já compilado. As lambdas devem usar apenas parâmetros simples da função
+# (nada de `objeto.atributo`), para que os valores sejam rastreados como parâmetros.
+#
+# Como o `lambda_stmt` não é um `select` do SQLModel, as rotas executam estas consultas
+# com `session.execute(...)` e usam `.scalars()` para obter os modelos.
+
+
+def client_with_pets(client_id: int):
+    """Cliente com os pets carregados por JOIN"""
+    return lambda_stmt(
+        lambda: (
+            select(Client)
+            .where(Client.id == client_id)
+            .options(joinedload(Client.pets))
+        )
+    )
+
+
+def client_id_by_cpf(cpf: str):
+    """Id do cliente com o CPF, para a checagem de duplicidade"""
+    return lambda_stmt(lambda: select(Client.id).where(Client.cpf == cpf).limit(1))
+
+
+def pet_id_by_client_name(client_id: int, name: str):
+    """Id do pet do cliente com o nome, para a checagem de duplicidade"""
+    return lambda_stmt(
+        lambda: (
+            select(Pet.id).where(Pet.client_id == client_id, Pet.name == name).limit(1)
+        )
+    )
+
+
+def schedule_by_id(schedule_id: int):
+    """Agendamento com cliente e pet (os serviços vêm de `load_schedule_services`)"""
+    return lambda_stmt(lambda: select_schedules().where(Schedule.id == schedule_id))
+
+
+def schedule_id_by_client_date(client_id: int, date_schedule: datetime):
+    """Id do agendamento do cliente no mesmo horário, para a checagem de duplicidade"""
+    return lambda_stmt(
+        lambda: (
+            select(Schedule.id)
+            .where(
+                Schedule.date_schedule == date_schedule,
+                Schedule.client_id == client_id,
+            )
+            .limit(1)
+        )
+    )
@@ -0,0 +1,290 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import (
+    DATABASE_MODE,
+    DATABASE_URL,
+    ThreadedSession,
+    _async_database_url,
+    get_session,
+    register_engine,
+    set_sqlite_pragma,
+    unregister_engine,
+)
+from app.instrumentation import instrument_engine
+from app.pool import pool_options
+
+logger = logging.getLogger(__name__)
+
+# Envia as escritas das rotas marcadas com `queued_write` para uma única tarefa escritora
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE", "").lower() in ("1", "true", "yes")
+# Tempo (ms) que a escritora espera por mais escritas antes de fazer o commit do lote
+WRITE_QUEUE_WINDOW_MS = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "2"))
+# Quantidade máxima de escritas por transação
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+
+
+def _autocommit_driver(dbapi_connection, connection_record):
+    # O driver do SQLite abre transações por conta própria e só antes de INSERT/UPDATE,
+    # o que quebra os SAVEPOINTs; com o driver em autocommit, o BEGIN fica com a engine
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(connection):
+    # A trava de escrita é pedida no início do lote, e não no meio dele, quando outra
+    # conexão já poderia estar escrevendo e o SQLite devolveria "database is locked"
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class _Job:
+    __slots__ = ("call", "future", "context", "result")
+
+    def __init__(self, call, future: asyncio.Future):
+        self.call = call
+        self.future = future
+        self.result = None
+        # A escrita roda no contexto da requisição (ex.: `QueryStats` das consultas)
+        self.context = contextvars.copy_context()
+
+
+class _BatchSession:
+    """Sessão entregue a cada escrita do lote. O `commit()` da rota apenas envia as
+    alterações ao banco (dentro do SAVEPOINT da escrita); o commit de verdade é o do
+    lote, e a requisição só recebe a resposta depois dele"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        await self._session.flush()
+
+
+class WriteQueue:
+    """Fila de escritas com commit em grupo (group commit).
+
+    Uma única tarefa escritora executa as escritas na ordem de chegada, cada uma em
+    um SAVEPOINT da mesma transação, e faz um único commit para todas as que chegarem
+    dentro da janela de `window` segundos (ou até `max_batch` escritas). A escrita
+    que falha (ex.: `HTTPException` de CPF duplicado ou pet inexistente) desfaz só o
+    próprio SAVEPOINT e devolve o erro apenas para a sua requisição; as demais
+    recebem o resultado depois do commit do lote.
+
+    Com uma só conexão escrevendo por processo, as requisições deixam de disputar a
+    trava de escrita do SQLite e o custo do commit (fsync) é dividido pelo lote."""
+
+    def __init__(
+        self,
+        window: float = WRITE_QUEUE_WINDOW_MS / 1000,
+        max_batch: int = WRITE_QUEUE_MAX_BATCH,
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.jobs = 0
+        self.failed_batches = 0
+        self._engine = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_Job] | None = None
+        self._task: asyncio.Task | None = None
+
+    def _create_engine(self):
+        """Engine própria da escritora, com uma única conexão"""
+        asynchronous = DATABASE_MODE == "async"
+        url = DATABASE_URL
+        if asynchronous:
+            url = os.getenv("DATABASE_ASYNC_URL") or _async_database_url(DATABASE_URL)
+        options = pool_options(url, asynchronous=asynchronous)
+        if options:
+            options.update(pool_size=1, max_overflow=0)
+        if asynchronous:
+            engine = create_async_engine(url, **options)
+            sync_engine = engine.sync_engine
+        else:
+            engine = sync_engine = create_engine(url, **options)
+
+        instrument_engine(sync_engine)
+        if sync_engine.dialect.name == "sqlite":
+            event.listen(sync_engine, "connect", set_sqlite_pragma)
+            event.listen(sync_engine, "connect", _autocommit_driver)
+            event.listen(sync_engine, "begin", _begin_immediate)
+        register_engine("writer", sync_engine)
+        return engine
+
+    def _open_session(self) -> AsyncSession | ThreadedSession:
+        if self._engine is None:
+            self._engine = self._create_engine()
+        if DATABASE_MODE == "async":
+            return AsyncSession(self._engine, expire_on_commit=False)
+        return ThreadedSession(Session(self._engine, expire_on_commit=False))
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # As conexões assíncronas ficam presas ao event loop em que foram abertas
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = None
+            if DATABASE_MODE == "async":
+                self._engine = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="write-queue")
+
+    async def submit(self, call):
+        """Executa `call(session=...)` na tarefa escritora e devolve o seu resultado
+        (ou levanta o seu erro) depois do commit do lote"""
+        self._ensure_started()
+        job = _Job(call, self._loop.create_future())
+        self._queue.put_nowait(job)
+        return await job.future
+
+    @property
+    def waiting(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_batch(job)
+            except Exception:
+                logger.exception("Erro inesperado na fila de escritas")
+
+    async def _next_job(self, deadline: float, taken: int) -> _Job | None:
+        if taken >= self.max_batch:
+            return None
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        timeout = deadline - self._loop.time()
+        if timeout <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    async def _apply(self, session, job: _Job) -> None:
+        savepoint = await session.begin_nested()
+        try:
+            result = await asyncio.create_task(
+                job.call(session=_BatchSession(session)), context=job.context
+            )
+        except (HTTPException, SQLAlchemyError) as error:
+            await savepoint.rollback()
+            if not job.future.done():
+                job.future.set_exception(error)
+            return
+        await savepoint.commit()
+        job.result = result
+
+    async def _fail_batch(self, session, batch: list[_Job], error: Exception) -> None:
+        self.failed_batches += 1
+        try:
+            await session.rollback()
+        except SQLAlchemyError:
+            logger.exception("Erro ao desfazer o lote da fila de escritas")
+        for pending in batch:
+            if not pending.future.done():
+                pending.future.set_exception(error)
+
+    async def _run_batch(self, job: _Job) -> None:
+        deadline = self._loop.time() + self.window
+        batch: list[_Job] = []
+        session = self._open_session()
+        try:
+            while job is not None:
+                batch.append(job)
+                # A requisição que desistiu antes da sua vez não chega a escrever
+                if not job.future.cancelled():
+                    await self._apply(session, job)
+                job = await self._next_job(deadline, len(batch))
+            await session.commit()
+        except SQLAlchemyError as error:
+            await self._fail_batch(session, batch, error)
+        except Exception as error:
+            # Erro de programação em uma das escritas: o lote é desfeito e o erro segue
+            # para as requisições e para o log de `_run`
+            await self._fail_batch(session, batch, error)
+            raise
+        else:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_result(pending.result)
+        finally:
+            self.batches += 1
+            self.jobs += len(batch)
+            for _ in batch:
+                self._queue.task_done()
+            await session.close()
+
+    async def stop(self) -> None:
+        """Espera as escritas pendentes, encerra a tarefa escritora e fecha a conexão"""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._engine is not None:
+            if DATABASE_MODE == "async":
+                await self._engine.dispose()
+            else:
+                self._engine.dispose()
+            self._engine = None
+            unregister_engine("writer")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": WRITE_QUEUE_ENABLED,
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "failed_batches": self.failed_batches,
+            "waiting": self.waiting,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+        }
+
+
+write_queue = WriteQueue()
+
+
+async def _session_from_writer():
+    # A sessão é entregue pela tarefa escritora ao executar a rota (ver `queued_write`)
+    yield None
+
+
+# Dependência das rotas de escrita: sem a fila, é a mesma sessão de `get_session`
+get_write_session = _session_from_writer if WRITE_QUEUE_ENABLED else get_session
+
+
+def queued_write(route):
+    """Decorador das rotas de escrita: com `WRITE_QUEUE` ligado, a rota inteira
+    (validações, escritas e o `commit()`) roda na tarefa escritora, dentro do lote.
+
+    A rota deve receber a sessão em `session`, por `Depends(get_write_session)`, e
+    não pode abrir outras conexões de escrita (ex.: `IdAllocator`), que esperariam
+    pela trava mantida pelo próprio lote"""
+
+    @functools.wraps(route)
+    async def wrapper(*args, session=None, **kwargs):
+        if session is not None:
+            return await route(*args, session=session, **kwargs)
+        return await write_queue.submit(functools.partial(route, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,130 @@
+"""Compara o modo assíncrono (AsyncSession + aiosqlite) com o modo síncrono em threadpool.
+
+Cada modo roda em um subprocesso próprio (o `DATABASE_MODE` é lido na importação de
+`app.database`), com o app executado em processo via `httpx.ASGITransport`, contra um
+banco SQLite temporário. Para cada nível de concorrência são medidos throughput e
+latências p50/p95/p99 de uma carga mista de leituras.
+
+Uso:
+    python -m benchmarks.bench_async_vs_sync [--requests 3000] [--levels 10 100 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+
+async def run_level(client, concurrency: int, total: int, clients: int) -> dict:
+    rng = random.Random(concurrency)
+    paths = [
+        rng.choice(
+            [
+                "/schedules/?limit=20",
+                f"/clients/{rng.randint(1, clients)}",
+                f"/pets/{rng.randint(1, clients)}",
+                "/services/",
+                "/schedules/total-schedule/",
+            ]
+        )
+        for _ in range(total)
+    ]
+    queue = iter(paths)
+    latencies: list[float] = []
+
+    async def worker():
+        for path in queue:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_mode(levels: list[int], total: int, clients: int) -> list[dict]:
+    import httpx
+    from app.database import create_db_and_tables, dispose_engines
+    from app.main import app
+
+    create_db_and_tables()
+    seed_database(os.environ["DATABASE_URL"], clients=clients)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            return [
+                await run_level(client, level, max(total, level), clients)
+                for level in levels
+            ]
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--mode", choices=["async", "sync"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        results = asyncio.run(run_mode(args.levels, args.requests, args.clients))
+        print(json.dumps(results))
+        return
+
+    for mode in ("async", "sync"):
+        env = {
+            **os.environ,
+            "DATABASE_MODE": mode,
+            "DATABASE_URL": temporary_database_url(),
+        }
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_async_vs_sync",
+                "--mode",
+                mode,
+                "--requests",
+                str(args.requests),
+                "--clients",
+                str(args.clients),
+                "--levels",
+                *map(str, args.levels),
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for row in json.loads(output.strip().splitlines()[-1]):
+            print(
+                f"{mode:>5} | concorrência {row['concurrency']:>5} | "
+                f"{row['throughput_rps']:>8} req/s | p50 {row['p50_ms']:>8} ms | "
+                f"p95 {row['p95_ms']:>8} ms | p99 {row['p99_ms']:>8} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
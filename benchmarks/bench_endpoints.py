@@ -0,0 +1,374 @@
+"""Mede todas as rotas dos routers de clientes, pets, agendamentos e serviços, com limite
+de consultas por rota.
+
+Para cada tamanho de dados (`--sizes`, em clientes; cada cliente tem um pet e há 5
+agendamentos por cliente) um subprocesso cria um banco SQLite temporário, popula os
+dados e roda o app de `app/main.py` em processo via `httpx.ASGITransport`. Cada rota
+recebe `--requests` requisições sequenciais: leituras primeiro, depois criações e
+atualizações e, por último, exclusões (que usam faixas de ids reservadas para isso).
+
+Para cada rota são registrados latência p50/p95/p99, throughput e o maior número de
+consultas por requisição, contadas por um listener nas engines do app (inclusive as
+feitas depois dos headers, como no corpo em streaming da exportação).
+O limite de consultas de cada rota não depende do tamanho dos dados: uma regressão
+N+1 o ultrapassa e faz a execução falhar. Também falham respostas com erro, rotas
+dos routers sem entrada em `ENDPOINTS` e, com `--baseline`, rotas cujo p50 piorou
+mais que `--tolerance` em relação a uma execução anterior.
+
+Os resultados vão para o arquivo JSON de `--output`, que pode ser usado como
+`--baseline` nas execuções seguintes.
+
+Uso:
+    python -m benchmarks.bench_endpoints [--sizes 1000 10000] [--requests 100]
+        [--output bench-endpoints.json] [--baseline anterior.json --tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+# Fases, executadas nessa ordem: leituras, criações/atualizações, exclusões simples e
+# exclusões em cascata (que também removem agendamentos de outras faixas de ids)
+READ, WRITE, DELETE, CASCADE = range(4)
+
+SERVICES = 10
+SCHEDULES_PER_CLIENT = 5
+
+
+class Context:
+    """Ids disponíveis no banco populado. As últimas faixas de clientes (e seus pets)
+    ficam reservadas para as rotas de exclusão; as leituras usam apenas as primeiras"""
+
+    def __init__(self, clients: int, requests: int, client_with_schedules: int):
+        self.clients = clients
+        self.requests = requests
+        self.schedules = clients * SCHEDULES_PER_CLIENT
+        self.readable = clients - 2 * requests
+        self.client_with_schedules = client_with_schedules
+        self.rng = random.Random(clients)
+
+    def client_id(self) -> int:
+        return self.rng.randint(1, self.readable)
+
+    def schedule_id(self) -> int:
+        return self.rng.randint(1, self.schedules - self.requests)
+
+
+def _day(start: date, offset: int) -> str:
+    return (start + timedelta(days=offset)).isoformat()
+
+
+def _client(name: str, cpf: str) -> dict:
+    return {"id": 0, "name": name, "cpf": cpf, "age": 30, "is_admin": False}
+
+
+def _pet(name: str, client_id: int) -> dict:
+    return {
+        "name": name,
+        "breed": "SRD",
+        "age": 3,
+        "size_in_centimeters": 40,
+        "client_id": client_id,
+    }
+
+
+def _import_file(i: int) -> dict:
+    rows = "".join(
+        f"Importado {i}-{k},imp-{i}-{k},30,false,Pet {k},SRD,2,30\n" for k in range(10)
+    )
+    header = "client_name,client_cpf,client_age,client_is_admin,pet_name,pet_breed,pet_age,pet_size_in_centimeters\n"
+    return {"files": {"file": ("clientes.csv", header + rows, "text/csv")}}
+
+
+class Endpoint:
+    """Rota medida: nome da função da rota, fase, limite de consultas por requisição
+    e a fábrica que monta a i-ésima requisição (método, url e argumentos do httpx)"""
+
+    __slots__ = ("name", "phase", "budget", "build")
+
+    def __init__(self, name: str, phase: int, budget: int, build):
+        self.name = name
+        self.phase = phase
+        self.budget = budget
+        self.build = build
+
+
+# Os limites de `import_clients` e `create_schedules_bulk` incluem a reserva de um bloco
+# de ids (app/ids.py), feita na primeira requisição e a cada ID_BLOCK_SIZE ids depois dela.
+# Os de `create_schedule` e `create_schedules_bulk` incluem a leitura dos serviços no banco,
+# que nas escritas não vem do cache (`fresh` em app/cache.py)
+# fmt: off
+ENDPOINTS = [
+    # Clientes
+    Endpoint("read_clients", READ, 1, lambda ctx, i: ("GET", "/clients/", {"params": {"limit": 100}})),
+    Endpoint("get_client_by_id", READ, 1, lambda ctx, i: ("GET", f"/clients/{ctx.client_id()}", {})),
+    Endpoint("get_client_schedules", READ, 2, lambda ctx, i: ("GET", f"/clients/get_schedule/{ctx.client_with_schedules}", {})),
+    Endpoint("get_total_clients", READ, 1, lambda ctx, i: ("GET", "/clients/total-clients/", {})),
+    Endpoint("creat_client", WRITE, 5, lambda ctx, i: ("POST", "/clients/", {"json": _client(f"Bench {i}", f"bench-{i}")})),
+    Endpoint("import_clients", WRITE, 7, lambda ctx, i: ("POST", "/clients/import", _import_file(i))),
+    Endpoint("update_client", WRITE, 3, lambda ctx, i: ("PUT", f"/clients/{i + 1}", {"json": {"name": f"Atualizado {i}", "cpf": f"{i + 1:011d}", "age": 31, "is_admin": False}})),
+    Endpoint("delete_client", CASCADE, 12, lambda ctx, i: ("DELETE", f"/clients/{ctx.clients - i}", {})),
+    # Pets
+    Endpoint("read_pets", READ, 2, lambda ctx, i: ("GET", "/pets/", {"params": {"limit": 100}})),
+    Endpoint("read_pet_for_client", READ, 1, lambda ctx, i: ("GET", f"/pets/{ctx.client_id()}", {})),
+    Endpoint("get_pet_by_name", READ, 1, lambda ctx, i: ("GET", "/pets/Pet 1/pet-name", {"params": {"limit": 100}})),
+    Endpoint("get_total_pets", READ, 1, lambda ctx, i: ("GET", "/pets/total-pets/", {})),
+    Endpoint("create_pet_for_client", WRITE, 5, lambda ctx, i: ("POST", f"/pets/{i % ctx.readable + 1}/pet/", {"json": _pet(f"Bench {i}", i % ctx.readable + 1)})),
+    Endpoint("update_pet_for_client", WRITE, 3, lambda ctx, i: ("PUT", f"/pets/{i + 1}/pets/{i + 1}", {"json": {"name": f"Pet {i + 1}", "breed": "Poodle", "age": 4, "size_in_centimeters": 35}})),
+    Endpoint("delete_pet_for_client", CASCADE, 10, lambda ctx, i: ("DELETE", f"/pets/{ctx.readable + i + 1}/pets/{ctx.readable + i + 1}", {})),
+    # Agendamentos
+    Endpoint("read_schedules", READ, 2, lambda ctx, i: ("GET", "/schedules/", {"params": {"limit": 100}})),
+    Endpoint("get_schedule_by_id", READ, 2, lambda ctx, i: ("GET", f"/schedules/{ctx.schedule_id()}", {})),
+    Endpoint("get_schedules_by_month", READ, 4, lambda ctx, i: ("GET", "/schedules/2025/1", {})),
+    Endpoint("get_schedules_summary_by_month", READ, 1, lambda ctx, i: ("GET", "/schedules/2025/1/summary", {})),
+    Endpoint("get_availability", READ, 2, lambda ctx, i: ("GET", "/schedules/availability", {"params": {"date": "2025-01-02", "service_ids": [1, 2]}})),
+    Endpoint("export_schedules_by_period", READ, 1, lambda ctx, i: ("GET", "/schedules/export", {"params": {"from": "2025-01-01", "to": "2025-01-07"}})),
+    Endpoint("get_total_schedules", READ, 1, lambda ctx, i: ("GET", "/schedules/total-schedule/", {})),
+    Endpoint("create_schedule", WRITE, 11, lambda ctx, i: ("POST", "/schedules/", {"json": {"schedule": {"id": 0, "date_schedule": f"{_day(date(2031, 1, 1), i)}T10:00:00", "client_id": 1, "pet_id": 1}, "service_ids": [1]}})),
+    Endpoint("create_schedules_bulk", WRITE, 11, lambda ctx, i: ("POST", "/schedules/bulk", {"json": [{"date_schedule": f"{_day(date(2032, 1, 1), i)}T{hour:02d}:00:00", "client_id": 2, "pet_id": 2, "service_ids": [1]} for hour in range(8, 18)]})),
+    Endpoint("update_schedule", WRITE, 8, lambda ctx, i: ("PUT", f"/schedules/{i + 1}", {"json": {"date_schedule": f"{_day(date(2033, 1, 1), i)}T10:00:00"}})),
+    Endpoint("delete_schedule", DELETE, 8, lambda ctx, i: ("DELETE", f"/schedules/{ctx.schedules - i}", {})),
+    # Serviços
+    Endpoint("read_services", READ, 2, lambda ctx, i: ("GET", "/services/", {"params": {"limit": 100}})),
+    Endpoint("read_service_for_id", READ, 1, lambda ctx, i: ("GET", f"/services/{i % SERVICES + 1}", {})),
+    Endpoint("get_services_by_category_price", READ, 1, lambda ctx, i: ("GET", "/services/category-price/", {"params": {"category_price": "expensive services"}})),
+    Endpoint("get_total_services", READ, 1, lambda ctx, i: ("GET", "/services/total-services/", {})),
+    Endpoint("create_service", WRITE, 6, lambda ctx, i: ("POST", "/services/", {"json": {"duration_in_minutes": 30, "type_service": f"Bench {i}", "price": 99.0}})),
+    Endpoint("update_service", WRITE, 5, lambda ctx, i: ("PUT", f"/services/{SERVICES + i + 1}", {"params": {"service_id": SERVICES + i + 1}, "json": {"duration_in_minutes": 45, "type_service": f"Bench {i}", "price": 120.0}})),
+    Endpoint("delete_service", CASCADE, 5, lambda ctx, i: ("DELETE", f"/services/{SERVICES + i + 1}", {})),
+]
+# fmt: on
+
+
+def missing_endpoints() -> list[str]:
+    """Rotas dos quatro routers sem entrada em `ENDPOINTS`"""
+    from fastapi.routing import APIRoute
+
+    from app.routes import ClientRoutes, PetRoutes, ScheduleRoutes, ServicesRoutes
+
+    covered = {endpoint.name for endpoint in ENDPOINTS}
+    return [
+        f"{','.join(sorted(route.methods))} {route.path} ({route.name})"
+        for module in (ClientRoutes, PetRoutes, ScheduleRoutes, ServicesRoutes)
+        for route in module.router.routes
+        if isinstance(route, APIRoute) and route.name not in covered
+    ]
+
+
+class QueryCounter:
+    """Conta as instruções executadas nas engines; as requisições são sequenciais,
+    então a diferença entre duas leituras é o total de uma requisição"""
+
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args) -> None:
+        self.count += 1
+
+
+async def measure(client, ctx: Context, counter: QueryCounter, endpoint: Endpoint):
+    latencies, queries, errors = [], [], []
+    started = time.perf_counter()
+    for i in range(ctx.requests):
+        method, url, options = endpoint.build(ctx, i)
+        request_started = time.perf_counter()
+        before = counter.count
+        response = await client.request(method, url, **options)
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        queries.append(counter.count - before)
+        if response.status_code >= 400 and len(errors) < 3:
+            errors.append(f"{response.status_code} {response.text[:200]}")
+    elapsed = time.perf_counter() - started
+
+    return {
+        "route": endpoint.name,
+        "requests": ctx.requests,
+        "throughput_rps": round(ctx.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries_max": max(queries),
+        "query_budget": endpoint.budget,
+        "errors": errors,
+    }
+
+
+async def run_size(clients: int, requests: int) -> list[dict]:
+    import httpx
+
+    from app.counters import reconcile_counters
+    from app.database import (
+        create_db_and_tables,
+        dispose_engines,
+        engine,
+        sync_engines,
+    )
+    from app.main import app
+    from app.rollups import rebuild_daily_summary
+
+    create_db_and_tables()
+    seed_database(
+        os.environ["DATABASE_URL"],
+        clients=clients,
+        services=SERVICES,
+        schedules=clients * SCHEDULES_PER_CLIENT,
+    )
+    rebuild_daily_summary(engine)
+    reconcile_counters(engine)
+    with engine.connect() as connection:
+        client_with_schedules = connection.exec_driver_sql(
+            "SELECT client_id FROM schedule ORDER BY id LIMIT 1"
+        ).scalar_one()
+
+    ctx = Context(clients, requests, client_with_schedules)
+    counter = QueryCounter(sync_engines())
+    # Exceções do app viram respostas 500, registradas como erro da rota
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            return [
+                await measure(client, ctx, counter, endpoint)
+                for endpoint in sorted(ENDPOINTS, key=lambda endpoint: endpoint.phase)
+            ]
+    finally:
+        await dispose_engines()
+
+
+def run_subprocess(size: int, requests: int) -> list[dict]:
+    env = {
+        **os.environ,
+        "DATABASE_URL": temporary_database_url(),
+        # Mantém o log de consultas lentas fora da medição
+        "SLOW_QUERY_SAMPLE_RATE": "0",
+    }
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_endpoints",
+            "--size",
+            str(size),
+            "--requests",
+            str(requests),
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Rotas cujo p50 piorou mais que `tolerance` em relação à execução de referência"""
+    previous = {
+        (size, row["route"]): row
+        for size, rows in baseline["results"].items()
+        for row in rows
+    }
+    found = []
+    for size, rows in results.items():
+        for row in rows:
+            before = previous.get((size, row["route"]))
+            if before and row["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                found.append(
+                    f"{size} clientes | {row['route']}: p50 "
+                    f"{before['p50_ms']} -> {row['p50_ms']} ms"
+                )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--output", default="bench-endpoints.json")
+    parser.add_argument("--baseline", help="Resultado anterior para comparar o p50")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        print(json.dumps(asyncio.run(run_size(args.size, args.requests))))
+        return
+
+    if min(args.sizes) < 3 * args.requests:
+        parser.error("cada tamanho precisa de pelo menos 3 x --requests clientes")
+
+    failures = [f"Rota sem benchmark: {route}" for route in missing_endpoints()]
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = rows = run_subprocess(size, args.requests)
+        print(f"\n{size} clientes")
+        for row in rows:
+            print(
+                f"{row['route']:>32} | {row['throughput_rps']:>8} req/s | "
+                f"p50 {row['p50_ms']:>8} ms | p95 {row['p95_ms']:>8} ms | "
+                f"p99 {row['p99_ms']:>8} ms | consultas {row['queries_max']:>3}"
+                f"/{row['query_budget']}"
+            )
+            if row["queries_max"] > row["query_budget"]:
+                failures.append(
+                    f"{size} clientes | {row['route']}: {row['queries_max']} consultas "
+                    f"(limite {row['query_budget']})"
+                )
+            failures.extend(
+                f"{size} clientes | {row['route']}: {error}" for error in row["errors"]
+            )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            failures.extend(regressions(results, json.load(file), args.tolerance))
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "database_mode": os.getenv("DATABASE_MODE", "async"),
+                "requests": args.requests,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"\nResultados gravados em {args.output}")
+
+    if failures:
+        print("\nFalhas:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compara as listagens completas com as mesmas listagens pedindo só alguns campos
+(`fields=` / `include=`).
+
+Popula um banco SQLite temporário, roda o app em processo e, para cada par de rotas,
+confere que a resposta parcial é exatamente a resposta completa recortada nos campos
+pedidos. Em seguida mede a latência p50, o tamanho da resposta e as consultas por
+requisição das duas versões. Termina com código de saída 1 se alguma resposta
+parcial divergir.
+
+Uso:
+    python -m benchmarks.bench_fieldsets [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+# Rota completa e a mesma rota com os campos de uma listagem simples
+PAIRS = [
+    ("/schedules/?limit=100", "fields=id,date_schedule,client.name,pet.name"),
+    ("/schedules/?limit=100", "fields=id,date_schedule"),
+    ("/schedules/2025/1", "fields=id,date_schedule,pet.name"),
+    ("/schedules/1", "fields=date_schedule,client.name"),
+    ("/clients/?limit=100", "fields=id,name"),
+    ("/clients/?limit=100", "fields=id,name,pets.name"),
+    ("/clients/1", "fields=name,cpf"),
+    ("/pets/?limit=100", "fields=id,name"),
+]
+
+
+def project(value, fields: list[str]):
+    """Recorta uma resposta completa nos `fields` (com `relação.campo`)"""
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    selected = {}
+    for field in fields:
+        relation, _, nested = field.partition(".")
+        if not nested:
+            selected[relation] = value[relation]
+            continue
+        inner = value[relation]
+        if isinstance(inner, list):
+            current = selected.setdefault(relation, [{} for _ in inner])
+            for target, item in zip(current, inner):
+                target[nested] = item[nested]
+        else:
+            selected.setdefault(relation, {})[nested] = inner[nested]
+    return selected
+
+
+def measure(client, path: str, repeat: int) -> tuple[float, int, int]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    queries = int(response.headers["x-db-query-count"])
+    return percentile(samples, 50), len(response.content), queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    url = temporary_database_url()
+    os.environ["DATABASE_URL"] = url
+    os.environ["DB_DEBUG_HEADERS"] = "1"
+
+    from fastapi.testclient import TestClient
+
+    from app.database import create_db_and_tables, engine
+    from app.main import app
+    from app.rollups import rebuild_daily_summary
+
+    create_db_and_tables()
+    seed_database(url, clients=1000, services=10, schedules=5000)
+    rebuild_daily_summary(engine)
+
+    failures = 0
+    print(
+        f"{'rota':>66} | {'p50':>9} | {'bytes':>7} | consultas "
+        f"| {'p50 parcial':>11} | {'bytes':>7} | consultas"
+    )
+    with TestClient(app) as client:
+        for path, query in PAIRS:
+            sparse = f"{path}{'&' if '?' in path else '?'}{query}"
+            fields = query.removeprefix("fields=").split(",")
+            if client.get(sparse).json() != project(client.get(path).json(), fields):
+                print(f"Resposta divergente: {sparse}")
+                failures += 1
+                continue
+
+            full_p50, full_bytes, full_queries = measure(client, path, args.repeat)
+            p50, size, queries = measure(client, sparse, args.repeat)
+            print(
+                f"{sparse:>66} | {full_p50:>6.2f} ms | {full_bytes:>7} | {full_queries:>9} "
+                f"| {p50:>8.2f} ms | {size:>7} | {queries:>9}"
+            )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
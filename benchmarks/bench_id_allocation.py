@@ -0,0 +1,237 @@
+"""Teste de concorrência da geração de ids: vários processos criando registros ao mesmo tempo.
+
+Cada processo roda o app em processo contra o mesmo banco SQLite e envia, com várias
+requisições simultâneas, clientes e agendamentos com o `"id": 0` dos clientes antigos
+da API e agendamentos em lote (ids reservados em bloco pelo alocador hi/lo). No final,
+confere que nenhuma requisição falhou, que nenhum id foi entregue duas vezes e que os
+ids devolvidos são exatamente os gravados no banco. Termina com código de saída 1 se
+alguma conferência falhar.
+
+Uso:
+    python -m benchmarks.bench_id_allocation [--workers 4] [--requests 200] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.common import temporary_database_url
+
+BULK_ITEMS = 10
+
+
+def _day(worker: int, offset: int) -> str:
+    # Cada processo agenda em dias próprios, sem disputar os mesmos horários
+    return (date(2030, 1, 1) + timedelta(days=worker * 10_000 + offset)).isoformat()
+
+
+async def run_worker(worker: int, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    from app.database import dispose_engines
+    from app.main import app
+
+    statuses = Counter()
+    created = {"client": [], "schedule": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(client, path: str, body, table: str) -> None:
+        async with semaphore:
+            response = await client.post(path, json=body)
+        statuses[response.status_code] += 1
+        if response.status_code != 200:
+            return
+        content = response.json()
+        if isinstance(content, list):
+            created[table].extend(
+                item["id"] for item in content if item["status_code"] == 200
+            )
+        else:
+            created[table].append(content["id"])
+
+    client_id = pet_id = worker + 1
+    calls = []
+    for i in range(requests):
+        calls.append(
+            (
+                "/clients/",
+                {
+                    "id": 0,
+                    "name": f"Cliente {worker}-{i}",
+                    "cpf": f"{worker:03d}{i:08d}",
+                    "age": 30,
+                    "is_admin": False,
+                },
+                "client",
+            )
+        )
+        calls.append(
+            (
+                "/schedules/",
+                {
+                    "schedule": {
+                        "id": 0,
+                        "date_schedule": f"{_day(worker, i)}T10:00:00",
+                        "client_id": client_id,
+                        "pet_id": pet_id,
+                    },
+                    "service_ids": [1],
+                },
+                "schedule",
+            )
+        )
+        if i % BULK_ITEMS == 0:
+            calls.append(
+                (
+                    "/schedules/bulk",
+                    [
+                        {
+                            "date_schedule": f"{_day(worker, requests + i)}T{8 + hour:02d}:00:00",
+                            "client_id": client_id,
+                            "pet_id": pet_id,
+                            "service_ids": [1],
+                        }
+                        for hour in range(BULK_ITEMS)
+                    ],
+                    "schedule",
+                )
+            )
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            await asyncio.gather(*(send(client, *call) for call in calls))
+    finally:
+        await dispose_engines()
+    return {
+        "statuses": dict(statuses),
+        "created": created,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def prepare_database(url: str, workers: int) -> None:
+    """Cria o schema e um cliente com pet por processo, mais um serviço"""
+    os.environ["DATABASE_URL"] = url
+
+    from app.counters import reconcile_counters
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    connection = sqlite3.connect(url.removeprefix("sqlite:///"))
+    with connection:
+        connection.execute(
+            "INSERT INTO services (id, duration_in_minutes, type_service, price) "
+            "VALUES (1, 30, 'Banho', 50.0)"
+        )
+        for worker in range(workers):
+            connection.execute(
+                "INSERT INTO client (id, name, cpf, age, is_admin) VALUES (?, ?, ?, 30, 0)",
+                (worker + 1, f"Dono {worker}", f"dono-{worker}"),
+            )
+            connection.execute(
+                "INSERT INTO pet (id, name, breed, age, size_in_centimeters, client_id) "
+                "VALUES (?, 'Rex', 'SRD', 3, 40, ?)",
+                (worker + 1, worker + 1),
+            )
+    connection.close()
+    reconcile_counters(engine)
+
+
+def stored_ids(url: str, table: str) -> list[int]:
+    connection = sqlite3.connect(url.removeprefix("sqlite:///"))
+    ids = [row[0] for row in connection.execute(f"SELECT id FROM {table}")]
+    connection.close()
+    return ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--block-size", type=int, default=100)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        report = asyncio.run(run_worker(args.worker, args.requests, args.concurrency))
+        print(json.dumps(report))
+        return
+
+    url = temporary_database_url()
+    prepare_database(url, args.workers)
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "ID_BLOCK_SIZE": str(args.block_size),
+        # O teste mede a geração de ids, não a espera pela trava de escrita do SQLite
+        "SQLITE_BUSY_TIMEOUT": "60000",
+        "SLOW_QUERY_SAMPLE_RATE": "0",
+    }
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_id_allocation",
+                "--worker",
+                str(worker),
+                "--requests",
+                str(args.requests),
+                "--concurrency",
+                str(args.concurrency),
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for worker in range(args.workers)
+    ]
+    reports = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            sys.exit(f"Processo terminou com código {process.returncode}")
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+    elapsed = time.perf_counter() - started
+
+    failures = 0
+    statuses = sum((Counter(report["statuses"]) for report in reports), Counter())
+    total = sum(statuses.values())
+    print(
+        f"{total} requisições de {args.workers} processos em {elapsed:.1f} s "
+        f"({total / elapsed:.0f} req/s) | status: {dict(sorted(statuses.items()))}"
+    )
+    if set(statuses) != {"200"}:
+        failures += 1
+
+    # Os clientes criados antes dos processos (um por processo) não entram na conferência
+    for table, seeded in (("client", args.workers), ("schedule", 0)):
+        returned = [id_ for report in reports for id_ in report["created"][table]]
+        duplicated = [id_ for id_, count in Counter(returned).items() if count > 1]
+        stored = set(stored_ids(url, table)) - set(range(1, seeded + 1))
+        missing = stored.symmetric_difference(returned)
+        print(
+            f"{table}: {len(returned)} ids devolvidos, {len(stored)} gravados, "
+            f"{len(duplicated)} duplicados, {len(missing)} divergentes"
+        )
+        if duplicated or missing:
+            failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Mede o custo do `MetricsMiddleware` e da geração de `GET /metrics`.
+
+Primeiro mede o custo do middleware isolado, envolvendo um app ASGI que responde
+sem fazer nada, e o compara com a latência p50 de rotas reais do app em um banco
+SQLite temporário. Em seguida mede as mesmas rotas com as métricas desligadas e
+ligadas, alternando as rodadas, e o tempo de gerar o texto de `/metrics`.
+Termina com código de saída 1 se o custo do middleware passar de `--max-overhead`
+por cento da latência de alguma rota.
+
+Uso:
+    python -m benchmarks.bench_metrics [--repeat 2000] [--max-overhead 2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+PATHS = [
+    "/services/total-services/",
+    "/clients/1",
+    "/schedules/?limit=100",
+]
+
+
+async def middleware_cost(repeat: int) -> float:
+    """Custo médio (em microssegundos) de uma requisição passar pelo middleware"""
+    from app.metrics import MetricsMiddleware
+
+    start = {"type": "http.response.start", "status": 200, "headers": []}
+    body = {"type": "http.response.body", "body": b""}
+
+    async def endpoint(scope, receive, send):
+        await send(start)
+        await send(body)
+
+    async def send(message):
+        pass
+
+    route = type("Route", (), {"path": "/bench/{id}"})()
+    scope = {"type": "http", "method": "GET", "path": "/bench/1", "route": route}
+    wrapped = MetricsMiddleware(endpoint)
+
+    timings = {}
+    for name, app in (("sem", endpoint), ("com", wrapped), ("sem", endpoint)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await app(scope, None, send)
+        timings[name] = (time.perf_counter() - started) / repeat
+    return max(timings["com"] - timings["sem"], 0.0) * 1_000_000
+
+
+async def route_latencies(client, repeat: int) -> dict[str, dict[str, float]]:
+    """p50 (ms) de cada rota com as métricas desligadas e ligadas, em rodadas alternadas"""
+    from app import metrics
+
+    samples = {path: {False: [], True: []} for path in PATHS}
+    for _ in range(10):
+        for enabled in (False, True):
+            metrics.METRICS_ENABLED = enabled
+            for path in PATHS:
+                for _ in range(max(repeat // 100, 1)):
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    samples[path][enabled].append(
+                        (time.perf_counter() - started) * 1000
+                    )
+    return {
+        path: {
+            "sem": percentile(values[False], 50),
+            "com": percentile(values[True], 50),
+        }
+        for path, values in samples.items()
+    }
+
+
+async def run(args: argparse.Namespace) -> int:
+    import httpx
+
+    from app.database import create_db_and_tables, dispose_engines, engine
+    from app.main import app
+    from app.metrics import registry, render_metrics
+    from app.rollups import rebuild_daily_summary
+
+    create_db_and_tables()
+    seed_database(os.environ["DATABASE_URL"], clients=1000, schedules=5000)
+    rebuild_daily_summary(engine)
+
+    cost_us = await middleware_cost(args.repeat * 10)
+    print(f"Custo do MetricsMiddleware: {cost_us:.2f} µs por requisição")
+
+    failures = 0
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            latencies = await route_latencies(client, args.repeat)
+
+            print(
+                f"{'rota':>28} | sem métricas p50 | com métricas p50 | custo do middleware"
+            )
+            for path, p50 in latencies.items():
+                overhead = cost_us / 1000 / p50["sem"] * 100
+                print(
+                    f"{path:>28} | {p50['sem']:>12.3f} ms | {p50['com']:>12.3f} ms "
+                    f"| {overhead:>6.2f} %"
+                )
+                if overhead > args.max_overhead:
+                    failures += 1
+
+            started = time.perf_counter()
+            for _ in range(100):
+                text = render_metrics()
+            render_ms = (time.perf_counter() - started) * 10
+            print(
+                f"GET /metrics: {render_ms:.3f} ms para gerar {len(text.splitlines())} "
+                f"linhas de {len(registry.routes)} rotas"
+            )
+    finally:
+        await dispose_engines()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument(
+        "--max-overhead",
+        type=float,
+        default=2.0,
+        help="Custo máximo do middleware, em %% da latência p50 de cada rota",
+    )
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = temporary_database_url()
+    # Mantém o log de consultas lentas fora da medição
+    os.environ["SLOW_QUERY_SAMPLE_RATE"] = "0"
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compara a busca de pets por trecho do nome com `ilike` e com o índice FTS5 trigram.
+
+Popula um banco SQLite temporário com `--pets` pets (1 milhão por padrão), cria o
+índice de texto depois da carga e mede a latência das duas consultas para termos
+de frequências diferentes, com e sem o filtro por `client_id`. A coluna "busca" é a
+consulta usada pela rota (`pet_search_statement`): FTS5 ordenado por relevância na
+busca geral e índice (client_id, name) quando há `client_id`.
+
+Termos frequentes ficam mais lentos que o `ilike`, que para no décimo resultado sem
+ordenar; em compensação, termos raros ou inexistentes deixam de varrer a tabela inteira.
+
+Uso:
+    python -m benchmarks.bench_pet_search [--pets 1000000] [--repeat 20]
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import Schedule  # noqa: F401 (registra todas as tabelas no metadata)
+from app.models.Pet import Pet
+from app.search import create_full_text_indexes, pet_search_statement
+from benchmarks.common import percentile, temporary_database_url
+
+SYLLABLES = [
+    "ba", "be", "bi", "bo", "lu", "la", "li", "ma", "me", "mi", "na", "ne",
+    "ni", "ra", "re", "ri", "to", "ta", "te", "ze", "zi", "ca", "co", "du",
+    "fi", "fo", "go", "ju", "ke", "pi", "po", "sa", "so", "vi", "xa", "yo",
+]  # fmt: skip
+
+TERMS = ["bela", "lulu", "mabe", "zizo", "xayo", "nonexistent"]
+
+
+def populate(url: str, pets: int) -> None:
+    rng = random.Random(42)
+    clients = max(pets // 10, 1)
+    connection = sqlite3.connect(url.removeprefix("sqlite:///"))
+    with connection:
+        connection.executemany(
+            "INSERT INTO client (id, name, cpf, age, is_admin) VALUES (?, ?, ?, 30, 0)",
+            ((i, f"Cliente {i}", f"{i:011d}") for i in range(1, clients + 1)),
+        )
+        connection.executemany(
+            "INSERT INTO pet (id, name, breed, age, size_in_centimeters, client_id) "
+            "VALUES (?, ?, 'SRD', 1, 30, ?)",
+            (
+                (
+                    i,
+                    "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).title(),
+                    rng.randint(1, clients),
+                )
+                for i in range(1, pets + 1)
+            ),
+        )
+    connection.close()
+
+
+def measure(session: Session, statement, repeat: int) -> tuple[float, int]:
+    samples = []
+    rows = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = session.exec(statement).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentile(samples, 50), len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pets", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    url = temporary_database_url()
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    populate(url, args.pets)
+    print(f"{args.pets} pets inseridos em {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    create_full_text_indexes(engine)
+    print(f"Índice FTS5 construído em {time.perf_counter() - started:.1f} s")
+
+    with Session(engine) as session:
+        client_id = session.exec(select(Pet.client_id).limit(1)).one()
+        for term in TERMS:
+            for owner in (None, client_id):
+                ilike = select(Pet).where(Pet.name.ilike(f"%{term}%"))
+                if owner is not None:
+                    ilike = ilike.where(Pet.client_id == owner)
+                ilike = ilike.offset(0).limit(args.limit)
+                full_text = pet_search_statement(term, owner, 0, args.limit)
+
+                ilike_ms, ilike_rows = measure(session, ilike, args.repeat)
+                fts_ms, fts_rows = measure(session, full_text, args.repeat)
+                label = term if owner is None else f"{term} (cliente {owner})"
+                print(
+                    f"{label:>28} | ilike p50 {ilike_ms:>8.2f} ms ({ilike_rows:>2}) | "
+                    f"busca p50 {fts_ms:>8.2f} ms ({fts_rows:>2})"
+                )
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
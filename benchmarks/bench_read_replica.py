@@ -0,0 +1,223 @@
+"""Compara as leituras com e sem a engine de leitura (`DATABASE_READ_URL`).
+
+Popula um banco SQLite temporário e roda o app em processo com leitores consultando
+as listagens mais pesadas enquanto escritores criam clientes e leem cada cliente
+criado logo em seguida. A carga roda em três configurações: leituras na engine
+principal, na conexão somente leitura padrão (mesmo arquivo) e em uma réplica em
+outro arquivo, copiada periodicamente com `app.replica`. Os escritores com cookie
+devem sempre ler a própria escrita (read-your-writes); os sem cookie mostram quantas
+leituras da réplica ainda estavam atrasadas. Termina com código de saída 1 se alguma
+leitura com cookie não encontrar o cliente ou se alguma requisição falhar.
+
+Uso:
+    python -m benchmarks.bench_read_replica [--seconds 5] [--readers 8] [--writers 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+READ_PATHS = [
+    "/schedules/2025/1",
+    "/clients/?limit=100",
+    "/pets/Pet 1/pet-name?limit=100",
+]
+
+CONFIGS = ("principal", "somente leitura", "réplica")
+
+
+async def run_config(seconds: float, readers: int, writers: int) -> dict:
+    import httpx
+
+    from app.database import dispose_engines
+    from app.main import app
+
+    read_latencies, write_latencies = [], []
+    statuses = Counter()
+    readback = {"com cookie": Counter(), "sem cookie": Counter()}
+    deadline = time.perf_counter() + seconds
+
+    async def reader(client, worker: int) -> None:
+        i = worker
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(READ_PATHS[i % len(READ_PATHS)])
+            read_latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+            i += 1
+
+    async def writer(client, worker: int, sticky: bool) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post(
+                "/clients/",
+                json={
+                    "name": f"Cliente {worker}-{i}",
+                    "cpf": f"{int(sticky)}{worker:02d}{i:08d}",
+                    "age": 30,
+                    "is_admin": False,
+                },
+            )
+            write_latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+            if not sticky:
+                client.cookies.clear()
+            if response.status_code == 200:
+                client_id = response.json()["id"]
+                check = await client.get(f"/clients/{client_id}")
+                readback["com cookie" if sticky else "sem cookie"][
+                    check.status_code
+                ] += 1
+            i += 1
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    clients = [
+        httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+        for _ in range(readers + writers * 2)
+    ]
+    try:
+        tasks = [reader(clients[i], i) for i in range(readers)]
+        for i in range(writers):
+            tasks.append(writer(clients[readers + i], i, sticky=True))
+            tasks.append(writer(clients[readers + writers + i], i, sticky=False))
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients:
+            await client.aclose()
+        await dispose_engines()
+
+    return {
+        "reads": len(read_latencies),
+        "read_p50": percentile(read_latencies, 50),
+        "read_p99": percentile(read_latencies, 99),
+        "write_p50": percentile(write_latencies, 50),
+        "statuses": dict(statuses),
+        "readback": {name: dict(counts) for name, counts in readback.items()},
+    }
+
+
+def prepare_database(url: str) -> None:
+    os.environ["DATABASE_URL"] = url
+
+    from app.counters import reconcile_counters
+    from app.database import create_db_and_tables, engine
+    from app.rollups import rebuild_daily_summary
+
+    create_db_and_tables()
+    seed_database(url, clients=1000, services=10, schedules=5000)
+    rebuild_daily_summary(engine)
+    reconcile_counters(engine)
+    engine.dispose()
+
+
+def run_subprocess(config: str, args: argparse.Namespace) -> dict:
+    from app.replica import sqlite_path, sync_replica
+
+    url = temporary_database_url()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_read_replica", "--prepare", url],
+        check=True,
+    )
+    env = {**os.environ, "DATABASE_URL": url, "SLOW_QUERY_SAMPLE_RATE": "0"}
+    stop = threading.Event()
+    syncer = None
+    if config == "principal":
+        env["DATABASE_READ_URL"] = url
+    elif config == "réplica":
+        source = sqlite_path(url)
+        replica = os.path.join(os.path.dirname(source), "replica.db")
+        shutil.copyfile(source, replica)
+        env["DATABASE_READ_URL"] = f"sqlite:///{replica}"
+
+        def keep_in_sync() -> None:
+            while not stop.wait(args.sync_interval):
+                sync_replica(source, replica)
+
+        syncer = threading.Thread(target=keep_in_sync, daemon=True)
+        syncer.start()
+
+    try:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_read_replica",
+                "--config",
+                config,
+                "--seconds",
+                str(args.seconds),
+                "--readers",
+                str(args.readers),
+                "--writers",
+                str(args.writers),
+            ],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout
+    finally:
+        stop.set()
+        if syncer is not None:
+            syncer.join()
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--sync-interval",
+        type=float,
+        default=0.5,
+        help="Segundos entre as cópias da réplica",
+    )
+    parser.add_argument("--prepare", help=argparse.SUPPRESS)
+    parser.add_argument("--config", choices=CONFIGS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        prepare_database(args.prepare)
+        return
+    if args.config:
+        report = asyncio.run(run_config(args.seconds, args.readers, args.writers))
+        print(json.dumps(report))
+        return
+
+    failures = 0
+    print(
+        f"{'leituras em':>15} | {'leituras/s':>10} | {'p50':>9} | {'p99':>9} "
+        f"| escrita p50 | leitura da escrita (com cookie / sem cookie)"
+    )
+    for config in CONFIGS:
+        report = run_subprocess(config, args)
+        sticky = report["readback"]["com cookie"]
+        plain = report["readback"]["sem cookie"]
+        print(
+            f"{config:>15} | {report['reads'] / args.seconds:>10.0f} "
+            f"| {report['read_p50']:>6.1f} ms | {report['read_p99']:>6.1f} ms "
+            f"| {report['write_p50']:>8.1f} ms | {sticky} / {plain}"
+        )
+        if set(sticky) - {"200"} or any(
+            int(status) >= 500 for status in report["statuses"]
+        ):
+            print(f"  status: {report['statuses']}")
+            failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
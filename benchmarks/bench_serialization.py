@@ -0,0 +1,98 @@
+"""Compara a serialização padrão do `response_model` com a serialização rápida (`FAST_JSON`).
+
+Popula um banco SQLite temporário, roda o app em processo e, para cada listagem,
+verifica que o corpo e os headers são idênticos byte a byte nos dois modos e que o
+schema OpenAPI não muda. Em seguida mede a latência p50 de cada rota nos dois modos.
+Termina com código de saída 1 se alguma resposta ou o schema divergirem.
+
+Uso:
+    python -m benchmarks.bench_serialization [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+PATHS = [
+    "/schedules/?limit=100",
+    "/schedules/2025/1",
+    "/schedules/2025/1/summary",
+    "/schedules/availability?date=2025-01-02",
+    "/clients/?limit=100",
+    "/clients/get_schedule/1",
+    "/pets/?limit=100",
+    "/pets/1",
+    "/pets/Pet 1/pet-name?limit=100",
+    "/services/?limit=100",
+    "/services/category-price/?category_price=expensive%20services",
+]
+
+
+def measure(client, path: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(path).raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentile(samples, 50)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    url = temporary_database_url()
+    os.environ["DATABASE_URL"] = url
+
+    from fastapi.testclient import TestClient
+
+    from app import serialization
+    from app.database import create_db_and_tables, engine
+    from app.main import app
+    from app.rollups import rebuild_daily_summary
+
+    create_db_and_tables()
+    seed_database(url, clients=1000, services=10, schedules=5000)
+    rebuild_daily_summary(engine)
+
+    def openapi() -> dict:
+        app.openapi_schema = None
+        return app.openapi()
+
+    failures = 0
+    with TestClient(app) as client:
+        serialization.FAST_JSON = False
+        schema = openapi()
+        baseline = {path: client.get(path) for path in PATHS}
+        serialization.FAST_JSON = True
+        if openapi() != schema:
+            print("Schema OpenAPI divergente com FAST_JSON")
+            failures += 1
+
+        for path in PATHS:
+            expected, response = baseline[path], client.get(path)
+            if (
+                response.status_code != expected.status_code
+                or response.content != expected.content
+                or response.headers != expected.headers
+            ):
+                print(f"Resposta divergente em {path}")
+                failures += 1
+
+        print(f"{'rota':>62} | padrão p50 | FAST_JSON p50")
+        for path in PATHS:
+            serialization.FAST_JSON = False
+            default_ms = measure(client, path, args.repeat)
+            serialization.FAST_JSON = True
+            fast_ms = measure(client, path, args.repeat)
+            print(f"{path:>62} | {default_ms:>7.2f} ms | {fast_ms:>10.2f} ms")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
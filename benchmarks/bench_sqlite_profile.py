@@ -0,0 +1,152 @@
+"""Compara o throughput de leituras e escritas concorrentes entre perfis de pragmas do SQLite.
+
+Cada perfil roda sobre uma cópia de `schedule-pet-shop.db` (o arquivo original não é
+alterado). Threads leitoras consultam os agendamentos de um mês enquanto threads
+escritoras criam agendamentos com seus serviços, com um commit por agendamento.
+O perfil "legacy" reproduz a configuração anterior (journal DELETE, apenas foreign_keys).
+
+Sem limite, as escritoras ocupam toda a CPU que o fsync deixa livre: com
+`synchronous=NORMAL` elas escrevem várias vezes mais e as leituras caem, porque cada
+commit disputa a CPU (e o GIL) com as leitoras e descarta o cache de página delas.
+Com `--write-rate`, as leituras são comparadas sob a mesma carga de escritas.
+
+Uso:
+    python -m benchmarks.bench_sqlite_profile [--seconds 5] [--readers 4] [--writers 2]
+        [--write-rate 0]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.sqlite_profile import SQLITE_PROFILES, apply_sqlite_pragmas
+
+SOURCE_DATABASE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schedule-pet-shop.db"
+)
+
+PROFILES = {
+    "legacy": {"journal_mode": "DELETE"},
+    **SQLITE_PROFILES,
+}
+
+
+def run_profile(
+    name: str, seconds: float, readers: int, writers: int, write_rate: float = 0
+) -> dict:
+    directory = tempfile.mkdtemp(prefix="pet-shop-pragma-")
+    path = os.path.join(directory, "bench.db")
+    shutil.copyfile(SOURCE_DATABASE, path)
+
+    def connect() -> sqlite3.Connection:
+        connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        apply_sqlite_pragmas(connection, PROFILES[name])
+        return connection
+
+    setup = connect()
+    client_id, pet_id = setup.execute(
+        "SELECT client_id, id FROM pet LIMIT 1"
+    ).fetchone()
+    service_id = setup.execute("SELECT id FROM services LIMIT 1").fetchone()[0]
+    setup.close()
+
+    deadline = time.perf_counter() + seconds
+    counters = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    sequence = iter(range(1, 10**9))
+
+    def reader():
+        connection = connect()
+        done = 0
+        while time.perf_counter() < deadline:
+            connection.execute(
+                "SELECT s.id, c.name, p.name FROM schedule s "
+                "JOIN client c ON c.id = s.client_id JOIN pet p ON p.id = s.pet_id "
+                "WHERE s.date_schedule >= ? AND s.date_schedule < ?",
+                ("2025-01-01", "2025-02-01"),
+            ).fetchall()
+            done += 1
+        connection.close()
+        with lock:
+            counters["reads"] += done
+
+    # Intervalo entre as escritas de cada escritora para somar `write_rate` por segundo
+    interval = writers / write_rate if write_rate > 0 else 0
+
+    def writer():
+        connection = connect()
+        done = locked = 0
+        base = datetime(2030, 1, 1)
+        next_write = time.perf_counter()
+        while time.perf_counter() < deadline:
+            if interval:
+                time.sleep(max(next_write - time.perf_counter(), 0))
+                next_write += interval
+            moment = base + timedelta(minutes=next(sequence))
+            try:
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO schedule (date_schedule, client_id, pet_id) "
+                        "VALUES (?, ?, ?)",
+                        (moment.strftime("%Y-%m-%d %H:%M:%S.%f"), client_id, pet_id),
+                    )
+                    connection.execute(
+                        "INSERT INTO scheduleservices (schedule_id, services_id) "
+                        "VALUES (?, ?)",
+                        (cursor.lastrowid, service_id),
+                    )
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+        connection.close()
+        with lock:
+            counters["writes"] += done
+            counters["locked"] += locked
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "profile": name,
+        "reads_per_second": round(counters["reads"] / seconds, 1),
+        "writes_per_second": round(counters["writes"] / seconds, 1),
+        "locked_errors": counters["locked"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--write-rate",
+        type=float,
+        default=0,
+        help="escritas por segundo somando todas as escritoras (0 = sem limite)",
+    )
+    args = parser.parse_args()
+
+    for name in PROFILES:
+        row = run_profile(
+            name, args.seconds, args.readers, args.writers, args.write_rate
+        )
+        print(
+            f"{row['profile']:>10} | leituras/s {row['reads_per_second']:>9} | "
+            f"escritas/s {row['writes_per_second']:>8} | "
+            f"'database is locked' {row['locked_errors']:>4}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Compara as consultas montadas a cada requisição com as de `app.statements` (`lambda_stmt`).
+
+Popula um banco SQLite temporário e, para cada consulta das rotas mais chamadas,
+confere que a versão antiga (o `select` montado na rota) e a de `app.statements`
+devolvem o mesmo resultado. Em seguida mede, em rodadas alternadas, o custo em Python
+de montar a consulta e calcular sua chave de cache e o de executá-la por uma `Session`
+(montagem, cache de compilação, consulta e carregamento dos objetos), e a fração das
+execuções que reaproveitaram o SQL compilado. Termina com código de saída 1 se algum
+resultado divergir ou se a versão de `app.statements` ficar mais lenta.
+
+Uso:
+    python -m benchmarks.bench_statements [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.common import percentile, seed_database, temporary_database_url
+
+
+def cases():
+    """(nome, consulta antiga, consulta de `app.statements`, leitura do resultado)"""
+    from sqlalchemy.orm import joinedload
+    from sqlmodel import select
+
+    from app import statements
+    from app.loaders import select_schedules
+    from app.models.Client import Client
+    from app.models.Pet import Pet
+    from app.models.Schedule import Schedule
+
+    def first_entity(result):
+        return result.unique().scalars().first()
+
+    def first_value(result):
+        return result.scalars().first()
+
+    moment = datetime(2025, 1, 2, 10, 0)
+    return [
+        (
+            "cliente com pets",
+            lambda i: (
+                select(Client).where(Client.id == i).options(joinedload(Client.pets))
+            ),
+            statements.client_with_pets,
+            first_entity,
+        ),
+        (
+            "agendamento por id",
+            lambda i: select_schedules().where(Schedule.id == i),
+            statements.schedule_by_id,
+            first_entity,
+        ),
+        (
+            "CPF duplicado",
+            lambda i: select(Client.id).where(Client.cpf == f"{i:011d}").limit(1),
+            lambda i: statements.client_id_by_cpf(f"{i:011d}"),
+            first_value,
+        ),
+        (
+            "pet duplicado",
+            lambda i: (
+                select(Pet.id)
+                .where(Pet.client_id == i, Pet.name == f"Pet {i}")
+                .limit(1)
+            ),
+            lambda i: statements.pet_id_by_client_name(i, f"Pet {i}"),
+            first_value,
+        ),
+        (
+            "agendamento duplicado",
+            lambda i: (
+                select(Schedule.id)
+                .where(Schedule.date_schedule == moment, Schedule.client_id == i)
+                .limit(1)
+            ),
+            lambda i: statements.schedule_id_by_client_date(i, moment),
+            first_value,
+        ),
+    ]
+
+
+def same_result(session, before, after, fetch, ids) -> bool:
+    for i in ids:
+        expected = fetch(session.execute(before(i)))
+        actual = fetch(session.execute(after(i)))
+        if expected is not actual and expected != actual:
+            return False
+        session.expunge_all()
+    return True
+
+
+def build_cost(build, ids) -> float:
+    """Custo (µs) de montar a consulta e calcular a chave do cache de compilação"""
+    started = time.perf_counter()
+    for i in ids:
+        build(i)._generate_cache_key()
+    return (time.perf_counter() - started) / len(ids) * 1_000_000
+
+
+def execute_cost(session, build, fetch, ids) -> float:
+    """Custo (µs) de executar a consulta pela `Session` e ler o resultado"""
+    started = time.perf_counter()
+    for i in ids:
+        fetch(session.execute(build(i)))
+    elapsed = time.perf_counter() - started
+    session.expunge_all()
+    return elapsed / len(ids) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = temporary_database_url()
+    os.environ["DATABASE_URL"] = url
+
+    from sqlalchemy import event
+    from sqlalchemy.engine.interfaces import CacheStats
+    from sqlmodel import Session
+
+    from app.database import create_db_and_tables, engine
+
+    create_db_and_tables()
+    seed_database(url, clients=1000, services=10, schedules=5000)
+
+    cache = Counter()
+
+    def count_cache(conn, cursor, statement, parameters, context, executemany):
+        cache[context.cache_hit] += 1
+
+    ids = [i % 1000 + 1 for i in range(args.repeat)]
+    rounds = 5
+    failures = 0
+    print(
+        f"{'consulta':>22} | montagem antes | montagem depois | execução antes "
+        f"| execução depois | hits depois"
+    )
+    with Session(engine) as session:
+        for name, before, after, fetch in cases():
+            if not same_result(session, before, after, fetch, ids[:50]):
+                print(f"{name}: resultados divergentes")
+                failures += 1
+                continue
+
+            timings = {key: [] for key in ("build", "execute")}
+            for _ in range(rounds):
+                timings["build"].append(
+                    (build_cost(before, ids), build_cost(after, ids))
+                )
+            for _ in range(rounds):
+                cache.clear()
+                event.listen(engine, "after_cursor_execute", count_cache)
+                try:
+                    after_cost = execute_cost(session, after, fetch, ids)
+                finally:
+                    event.remove(engine, "after_cursor_execute", count_cache)
+                before_cost = execute_cost(session, before, fetch, ids)
+                timings["execute"].append((before_cost, after_cost))
+
+            build_before, build_after = (
+                percentile([sample[side] for sample in timings["build"]], 50)
+                for side in (0, 1)
+            )
+            run_before, run_after = (
+                percentile([sample[side] for sample in timings["execute"]], 50)
+                for side in (0, 1)
+            )
+            hit_rate = cache[CacheStats.CACHE_HIT] / max(sum(cache.values()), 1) * 100
+            print(
+                f"{name:>22} | {build_before:>11.1f} µs | {build_after:>12.1f} µs "
+                f"| {run_before:>11.1f} µs | {run_after:>12.1f} µs | {hit_rate:>9.1f} %"
+            )
+            if run_after > run_before:
+                failures += 1
+
+    engine.dispose()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
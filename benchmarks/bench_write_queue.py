@@ -0,0 +1,230 @@
+"""Compara as escritas concorrentes com e sem a fila de escritas (`WRITE_QUEUE`).
+
+Vários processos rodam o app em processo contra o mesmo banco SQLite e enviam, com
+várias requisições simultâneas, sequências de escritas: cria um cliente, repete o
+CPF (400), cria um pet, agenda com ele, agenda com um pet inexistente (404) e
+atualiza o cliente. A mesma carga roda com a fila desligada e ligada, cada uma em um
+banco novo, e o script mostra vazão, latência e os status recebidos. Termina com
+código de saída 1 se, com a fila ligada, algum status for diferente do esperado.
+
+Uso:
+    python -m benchmarks.bench_write_queue [--workers 4] [--units 100] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.common import percentile, temporary_database_url
+
+# Status esperado de cada passo da sequência
+EXPECTED = {
+    "create_client": 200,
+    "duplicate_cpf": 400,
+    "create_pet": 200,
+    "create_schedule": 200,
+    "missing_pet": 404,
+    "update_client": 200,
+}
+
+
+async def run_worker(worker: int, units: int, concurrency: int) -> dict:
+    import httpx
+
+    from app.database import dispose_engines
+    from app.main import app
+    from app.write_queue import write_queue
+
+    statuses = {step: Counter() for step in EXPECTED}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(client, step: str, method: str, path: str, body: dict):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+        statuses[step][response.status_code] += 1
+        return response
+
+    async def unit(client, i: int) -> None:
+        cpf = f"{worker:03d}{i:08d}"
+        day = date(2030, 1, 1) + timedelta(days=worker * 10_000 + i)
+        customer = {
+            "name": f"Cliente {worker}-{i}",
+            "cpf": cpf,
+            "age": 30,
+            "is_admin": False,
+        }
+        response = await call(client, "create_client", "POST", "/clients/", customer)
+        if response.status_code != 200:
+            return
+        client_id = response.json()["id"]
+        await call(client, "duplicate_cpf", "POST", "/clients/", customer)
+
+        pet = {"name": "Rex", "breed": "SRD", "age": 3, "size_in_centimeters": 40}
+        response = await call(
+            client, "create_pet", "POST", f"/pets/{client_id}/pet/", pet
+        )
+        if response.status_code != 200:
+            return
+        pet_id = response.json()["id"]
+
+        schedule = {
+            "date_schedule": f"{day.isoformat()}T10:00:00",
+            "client_id": client_id,
+            "pet_id": pet_id,
+        }
+        await call(
+            client,
+            "create_schedule",
+            "POST",
+            "/schedules/",
+            {"schedule": schedule, "service_ids": [1]},
+        )
+        await call(
+            client,
+            "missing_pet",
+            "POST",
+            "/schedules/",
+            {"schedule": {**schedule, "pet_id": 10**9}, "service_ids": [1]},
+        )
+        await call(
+            client,
+            "update_client",
+            "PUT",
+            f"/clients/{client_id}",
+            {**customer, "age": 31},
+        )
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            await asyncio.gather(*(unit(client, i) for i in range(units)))
+    finally:
+        await dispose_engines()
+    return {
+        "statuses": {step: dict(counts) for step, counts in statuses.items()},
+        "latencies": latencies,
+        "seconds": time.perf_counter() - started,
+        "batches": write_queue.batches,
+        "jobs": write_queue.jobs,
+    }
+
+
+def prepare_database(url: str) -> None:
+    """Cria o schema e um serviço"""
+    os.environ["DATABASE_URL"] = url
+
+    from sqlmodel import Session
+
+    from app.counters import reconcile_counters
+    from app.database import create_db_and_tables, engine
+    from app.models.Services import Services
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add(
+            Services(id=1, duration_in_minutes=30, type_service="Banho", price=50.0)
+        )
+        session.commit()
+    reconcile_counters(engine)
+
+
+def run_mode(args: argparse.Namespace, queue: bool) -> list[dict]:
+    url = temporary_database_url()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_write_queue", "--prepare", url],
+        check=True,
+    )
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "WRITE_QUEUE": "1" if queue else "0",
+        "SLOW_QUERY_SAMPLE_RATE": "0",
+    }
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_write_queue",
+                "--worker",
+                str(worker),
+                "--units",
+                str(args.units),
+                "--concurrency",
+                str(args.concurrency),
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for worker in range(args.workers)
+    ]
+    reports = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            sys.exit(f"Processo terminou com código {process.returncode}")
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--units", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        prepare_database(args.prepare)
+        return
+    if args.worker is not None:
+        report = asyncio.run(run_worker(args.worker, args.units, args.concurrency))
+        print(json.dumps(report))
+        return
+
+    failures = 0
+    print(
+        f"{'fila':>9} | {'req/s':>7} | {'p50':>9} | {'p99':>9} | escritas/lote "
+        f"| status inesperados"
+    )
+    for queue in (False, True):
+        reports = run_mode(args, queue)
+        latencies = [value for report in reports for value in report["latencies"]]
+        seconds = max(report["seconds"] for report in reports)
+        unexpected = Counter()
+        for report in reports:
+            for step, counts in report["statuses"].items():
+                for status, count in counts.items():
+                    if int(status) != EXPECTED[step]:
+                        unexpected[f"{step}:{status}"] += count
+        batches = sum(report["batches"] for report in reports)
+        jobs = sum(report["jobs"] for report in reports)
+        per_batch = f"{jobs / batches:.1f}" if batches else "-"
+        print(
+            f"{'ligada' if queue else 'desligada':>9} | {len(latencies) / seconds:>7.0f} "
+            f"| {percentile(latencies, 50):>6.1f} ms | {percentile(latencies, 99):>6.1f} ms "
+            f"| {per_batch:>13} | {dict(unexpected) or '-'}"
+        )
+        if queue and unexpected:
+            failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
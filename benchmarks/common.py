@@ -0,0 +1,78 @@
+"""Utilitários compartilhados pelos benchmarks: banco temporário populado e estatísticas"""
+
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+
+def temporary_database_url() -> str:
+    """Cria um diretório temporário e retorna a `DATABASE_URL` de um arquivo SQLite dentro dele"""
+    directory = tempfile.mkdtemp(prefix="pet-shop-bench-")
+    return f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+
+def seed_database(
+    url: str, clients: int = 1000, services: int = 10, schedules: int = 5000
+) -> None:
+    """Popula o banco (já criado com `create_db_and_tables`) com dados sintéticos determinísticos"""
+    rng = random.Random(42)
+    connection = sqlite3.connect(url.removeprefix("sqlite:///"))
+    with connection:
+        connection.executemany(
+            "INSERT INTO client (id, name, cpf, age, is_admin) VALUES (?, ?, ?, ?, 0)",
+            (
+                (i, f"Cliente {i}", f"{i:011d}", rng.randint(18, 80))
+                for i in range(1, clients + 1)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO pet (id, name, breed, age, size_in_centimeters, client_id) "
+            "VALUES (?, ?, 'SRD', ?, ?, ?)",
+            (
+                (i, f"Pet {i}", rng.randint(1, 15), rng.randint(20, 90), i)
+                for i in range(1, clients + 1)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO services (id, duration_in_minutes, type_service, price) VALUES (?, ?, ?, ?)",
+            (
+                (i, 15 * rng.randint(1, 6), f"Serviço {i}", float(rng.randint(20, 300)))
+                for i in range(1, services + 1)
+            ),
+        )
+        start = datetime(2025, 1, 1, 8)
+        connection.executemany(
+            "INSERT INTO schedule (id, date_schedule, client_id, pet_id) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    (start + timedelta(minutes=30 * i)).strftime(
+                        "%Y-%m-%d %H:%M:%S.%f"
+                    ),
+                    owner,
+                    owner,
+                )
+                for i, owner in (
+                    (i, rng.randint(1, clients)) for i in range(1, schedules + 1)
+                )
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO scheduleservices (schedule_id, services_id) VALUES (?, ?)",
+            (
+                (i, service)
+                for i in range(1, schedules + 1)
+                for service in rng.sample(range(1, services + 1), rng.randint(1, 3))
+            ),
+        )
+    connection.close()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentil `pct` (0-100) das amostras, interpolado"""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
@@ -0,0 +1,62 @@
+"""Banco SQLite temporário dos testes, definido antes de o app ser importado"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+DATABASE_URL = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="pet-shop-tests-"), "tests.db"
+)
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ.setdefault("SLOW_QUERY_SAMPLE_RATE", "0")
+
+
+@pytest.fixture(scope="session")
+def database_url() -> str:
+    """Banco com o schema completo e os mesmos dados sintéticos dos benchmarks"""
+    from app.counters import reconcile_counters
+    from app.database import create_db_and_tables, engine
+    from app.rollups import rebuild_daily_summary
+    from benchmarks.common import seed_database
+
+    create_db_and_tables()
+    seed_database(DATABASE_URL, clients=200, services=10, schedules=1000)
+    rebuild_daily_summary(engine)
+    reconcile_counters(engine)
+    return DATABASE_URL
+
+
+@pytest.fixture
+def client(database_url):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def count_queries(database_url):
+    """Executa `work(session)` em uma sessão nova e devolve o resultado e a
+    quantidade de consultas feitas no banco"""
+    from app.database import dispose_engines, open_session
+    from app.instrumentation import QueryStats, _current_stats
+
+    def run(work):
+        async def main():
+            stats = QueryStats()
+            token = _current_stats.set(stats)
+            try:
+                async with open_session() as session:
+                    result = await work(session)
+            finally:
+                _current_stats.reset(token)
+                await dispose_engines()
+            return result, stats.count
+
+        return asyncio.run(main())
+
+    return run
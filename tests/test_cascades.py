@@ -0,0 +1,27 @@
+def _create(client, moment: str, service_ids: list[int]) -> int:
+    response = client.post(
+        "/schedules/",
+        json={
+            "schedule": {"date_schedule": moment, "client_id": 30, "pet_id": 30},
+            "service_ids": service_ids,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_delete_service_removes_only_schedules_left_without_services(client):
+    service = client.post(
+        "/services/",
+        json={"duration_in_minutes": 30, "type_service": "Hidratação", "price": 70.0},
+    ).json()["id"]
+    only_service = _create(client, "2040-03-01T10:00:00", [service])
+    with_other = _create(client, "2040-03-02T10:00:00", [service, 1])
+    without_services = _create(client, "2040-03-03T10:00:00", [])
+
+    assert client.delete(f"/services/{service}").status_code == 200
+
+    assert client.get(f"/schedules/{only_service}").status_code == 404
+    remaining = client.get(f"/schedules/{with_other}").json()
+    assert [item["id"] for item in remaining["services"]] == [1]
+    assert client.get(f"/schedules/{without_services}").status_code == 200
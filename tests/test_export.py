@@ -0,0 +1,73 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.export import accepts_gzip
+
+PERIOD = {"from": "2025-01-01", "to": "2025-01-05"}
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip", True),
+        ("gzip;q=0.5", True),
+        ("br, gzip; q=0.001", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("gzip;q=0, *", False),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+def test_export_compresses_when_gzip_has_positive_weight(client):
+    response = client.get(
+        "/schedules/export",
+        params=PERIOD,
+        headers={"Accept-Encoding": "gzip;q=0.5"},
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text.count("\n") > 0
+
+
+def test_export_refused_gzip_is_not_compressed(client):
+    response = client.get(
+        "/schedules/export",
+        params=PERIOD,
+        headers={"Accept-Encoding": "gzip;q=0"},
+    )
+
+    assert "content-encoding" not in response.headers
+    json.loads(response.text.splitlines()[0])
+
+
+def test_export_total_price_matches_between_formats(client):
+    headers = {"Accept-Encoding": "identity"}
+    ndjson = client.get("/schedules/export", params=PERIOD, headers=headers)
+    rows = client.get(
+        "/schedules/export", params={**PERIOD, "format": "csv"}, headers=headers
+    )
+
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    prices = [row["total_price"] for row in csv.DictReader(io.StringIO(rows.text))]
+    assert records
+    assert prices == [str(record["total_price"]) for record in records]
+
+
+def test_export_gzip_body_is_valid(client):
+    # O TestClient descomprime o corpo; aqui o corpo é lido sem descompressão
+    with client.stream(
+        "GET", "/schedules/export", params=PERIOD, headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        body = b"".join(response.iter_raw())
+
+    assert gzip.decompress(body).decode().count("\n") > 0
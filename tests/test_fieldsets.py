@@ -0,0 +1,18 @@
+from app.fieldsets import PARTIAL_MODEL_CACHE_SIZE, partial_model
+
+
+def test_partial_models_are_cached_per_canonical_field_set(client):
+    partial_model.cache_clear()
+
+    responses = [
+        client.get("/schedules/", params={"limit": 5, "fields": fields})
+        for fields in ("id,date_schedule", "date_schedule,id", "id, date_schedule,id")
+    ]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert responses[0].json() == responses[1].json() == responses[2].json()
+    assert partial_model.cache_info().currsize == 1
+
+
+def test_partial_model_cache_is_bounded():
+    assert partial_model.cache_info().maxsize == PARTIAL_MODEL_CACHE_SIZE
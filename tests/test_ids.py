@@ -0,0 +1,197 @@
+"""Geração de ids com vários processos gravando no mesmo banco ao mesmo tempo"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.ids import (
+    client_id_allocator,
+    pet_id_allocator,
+    reserve_ids,
+    schedule_id_allocator,
+)
+
+ROOT = Path(__file__).parents[1]
+WORKERS = 4
+
+RESERVE = """
+import json
+from app.database import engine
+from app.ids import reserve_ids
+print(json.dumps([list(reserve_ids(engine, "client", 7)) for _ in range(50)]))
+"""
+
+
+def _environment(url: str) -> dict:
+    return {
+        **os.environ,
+        "DATABASE_URL": url,
+        "ID_BLOCK_SIZE": "10",
+        # O teste confere os ids, não a espera pela trava de escrita do SQLite
+        "SQLITE_BUSY_TIMEOUT": "60000",
+        "SLOW_QUERY_SAMPLE_RATE": "0",
+    }
+
+
+def _run_parallel(commands: list[list[str]], env: dict) -> list:
+    """Roda os comandos ao mesmo tempo e devolve o JSON da última linha de cada um"""
+    processes = [
+        subprocess.Popen(
+            [sys.executable, *command],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for command in commands
+    ]
+    outputs = []
+    for process in processes:
+        output, _ = process.communicate()
+        assert process.returncode == 0
+        outputs.append(json.loads(output.strip().splitlines()[-1]))
+    return outputs
+
+
+def test_reserved_blocks_are_disjoint_across_processes(database_url):
+    blocks = [
+        block
+        for report in _run_parallel(
+            [["-c", RESERVE]] * WORKERS, _environment(database_url)
+        )
+        for block in report
+    ]
+    ids = [id_ for block in blocks for id_ in block]
+
+    assert all(block == list(range(block[0], block[0] + 7)) for block in blocks)
+    assert len(ids) == len(set(ids)) == WORKERS * 50 * 7
+
+
+def test_parallel_inserts_return_unique_stored_ids(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ids.db'}"
+    env = _environment(url)
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from benchmarks.bench_id_allocation import prepare_database; "
+            f"prepare_database({url!r}, {WORKERS})",
+        ],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+
+    reports = _run_parallel(
+        [
+            ["-m", "benchmarks.bench_id_allocation", "--worker", str(worker)]
+            + ["--requests", "20", "--concurrency", "4"]
+            for worker in range(WORKERS)
+        ],
+        env,
+    )
+
+    statuses = sum((Counter(report["statuses"]) for report in reports), Counter())
+    assert set(statuses) == {"200"}
+    connection = sqlite3.connect(tmp_path / "ids.db")
+    try:
+        # Os clientes criados antes dos processos (um por processo) não entram na conferência
+        for table, seeded in (("client", WORKERS), ("schedule", 0)):
+            returned = [id_ for report in reports for id_ in report["created"][table]]
+            stored = {row[0] for row in connection.execute(f"SELECT id FROM {table}")}
+            assert len(returned) == len(set(returned))
+            assert set(returned) == stored - set(range(1, seeded + 1))
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("reserves", [True, False])
+def test_bulk_schedules_with_and_without_reserved_ids(client, monkeypatch, reserves):
+    # Sem reserva (outros bancos), os ids vêm de `INSERT ... RETURNING`
+    monkeypatch.setattr(schedule_id_allocator, "_reserves", reserves)
+    day = "2040-05-02" if reserves else "2040-05-03"
+    items = [
+        {
+            "date_schedule": f"{day}T{hour:02d}:00:00",
+            "client_id": 40,
+            "pet_id": 40,
+            "service_ids": [1],
+        }
+        for hour in (8, 12, 16)
+    ]
+
+    results = client.post("/schedules/bulk", json=items).json()
+
+    ids = [result["id"] for result in results]
+    assert len(set(ids)) == 3
+    for schedule_id, item in zip(ids, items):
+        stored = client.get(f"/schedules/{schedule_id}").json()
+        assert stored["date_schedule"] == item["date_schedule"]
+        assert [service["id"] for service in stored["services"]] == [1]
+
+
+@pytest.mark.parametrize("reserves", [True, False])
+def test_import_with_and_without_reserved_ids(
+    client, database_url, monkeypatch, reserves
+):
+    monkeypatch.setattr(client_id_allocator, "_reserves", reserves)
+    monkeypatch.setattr(pet_id_allocator, "_reserves", reserves)
+    prefix = "91" if reserves else "92"
+    content = "\n".join(
+        [
+            "client_name,client_cpf,client_age,client_is_admin,pet_name,pet_breed,"
+            "pet_age,pet_size_in_centimeters",
+            f"Ana,{prefix}000000001,30,false,Rex,SRD,3,40",
+            f"Ana,{prefix}000000001,30,false,Bidu,SRD,2,30",
+            f"Bia,{prefix}000000002,40,false,Tom,SRD,5,50",
+        ]
+    )
+
+    report = client.post(
+        "/clients/import", files={"file": ("clients.csv", content, "text/csv")}
+    ).json()
+
+    assert (report["clients_created"], report["pets_created"]) == (2, 3)
+    connection = sqlite3.connect(database_url.removeprefix("sqlite:///"))
+    try:
+        pets = connection.execute(
+            "SELECT client.cpf, pet.name FROM pet JOIN client ON client.id = pet.client_id "
+            "WHERE client.cpf LIKE ? ORDER BY pet.name",
+            (f"{prefix}%",),
+        ).fetchall()
+    finally:
+        connection.close()
+    assert pets == [
+        (f"{prefix}000000001", "Bidu"),
+        (f"{prefix}000000001", "Rex"),
+        (f"{prefix}000000002", "Tom"),
+    ]
+
+
+def test_reserve_ids_requires_autoincrement(tmp_path):
+    # Tabelas de um banco ainda não migrado: os inserts sem id usariam max(rowid) + 1
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE client (id INTEGER PRIMARY KEY, name TEXT)")
+    engine = create_engine(f"sqlite:///{path}")
+    assert reserve_ids(engine, "client", 10) is None
+
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE pet (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+        connection.execute("INSERT INTO client (id, name) VALUES (5, 'Ana')")
+    assert reserve_ids(engine, "client", 10) is None
+    assert reserve_ids(engine, "pet", 10) == range(1, 11)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT name FROM sqlite_sequence").fetchall() == [
+            ("pet",)
+        ]
+    engine.dispose()
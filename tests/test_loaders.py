@@ -0,0 +1,37 @@
+import pytest
+
+from app.loaders import fetch_schedules, select_schedules
+from app.models.Schedule import Schedule
+from app.pagination import keyset_page
+
+
+def _page(limit: int):
+    return keyset_page(
+        select_schedules(), [Schedule.date_schedule, Schedule.id], None, limit
+    )
+
+
+@pytest.mark.parametrize("limit", [1, 10, 100])
+def test_schedule_page_uses_two_queries(count_queries, limit):
+    # Agendamentos com cliente e pet em uma consulta e os serviços de todos em outra
+    async def work(session):
+        return await fetch_schedules(session, _page(limit))
+
+    schedules, queries = count_queries(work)
+
+    assert len(schedules) == limit
+    assert queries == 2
+    assert all(schedule.services for schedule in schedules)
+    assert all(schedule.client and schedule.pet for schedule in schedules)
+
+
+def test_schedule_query_count_does_not_grow_with_page_size(count_queries):
+    async def work(session, limit):
+        return await fetch_schedules(session, _page(limit))
+
+    counts = {
+        limit: count_queries(lambda session, limit=limit: work(session, limit))[1]
+        for limit in (1, 10, 100)
+    }
+
+    assert len(set(counts.values())) == 1, counts
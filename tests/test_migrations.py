@@ -0,0 +1,59 @@
+import sqlite3
+
+from sqlalchemy import create_engine, inspect
+
+from app.migrations import pending_rebuilds, rebuild_tables
+
+# Tabelas como eram criadas antes do AUTOINCREMENT e do ON DELETE CASCADE
+OLD_SCHEMA = """
+CREATE TABLE client (
+    id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, cpf VARCHAR NOT NULL,
+    age INTEGER NOT NULL, is_admin BOOLEAN NOT NULL
+);
+CREATE TABLE services (
+    id INTEGER PRIMARY KEY, duration_in_minutes INTEGER NOT NULL,
+    type_service VARCHAR NOT NULL, price FLOAT NOT NULL
+);
+CREATE TABLE pet (
+    id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, breed VARCHAR NOT NULL,
+    age INTEGER NOT NULL, size_in_centimeters FLOAT NOT NULL,
+    client_id INTEGER NOT NULL REFERENCES client (id)
+);
+CREATE TABLE schedule (
+    id INTEGER PRIMARY KEY, date_schedule DATETIME NOT NULL,
+    client_id INTEGER NOT NULL REFERENCES client (id),
+    pet_id INTEGER NOT NULL REFERENCES pet (id)
+);
+CREATE TABLE scheduleservices (
+    services_id INTEGER NOT NULL REFERENCES services (id),
+    schedule_id INTEGER NOT NULL REFERENCES schedule (id),
+    PRIMARY KEY (services_id, schedule_id)
+);
+INSERT INTO client VALUES (1, 'Ana', '12345678901', 30, 0);
+INSERT INTO services VALUES (1, 30, 'Banho', 50.0);
+INSERT INTO pet VALUES (3, 'Rex', 'SRD', 3, 40, 1);
+INSERT INTO schedule VALUES (7, '2025-01-01 10:00:00', 1, 3);
+INSERT INTO scheduleservices VALUES (1, 7);
+"""
+
+
+def test_rebuild_tables_upgrades_old_schema(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(OLD_SCHEMA)
+    engine = create_engine(f"sqlite:///{path}")
+
+    tables = ["client", "pet", "schedule", "scheduleservices", "services"]
+    assert sorted(table.name for table in pending_rebuilds(engine)) == tables
+    assert sorted(rebuild_tables(engine)) == tables
+
+    assert pending_rebuilds(engine) == []
+    assert rebuild_tables(engine) == []
+    foreign_keys = inspect(engine).get_foreign_keys("scheduleservices")
+    assert {fk["options"].get("ondelete") for fk in foreign_keys} == {"CASCADE"}
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT name FROM client").fetchall() == [("Ana",)]
+        assert connection.execute("SELECT * FROM scheduleservices").fetchall() == [
+            (1, 7)
+        ]
+    engine.dispose()
@@ -0,0 +1,11 @@
+import logging
+
+from app.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
+
+def test_pool_events_are_not_logged_at_info(database_url):
+    # Cada pool registra "Pool disposed"/"Pool recreating" no logger da própria classe
+    for pool_class in (TimedQueuePool, TimedAsyncAdaptedQueuePool):
+        name = f"{pool_class.__module__}.{pool_class.__name__}"
+        assert not logging.getLogger(name).isEnabledFor(logging.INFO)
+    assert logging.getLogger("app.database").isEnabledFor(logging.INFO)
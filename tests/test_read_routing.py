@@ -0,0 +1,43 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import read_routing
+from app.read_routing import READ_STICKY_COOKIE, ReadAfterWriteMiddleware
+
+
+def sticky_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+    @app.post("/write")
+    def write():
+        return {}
+
+    return TestClient(app)
+
+
+def test_same_file_read_engine_sets_no_cookie(client):
+    response = client.post(
+        "/schedules/",
+        json={
+            "schedule": {
+                "date_schedule": "2040-02-01T10:00:00",
+                "client_id": 41,
+                "pet_id": 41,
+            },
+            "service_ids": [1],
+        },
+    )
+
+    assert response.status_code < 400
+    assert READ_STICKY_COOKIE not in response.cookies
+
+
+@pytest.mark.parametrize("replica", [True, False])
+def test_cookie_only_with_replica(monkeypatch, replica):
+    monkeypatch.setattr(read_routing, "READ_REPLICA", replica)
+
+    response = sticky_client().post("/write")
+
+    assert (READ_STICKY_COOKIE in response.cookies) is replica
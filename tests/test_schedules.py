@@ -0,0 +1,128 @@
+from app import availability
+
+
+def _schedule(client_id: int, moment: str, service_ids=(1,)) -> dict:
+    return {
+        "schedule": {
+            "date_schedule": moment,
+            "client_id": client_id,
+            "pet_id": client_id,
+        },
+        "service_ids": list(service_ids),
+    }
+
+
+def test_bulk_with_empty_list_returns_empty_results(client):
+    response = client.post("/schedules/bulk", json=[])
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_different_clients_can_share_a_slot(client):
+    first = client.post("/schedules/", json=_schedule(10, "2040-01-02T10:00:00"))
+    second = client.post("/schedules/", json=_schedule(11, "2040-01-02T10:00:00"))
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+
+
+def test_same_client_cannot_overlap_own_schedule(client):
+    assert (
+        client.post(
+            "/schedules/", json=_schedule(12, "2040-01-03T10:00:00")
+        ).status_code
+        == 200
+    )
+
+    # O serviço 1 dura pelo menos 15 minutos, então o segundo começa durante o primeiro
+    response = client.post("/schedules/", json=_schedule(12, "2040-01-03T10:10:00"))
+
+    assert response.status_code == 400
+    assert "conflita" in response.json()["detail"]
+
+
+def test_bulk_rejects_overlap_within_batch_for_same_client(client):
+    items = [
+        {
+            "date_schedule": "2040-01-04T10:00:00",
+            "client_id": client_id,
+            "pet_id": client_id,
+            "service_ids": [1],
+        }
+        for client_id in (13, 14, 13)
+    ]
+
+    response = client.post("/schedules/bulk", json=items)
+
+    assert [result["status_code"] for result in response.json()] == [200, 200, 400]
+
+
+def test_shop_capacity_is_opt_in(client, monkeypatch):
+    monkeypatch.setattr(availability, "SCHEDULE_CAPACITY", 1)
+
+    first = client.post("/schedules/", json=_schedule(15, "2040-01-05T10:00:00"))
+    second = client.post("/schedules/", json=_schedule(16, "2040-01-05T10:00:00"))
+
+    assert first.status_code == 200
+    assert second.status_code == 400
+
+
+def test_availability_accounts_for_existing_bookings(client):
+    client.post("/schedules/", json=_schedule(17, "2040-01-06T10:00:00"))
+    params = {"date": "2040-01-06", "service_ids": [1]}
+
+    def starts(**extra) -> set[str]:
+        response = client.get("/schedules/availability", params={**params, **extra})
+        return {slot["start"] for slot in response.json()}
+
+    # Sem cliente, a ocupação da loja: o horário agendado não aparece como livre
+    assert "2040-01-06T10:00:00" not in starts()
+    assert "2040-01-06T10:00:00" not in starts(client_id=17)
+    # Sem `SCHEDULE_CAPACITY`, outro cliente ainda pode agendar no mesmo horário
+    assert "2040-01-06T10:00:00" in starts(client_id=18)
+
+
+def test_update_to_another_client_checks_conflicts(client):
+    assert (
+        client.post(
+            "/schedules/", json=_schedule(21, "2040-01-07T10:00:00")
+        ).status_code
+        == 200
+    )
+    moved = client.post("/schedules/", json=_schedule(22, "2040-01-07T10:10:00")).json()
+
+    response = client.put(
+        f"/schedules/{moved['id']}", json={"client_id": 21, "pet_id": 21}
+    )
+
+    assert response.status_code == 400
+    assert "conflita" in response.json()["detail"]
+
+
+def test_longer_service_cannot_overlap_next_schedule(client):
+    service = client.post(
+        "/services/",
+        json={"duration_in_minutes": 30, "type_service": "Escovação", "price": 30.0},
+    ).json()
+    service_id = service["id"]
+    for moment in ("2040-01-08T10:00:00", "2040-01-08T10:30:00"):
+        response = client.post(
+            "/schedules/", json=_schedule(23, moment, service_ids=[service_id])
+        )
+        assert response.status_code == 200
+
+    longer = client.put(
+        f"/services/{service_id}",
+        params={"service_id": service_id},
+        json={"duration_in_minutes": 45, "type_service": "Escovação", "price": 30.0},
+    )
+    shorter = client.put(
+        f"/services/{service_id}",
+        params={"service_id": service_id},
+        json={"duration_in_minutes": 20, "type_service": "Escovação", "price": 30.0},
+    )
+
+    assert longer.status_code == 400
+    assert "conflita" in longer.json()["detail"]
+    assert shorter.status_code == 200
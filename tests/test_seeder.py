@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+
+def _run_seeder(path) -> None:
+    """Popula um banco novo com `app.seeder`"""
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "app.seeder",
+            "--clients",
+            "300",
+            "--schedules",
+            "3000",
+            "--days",
+            "30",
+            "--seed",
+            "7",
+        ],
+        cwd=Path(__file__).parents[1],
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        check=True,
+        capture_output=True,
+    )
+
+
+def _seed(path) -> list[str]:
+    """Popula um banco novo com `app.seeder` e devolve o dump completo dele"""
+    _run_seeder(path)
+    connection = sqlite3.connect(path)
+    try:
+        # A ordem dos `CREATE INDEX` no schema não importa; o conteúdo, sim
+        return sorted(connection.iterdump())
+    finally:
+        connection.close()
+
+
+def test_same_seed_produces_identical_databases(tmp_path):
+    first = _seed(tmp_path / "first.db")
+    second = _seed(tmp_path / "second.db")
+
+    assert len(first) > 3000
+    assert first == second
+
+
+def test_client_schedules_do_not_overlap(tmp_path):
+    path = tmp_path / "seed.db"
+    _run_seeder(path)
+    connection = sqlite3.connect(path)
+    try:
+        overlaps = connection.execute(
+            """
+            WITH appointment AS (
+                SELECT s.id, s.client_id,
+                       round(julianday(s.date_schedule) * 1440) AS start,
+                       round(julianday(s.date_schedule) * 1440)
+                       + sum(v.duration_in_minutes) AS finish
+                FROM schedule s
+                JOIN scheduleservices ss ON ss.schedule_id = s.id
+                JOIN services v ON v.id = ss.services_id
+                GROUP BY s.id
+            )
+            SELECT count(*) FROM appointment a
+            JOIN appointment b ON b.client_id = a.client_id AND b.id > a.id
+            WHERE b.start < a.finish AND a.start < b.finish
+            """
+        ).fetchone()[0]
+    finally:
+        connection.close()
+
+    assert overlaps == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from app import serialization
+
+PATHS = [
+    "/schedules/?limit=100",
+    "/schedules/2025/1",
+    "/schedules/2025/1/summary",
+    "/schedules/availability?date=2025-01-02",
+    "/clients/?limit=100",
+    "/clients/get_schedule/1",
+    "/pets/?limit=100",
+    "/pets/1",
+    "/services/?limit=100",
+]
+
+
+@pytest.fixture
+def openapi(client, monkeypatch):
+    """Schema OpenAPI gerado de novo com o `FAST_JSON` informado"""
+    from app.main import app
+
+    def generate(fast_json: bool) -> dict:
+        monkeypatch.setattr(serialization, "FAST_JSON", fast_json)
+        app.openapi_schema = None
+        return app.openapi()
+
+    yield generate
+    app.openapi_schema = None
+
+
+def test_openapi_schema_is_unchanged_with_fast_json(openapi):
+    assert openapi(True) == openapi(False)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_fast_json_response_is_identical(client, monkeypatch, path):
+    monkeypatch.setattr(serialization, "FAST_JSON", False)
+    expected = client.get(path)
+    monkeypatch.setattr(serialization, "FAST_JSON", True)
+    response = client.get(path)
+
+    assert response.status_code == expected.status_code == 200
+    assert response.content == expected.content
+    assert response.headers == expected.headers
@@ -0,0 +1,49 @@
+"""Cache do catálogo com serviços criados e excluídos por outro worker (direto no
+banco, sem passar pelo `mark_changed` deste processo)"""
+
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def other_worker(database_url):
+    connection = sqlite3.connect(database_url.removeprefix("sqlite:///"))
+    yield connection
+    connection.close()
+
+
+def _schedule(service_id: int, moment: str) -> dict:
+    return {
+        "schedule": {"date_schedule": moment, "client_id": 20, "pet_id": 20},
+        "service_ids": [service_id],
+    }
+
+
+def test_missing_service_is_not_cached(client, other_worker):
+    assert client.get("/services/9001").status_code == 404
+
+    with other_worker:
+        other_worker.execute(
+            "INSERT INTO services (id, duration_in_minutes, type_service, price) "
+            "VALUES (9001, 30, 'Tosa', 50.0)"
+        )
+
+    assert client.get("/services/9001").status_code == 200
+    response = client.post("/schedules/", json=_schedule(9001, "2040-02-01T10:00:00"))
+    assert response.status_code == 200
+
+
+def test_schedule_with_service_deleted_elsewhere_is_rejected(client, other_worker):
+    with other_worker:
+        other_worker.execute(
+            "INSERT INTO services (id, duration_in_minutes, type_service, price) "
+            "VALUES (9002, 30, 'Banho', 40.0)"
+        )
+    assert client.get("/services/9002").status_code == 200
+
+    with other_worker:
+        other_worker.execute("DELETE FROM services WHERE id = 9002")
+
+    response = client.post("/schedules/", json=_schedule(9002, "2040-02-02T10:00:00"))
+    assert response.status_code == 404
@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.database import named_engines
+from app.write_queue import WriteQueue
+
+
+def run_batch(queue: WriteQueue, *calls):
+    """Envia as escritas juntas (no mesmo lote) e devolve o resultado ou o erro de cada uma"""
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                *(queue.submit(call) for call in calls), return_exceptions=True
+            )
+        finally:
+            await queue.stop()
+
+    return asyncio.run(main())
+
+
+async def select_one(session):
+    return (await session.execute(text("SELECT 1"))).scalar_one()
+
+
+async def not_found(session):
+    raise HTTPException(status_code=404, detail="Pet não encontrado")
+
+
+async def broken(session):
+    raise ValueError("erro de programação")
+
+
+def test_http_error_fails_only_its_write(database_url):
+    queue = WriteQueue(window=0.05)
+    result, error = run_batch(queue, select_one, not_found)
+
+    assert result == 1
+    assert isinstance(error, HTTPException)
+    assert queue.failed_batches == 0
+
+
+def test_unexpected_error_fails_the_batch(database_url):
+    queue = WriteQueue(window=0.05)
+    results = run_batch(queue, select_one, broken)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert queue.failed_batches == 1
+
+
+def test_writer_engine_in_named_engines(database_url):
+    queue = WriteQueue()
+
+    async def main():
+        await queue.submit(select_one)
+        registered = "writer" in named_engines()
+        await queue.stop()
+        return registered
+
+    assert asyncio.run(main())
+    assert "writer" not in named_engines()